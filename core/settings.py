@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -85,6 +86,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+#
+# 'default' her sürecin kendi belleğidir. Operasyon sürümleri ve bellek
+# tablolarının sürümleri gibi tüm süreçlerin aynı değeri görmesi gereken
+# anahtarlar 'shared' önbellekte tutulur: REDIS_URL verilmişse Redis, yoksa
+# veritabanı tablosu (tablo 0019 migration'ı ile oluşturulur).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'tour_shared_cache',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -141,4 +164,14 @@ if DEBUG:
 
 LOGIN_REDIRECT_URL = 'tour:jobs'
 LOGOUT_REDIRECT_URL = 'tour:login'
-LOGIN_URL = 'tour:login'
\ No newline at end of file
+LOGIN_URL = 'tour:login'
+
+# Kur dönüşümlerinde ana para birimi (ExchangeRate kurları bu birim cinsindendir)
+BASE_CURRENCY = 'TRY'
+
+# Görev panosu canlı olayları (tour/events.py)
+# SSE akışı yalnızca ASGI sunucusu (core/asgi.py, ör. uvicorn/daphne) altında açılır;
+# WSGI altında pano 30 saniyede bir ETag ile yoklanır. Varsayılan InProcessBroadcaster
+# olayları yalnızca aynı süreçteki bağlantılara iletir: birden çok worker/süreç
+# çalıştırılıyorsa TOUR_EVENTS_BACKEND ile süreçler arası bir arka uç verilmelidir.
+# TOUR_EVENTS_BACKEND = 'tour.events.InProcessBroadcaster'
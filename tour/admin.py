@@ -181,14 +181,16 @@ class OperationDayAdmin(admin.ModelAdmin):
 @admin.register(OperationItem)
 class OperationItemAdmin(admin.ModelAdmin):
     list_display = ('operation_day', 'item_type', 'pick_time', 'is_active')
-    list_filter = ('is_active', 'item_type', 'operation_day__operation__status')
-    search_fields = ('operation_day__operation__reference_number', 'notes')
+    list_filter = ('is_active', 'item_type', 'operation__status')
+    search_fields = ('operation__reference_number', 'notes')
+    date_hierarchy = 'date'
 
 @admin.register(OperationSubItem)
 class OperationSubItemAdmin(admin.ModelAdmin):
     list_display = ('operation_item', 'ordering', 'subitem_type', 'is_active')
     list_filter = ('is_active', 'subitem_type', 'operation_item__item_type')
-    search_fields = ('operation_item__operation_day__operation__reference_number', 'notes')
+    search_fields = ('operation__reference_number', 'notes')
+    date_hierarchy = 'date'
     filter_horizontal = ('museums',)
 
 
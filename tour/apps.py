@@ -9,3 +9,11 @@ class TourConfig(AppConfig):
         # Template tags'i yükle
         from django.template.defaultfilters import register
         from .templatetags import custom_filters
+        # Operasyon önbelleği için sinyalleri bağla
+        from . import signals
+        # Genel CRUD görünümlerinin model kayıtlarını bir kez oluştur
+        from .registry import register_models
+        register_models()
+        # Genel liste aramasının metin indeksini kayıtlı modellerle eşitle
+        from .search import connect_signals
+        connect_signals()
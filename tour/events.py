@@ -0,0 +1,94 @@
+"""
+Görev panosu için canlı değişiklik olayları.
+
+Olaylar kanal adına göre (ör. ``jobs:2025-05-01``) yayınlanır. Varsayılan arka uç
+tek süreç içinde çalışır (yalnızca aynı süreçteki SSE bağlantılarına ulaşır) ve
+akış ASGI gerektirir; birden çok süreç/sunucu için ``TOUR_EVENTS_BACKEND`` ayarıyla
+aynı arayüzü (publish/subscribe) sağlayan başka bir sınıf verilebilir.
+"""
+import asyncio
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'tour.events.InProcessBroadcaster'
+HEARTBEAT_SECONDS = 15
+
+
+class InProcessBroadcaster:
+    """
+    Aynı süreçteki abonelere olay dağıtır. publish herhangi bir iş parçacığından
+    (ör. senkron view'ların commit sonrası geri çağrıları) güvenle çağrılabilir.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def publish(self, channel, message):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self.deliver, queue, message)
+
+    @staticmethod
+    def deliver(queue, message):
+        # Yavaş istemcinin kuyruğu doluysa olay atlanır; pano bir sonraki yüklemede düzelir
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def subscribe(self, channel):
+        """Kanala abone olur; mesajlar dönen kuyruğa düşer"""
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        with self.lock:
+            channel_subscribers = self.subscribers.get(channel, set())
+            channel_subscribers.discard((asyncio.get_running_loop(), queue))
+            if not channel_subscribers:
+                self.subscribers.pop(channel, None)
+
+
+@lru_cache(maxsize=None)
+def get_broadcaster():
+    """Ayarlarda seçilen arka ucun tek örneğini döndürür"""
+    return import_string(getattr(settings, 'TOUR_EVENTS_BACKEND', DEFAULT_BACKEND))()
+
+
+def jobs_channel(date):
+    return f'jobs:{date.isoformat()}'
+
+
+def publish_jobs_event(date, **event):
+    """Verilen günün görev panosunu izleyenlere olay gönderir"""
+    get_broadcaster().publish(jobs_channel(date), event)
+
+
+async def event_stream(channel, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Kanaldaki olayları SSE biçiminde üretir. Bağlantının açık kaldığını
+    göstermek için olay yoksa belirli aralıklarla yorum satırı gönderir.
+    """
+    broadcaster = get_broadcaster()
+    queue = broadcaster.subscribe(channel)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield f'data: {json.dumps(message)}\n\n'
+    finally:
+        broadcaster.unsubscribe(channel, queue)
@@ -7,6 +7,7 @@ from .models import (
     OperationCustomer, OperationSalesPrice, OperationSubItem
 )
 from django.core.cache import cache
+from .registry import get_select_related
 
 # Select widget'ı için ortak sınıf
 class SearchableSelect(forms.Select):
@@ -88,9 +89,10 @@ class NeighborhoodForm(forms.ModelForm):
 class VehicleTypeForm(forms.ModelForm):
     class Meta:
         model = VehicleType
-        fields = ['name']
+        fields = ['name', 'cost_column']
         labels = {
-            'name': 'Araç Tipi'
+            'name': 'Araç Tipi',
+            'cost_column': 'Maliyet Sütunu'
         }
 
 class BuyerCompanyForm(forms.ModelForm):
@@ -298,6 +300,14 @@ class BaseOperationForm(forms.ModelForm):
                     # Currency alanları için varsayılan değer ayarla
                     if field_name == 'currency' and form_choices[field_name]:
                         field.initial = form_choices[field_name][0]
+        # Seçenek etiketleri (__str__) ilişkili kayıtları kullanıyor (ör. Hotel → city);
+        # seçenek başına sorgu atılmaması için ilişkiler tek seferde yüklenir
+        for field in self.fields.values():
+            queryset = getattr(field, 'queryset', None)
+            if queryset is not None:
+                related = get_select_related(queryset.model, depth=1)
+                if related:
+                    field.queryset = queryset.select_related(*related)
 
 class OperationSubItemForm(BaseOperationForm):
     class Meta:
@@ -465,6 +475,16 @@ class OperationForm(forms.ModelForm):
 
 
 
+class OperationShiftForm(forms.Form):
+    days = forms.IntegerField(label='Kaydırılacak Gün Sayısı', help_text='Geri almak için eksi değer girin')
+
+    def clean_days(self):
+        days = self.cleaned_data['days']
+        if days == 0:
+            raise forms.ValidationError('Gün sayısı sıfır olamaz')
+        return days
+
+
 class SendSmsForm(forms.Form):
     users = forms.ModelChoiceField(queryset=CustomUser.objects.filter(is_active=True, phone__isnull=False), label='Kullanıcı')
     message = forms.CharField(label='Mesaj', widget=forms.Textarea)
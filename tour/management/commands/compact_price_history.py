@@ -0,0 +1,22 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tour.services import PriceHistoryMaintenanceService, RepricingService
+
+
+class Command(BaseCommand):
+    help = 'Fiyat geçmişi tablolarında aynı fiyatlı aralıkları birleştirir ve eski aralıkları arşive taşır'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(RepricingService.MODELS), help='Yalnızca bu modelin geçmişi')
+        parser.add_argument('--horizon-days', type=int, default=730, help='Bundan eski aralıklar arşive taşınır (gün)')
+        parser.add_argument('--no-archive', action='store_true', help='Yalnızca birleştir, arşive taşıma')
+
+    def handle(self, *args, **options):
+        names = [options['model']] if options['model'] else sorted(RepricingService.MODELS)
+        before = timezone.now().date() - timedelta(days=options['horizon_days'])
+
+        for name in names:
+            merged = PriceHistoryMaintenanceService.compact(name)
+            archived = 0 if options['no_archive'] else PriceHistoryMaintenanceService.archive(name, before)
+            self.stdout.write(self.style.SUCCESS(f'{name}: {merged} aralık birleştirildi, {archived} aralık arşive taşındı'))
@@ -0,0 +1,30 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tour.services import DispatchService
+
+
+class Command(BaseCommand):
+    help = 'Sevk tablosunu (DispatchRow) kaynak operasyon verilerinden yeniden kurar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Başlangıç tarihi (YYYY-AA-GG)')
+        parser.add_argument('--date-to', help='Bitiş tarihi (YYYY-AA-GG)')
+
+    def parse_date(self, value):
+        """Komut satırındaki tarihi çözümler"""
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Geçersiz tarih: {value}')
+
+    def handle(self, *args, **options):
+        date_from = self.parse_date(options['date_from'])
+        date_to = self.parse_date(options['date_to'])
+
+        with transaction.atomic():
+            written = DispatchService.rebuild_range(date_from, date_to)
+
+        self.stdout.write(self.style.SUCCESS(f'{written} sevk satırı yeniden oluşturuldu'))
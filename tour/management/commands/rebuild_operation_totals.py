@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tour.models import Operation
+from tour.services import OperationFinanceService
+
+
+class Command(BaseCommand):
+    help = 'Operasyonların gelir/maliyet toplamlarını (OperationTotals) yeniden hesaplar'
+
+    BATCH_SIZE = 500
+
+    def handle(self, *args, **options):
+        operation_ids = list(Operation.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(operation_ids), self.BATCH_SIZE):
+            with transaction.atomic():
+                OperationFinanceService.rebuild(operation_ids[start:start + self.BATCH_SIZE])
+
+        self.stdout.write(self.style.SUCCESS(f'{len(operation_ids)} operasyonun toplamları yeniden hesaplandı'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from tour.registry import REGISTRY, get_spec
+from tour.search import SearchIndex
+
+
+class Command(BaseCommand):
+    help = 'Genel liste aramasının metin indeksini (SearchDocument) kayıtlı modellerden yeniden kurar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Yalnızca bu modeller (ör. Hotel VehicleCost)')
+
+    def handle(self, *args, **options):
+        try:
+            specs = [get_spec(name) for name in options['models']] or list(REGISTRY.values())
+        except LookupError as e:
+            raise CommandError(str(e))
+        for spec in specs:
+            if not spec.indexed:
+                raise CommandError(f'{spec.name} arama indeksine kayıtlı değil')
+
+        for spec in specs:
+            written = SearchIndex.rebuild(spec)
+            self.stdout.write(f'{spec.name}: {written} kayıt')
+
+        self.stdout.write(self.style.SUCCESS(f'{len(specs)} modelin arama indeksi yeniden oluşturuldu'))
@@ -0,0 +1,85 @@
+import csv
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from tour.services import RepricingService
+
+
+class Command(BaseCommand):
+    help = 'Otel, müze, araç ve aktivite fiyatlarını yüzde, sabit tutar veya CSV ile toplu günceller'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(RepricingService.MODELS), help='Fiyatı güncellenecek model')
+        parser.add_argument('--percent', help='Yüzde değişim (ör. 10 veya -5)')
+        parser.add_argument('--amount', help='Sabit tutar değişimi (ör. 25 veya -10)')
+        parser.add_argument('--csv', help='id ve fiyat alanı sütunları içeren CSV dosyası')
+        parser.add_argument('--fields', help='Yalnızca bu fiyat alanlarını değiştir (virgülle ayrılmış)')
+        parser.add_argument('--ids', help='Yalnızca bu kayıtları değiştir (virgülle ayrılmış)')
+        parser.add_argument('--currency', help='Yalnızca bu para birimindeki kayıtlar (ör. EUR)')
+        parser.add_argument('--supplier', type=int, help='Yalnızca bu tedarikçinin kayıtları (araç/aktivite)')
+        parser.add_argument('--city', help='Yalnızca bu şehirdeki kayıtlar (şehir kodu, otel/müze)')
+        parser.add_argument('--valid-until', help='Yeni geçerlilik bitiş tarihi (YYYY-AA-GG)')
+
+    def decimal(self, value, label):
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise CommandError(f'Geçersiz {label}: {value}')
+
+    def read_csv(self, path, fields):
+        """CSV'yi {id: {alan: fiyat}} sözlüğüne çevirir; boş hücreler atlanır"""
+        prices = {}
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as csv_file:
+                for row in csv.DictReader(csv_file):
+                    prices[int(row.pop('id'))] = {
+                        field: self.decimal(value, field)
+                        for field, value in row.items()
+                        if field in fields and value not in (None, '')
+                    }
+        except (OSError, KeyError, ValueError) as e:
+            raise CommandError(f'CSV okunamadı: {e}')
+        return prices
+
+    def handle(self, *args, **options):
+        name = options['model']
+        model, _, _, price_fields = RepricingService.MODELS[name]
+        if not any(options[key] for key in ('percent', 'amount', 'csv')):
+            raise CommandError('--percent, --amount veya --csv seçeneklerinden en az biri gerekli')
+        if options['csv'] and (options['percent'] or options['amount']):
+            raise CommandError('--csv, --percent ve --amount ile birlikte kullanılamaz')
+
+        fields = options['fields'].split(',') if options['fields'] else None
+        queryset = model.objects.all()
+        if options['ids']:
+            queryset = queryset.filter(pk__in=[int(pk) for pk in options['ids'].split(',')])
+        if options['currency']:
+            queryset = queryset.filter(currency__code=options['currency'].upper())
+        for option, lookup in (('supplier', 'supplier_id'), ('city', 'city__code')):
+            if options[option]:
+                if not any(field.name == lookup.split('_')[0] for field in model._meta.fields):
+                    raise CommandError(f'--{option} bu model için kullanılamaz')
+                queryset = queryset.filter(**{lookup: options[option]})
+
+        valid_until = None
+        if options['valid_until']:
+            try:
+                valid_until = datetime.strptime(options['valid_until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Geçersiz tarih: {options['valid_until']}")
+
+        try:
+            changed = RepricingService.reprice(
+                name,
+                queryset=queryset,
+                percent=self.decimal(options['percent'], 'yüzde') if options['percent'] else None,
+                amount=self.decimal(options['amount'], 'tutar') if options['amount'] else None,
+                prices=self.read_csv(options['csv'], fields or price_fields) if options['csv'] else None,
+                fields=fields,
+                valid_until=valid_until,
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(f'{changed} kaydın fiyatı güncellendi'))
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0007_remove_operationsubitem_is_guide'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('reference_number', models.CharField(max_length=50, verbose_name='Reference Number')),
+                ('buyer_company', models.CharField(max_length=255, verbose_name='Buyer Company')),
+                ('follow_by', models.CharField(blank=True, max_length=255, verbose_name='Follow By')),
+                ('row_type', models.CharField(max_length=20, verbose_name='Row Type')),
+                ('description', models.CharField(blank=True, max_length=500, verbose_name='Description')),
+                ('pick_time', models.TimeField(blank=True, null=True, verbose_name='Pick Time')),
+                ('pick_up_location', models.CharField(blank=True, max_length=100, verbose_name='Pick Up Location')),
+                ('drop_off_location', models.CharField(blank=True, max_length=100, verbose_name='Drop Off Location')),
+                ('vehicle_type', models.CharField(blank=True, max_length=50, verbose_name='Vehicle Type')),
+                ('supplier', models.CharField(blank=True, max_length=255, verbose_name='Supplier')),
+                ('guide', models.CharField(blank=True, max_length=255, verbose_name='Guide')),
+                ('driver_name', models.CharField(blank=True, max_length=100, verbose_name='Driver Name')),
+                ('driver_phone', models.CharField(blank=True, max_length=100, verbose_name='Driver Phone')),
+                ('vehicle_plate_no', models.CharField(blank=True, max_length=100, verbose_name='Vehicle Plate No')),
+                ('cost_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Cost Price')),
+                ('cost_currency', models.CharField(blank=True, max_length=3, verbose_name='Cost Currency')),
+                ('sales_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Sales Price')),
+                ('sales_currency', models.CharField(blank=True, max_length=3, verbose_name='Sales Currency')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('operation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_rows', to='tour.operation', verbose_name='Operation')),
+                ('operation_day', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_rows', to='tour.operationday', verbose_name='Operation Day')),
+                ('operation_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_rows', to='tour.operationitem', verbose_name='Operation Item')),
+                ('operation_sub_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_rows', to='tour.operationsubitem', verbose_name='Operation Sub Item')),
+            ],
+            options={
+                'verbose_name': 'Dispatch Row',
+                'verbose_name_plural': 'Dispatch Rows',
+                'ordering': ['date', 'pick_time', 'reference_number', 'id'],
+                'indexes': [models.Index(fields=['date', 'pick_time'], name='dispatch_date_pick_time_idx')],
+            },
+        ),
+    ]
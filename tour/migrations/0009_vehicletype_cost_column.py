@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+# Mevcut araç tiplerini adlarına göre maliyet sütunlarıyla eşleştir
+COST_COLUMNS = {
+    'binek': 'car_cost',
+    'car': 'car_cost',
+    'minivan': 'minivan_cost',
+    'minibüs': 'minibus_cost',
+    'minibus': 'minibus_cost',
+    'midibüs': 'midibus_cost',
+    'midibus': 'midibus_cost',
+    'otobüs': 'bus_cost',
+    'bus': 'bus_cost',
+}
+
+
+def set_cost_columns(apps, schema_editor):
+    VehicleType = apps.get_model('tour', 'VehicleType')
+    for vehicle_type in VehicleType.objects.all():
+        column = COST_COLUMNS.get(vehicle_type.name.strip().lower())
+        if column:
+            vehicle_type.cost_column = column
+            vehicle_type.save(update_fields=['cost_column'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0008_dispatchrow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicletype',
+            name='cost_column',
+            field=models.CharField(blank=True, choices=[('car_cost', 'Car'), ('minivan_cost', 'Minivan'), ('minibus_cost', 'Minibus'), ('midibus_cost', 'Midibus'), ('bus_cost', 'Bus')], max_length=20, verbose_name='Cost Column'),
+        ),
+        migrations.RunPython(set_cost_columns, migrations.RunPython.noop),
+    ]
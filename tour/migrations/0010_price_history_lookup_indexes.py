@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0009_vehicletype_cost_column'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitycosthistory',
+            index=models.Index(fields=['activity_cost', 'valid_from', 'valid_until', 'is_active'], name='activity_cost_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelpricehistory',
+            index=models.Index(fields=['hotel', 'valid_from', 'valid_until', 'is_active'], name='hotel_price_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='museumpricehistory',
+            index=models.Index(fields=['museum', 'valid_from', 'valid_until', 'is_active'], name='museum_price_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiclecosthistory',
+            index=models.Index(fields=['vehicle_cost', 'valid_from', 'valid_until', 'is_active'], name='vehicle_cost_lookup_idx'),
+        ),
+    ]
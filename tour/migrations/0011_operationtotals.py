@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0010_price_history_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Revenue')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Cost')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='tour.currency', verbose_name='Currency')),
+                ('operation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='tour.operation', verbose_name='Operation')),
+            ],
+            options={
+                'verbose_name': 'Operation Totals',
+                'verbose_name_plural': 'Operation Totals',
+                'unique_together': {('operation', 'currency')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0011_operationtotals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Tarih')),
+                ('rate', models.DecimalField(decimal_places=6, max_digits=18, verbose_name='Kur')),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='exchange_rates', to='tour.currency', verbose_name='Para Birimi')),
+            ],
+            options={
+                'verbose_name': 'Döviz Kuru',
+                'verbose_name_plural': 'Döviz Kurları',
+                'ordering': ['-date'],
+                'unique_together': {('currency', 'date')},
+            },
+        ),
+    ]
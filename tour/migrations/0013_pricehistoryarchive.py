@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0012_exchangerate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Model')),
+                ('owner_id', models.PositiveBigIntegerField(verbose_name='Owner ID')),
+                ('currency_code', models.CharField(max_length=3, verbose_name='Currency')),
+                ('valid_from', models.DateField(verbose_name='Valid From')),
+                ('valid_until', models.DateField(verbose_name='Valid Until')),
+                ('prices', models.JSONField(verbose_name='Prices')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(verbose_name='Created At')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived At')),
+            ],
+            options={
+                'verbose_name': 'Price History Archive',
+                'verbose_name_plural': 'Price History Archives',
+                'ordering': ['-valid_from'],
+                'indexes': [models.Index(fields=['model_name', 'owner_id', 'valid_from'], name='price_archive_owner_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0013_pricehistoryarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=50, verbose_name='Prefix')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('last_value', models.PositiveIntegerField(default=0, verbose_name='Last Value')),
+            ],
+            options={
+                'verbose_name': 'Reference Counter',
+                'verbose_name_plural': 'Reference Counters',
+                'unique_together': {('prefix', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:14
+
+from django.db import migrations, models
+from django.db.models import Count
+
+PAX_FIELDS = {'ADULT': 'adult_pax', 'CHILD': 'child_pax', 'INFANT': 'infant_pax'}
+
+
+def count_pax(apps, schema_editor):
+    Operation = apps.get_model('tour', 'Operation')
+    OperationCustomer = apps.get_model('tour', 'OperationCustomer')
+    counts = {}
+    for operation_id, customer_type, total in OperationCustomer.objects.filter(is_active=True).values_list(
+        'operation_id', 'customer_type'
+    ).annotate(total=Count('id')).order_by():
+        fields = counts.setdefault(operation_id, {'total_pax': 0})
+        fields['total_pax'] += total
+        if customer_type in PAX_FIELDS:
+            fields[PAX_FIELDS[customer_type]] = total
+    for operation_id, fields in counts.items():
+        Operation.objects.filter(pk=operation_id).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0014_referencecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operation',
+            name='adult_pax',
+            field=models.PositiveIntegerField(default=0, verbose_name='Adult Pax'),
+        ),
+        migrations.AddField(
+            model_name='operation',
+            name='child_pax',
+            field=models.PositiveIntegerField(default=0, verbose_name='Child Pax'),
+        ),
+        migrations.AddField(
+            model_name='operation',
+            name='infant_pax',
+            field=models.PositiveIntegerField(default=0, verbose_name='Infant Pax'),
+        ),
+        migrations.RunPython(count_pax, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_operation_and_date(apps, schema_editor):
+    OperationDay = apps.get_model('tour', 'OperationDay')
+    OperationItem = apps.get_model('tour', 'OperationItem')
+    OperationSubItem = apps.get_model('tour', 'OperationSubItem')
+    days = OperationDay.objects.filter(pk=OuterRef('operation_day_id'))
+    OperationItem.objects.update(
+        operation_id=Subquery(days.values('operation_id')[:1]),
+        date=Subquery(days.values('date')[:1])
+    )
+    items = OperationItem.objects.filter(pk=OuterRef('operation_item_id'))
+    OperationSubItem.objects.update(
+        operation_id=Subquery(items.values('operation_id')[:1]),
+        date=Subquery(items.values('date')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0015_operation_pax_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operationitem',
+            name='date',
+            field=models.DateField(db_index=True, editable=False, null=True, verbose_name='Date'),
+        ),
+        migrations.AddField(
+            model_name='operationitem',
+            name='operation',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='operation_items', to='tour.operation', verbose_name='Operation'),
+        ),
+        migrations.AddField(
+            model_name='operationsubitem',
+            name='date',
+            field=models.DateField(db_index=True, editable=False, null=True, verbose_name='Date'),
+        ),
+        migrations.AddField(
+            model_name='operationsubitem',
+            name='operation',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='operation_sub_items', to='tour.operation', verbose_name='Operation'),
+        ),
+        migrations.RunPython(copy_operation_and_date, migrations.RunPython.noop),
+    ]
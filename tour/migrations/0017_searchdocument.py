@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:29
+
+from django.db import OperationalError, migrations, models
+
+# SQLite: harici içerikli FTS5 trigram tablosu, tetikleyicilerle eşitlenir
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE tour_searchdocument_fts USING fts5("
+    "text, content='tour_searchdocument', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER tour_searchdocument_ai AFTER INSERT ON tour_searchdocument BEGIN "
+    "INSERT INTO tour_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER tour_searchdocument_ad AFTER DELETE ON tour_searchdocument BEGIN "
+    "INSERT INTO tour_searchdocument_fts(tour_searchdocument_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER tour_searchdocument_au AFTER UPDATE ON tour_searchdocument BEGIN "
+    "INSERT INTO tour_searchdocument_fts(tour_searchdocument_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO tour_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS tour_searchdocument_au',
+    'DROP TRIGGER IF EXISTS tour_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS tour_searchdocument_ai',
+    'DROP TABLE IF EXISTS tour_searchdocument_fts',
+]
+
+# PostgreSQL: LIKE '%...%' aramaları trigram GIN indeksini kullanır
+POSTGRES_INDEX = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX tour_searchdocument_text_trgm ON tour_searchdocument USING gin (text gin_trgm_ops)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS tour_searchdocument_text_trgm',
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            for sql in SQLITE_INDEX:
+                schema_editor.execute(sql)
+        except OperationalError:
+            # FTS5/trigram desteği olmayan SQLite derlemelerinde arama LIKE ile yapılır
+            for sql in SQLITE_DROP:
+                schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_INDEX:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0016_denormalize_item_operation_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Model')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Object ID')),
+                ('text', models.TextField(verbose_name='Text')),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'unique_together': {('model_name', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
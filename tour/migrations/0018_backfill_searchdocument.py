@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def fill_search_index(apps, schema_editor):
+    # Belge metni ilişkili kayıtların __str__ değerlerinden üretilir; geçmiş
+    # (historical) modellerde bu metotlar olmadığından güncel kayıtlar kullanılır
+    from tour.registry import REGISTRY
+    from tour.search import SearchIndex
+
+    for spec in REGISTRY.values():
+        SearchIndex.rebuild(spec)
+
+
+def clear_search_index(apps, schema_editor):
+    apps.get_model('tour', 'SearchDocument').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tour', '0017_searchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_index, clear_search_index),
+    ]
@@ -79,6 +79,21 @@ class Currency(models.Model):
     def __str__(self):
         return f"{self.code} ({self.symbol})"
 
+class ExchangeRate(models.Model):
+    # 1 birim para biriminin ana para birimi (BASE_CURRENCY, varsayılan TRY) karşılığı
+    currency = models.ForeignKey(Currency, on_delete=models.PROTECT, related_name='exchange_rates', verbose_name="Para Birimi")
+    date = models.DateField(verbose_name="Tarih")
+    rate = models.DecimalField(max_digits=18, decimal_places=6, verbose_name="Kur")
+
+    class Meta:
+        verbose_name = "Döviz Kuru"
+        verbose_name_plural = "Döviz Kurları"
+        unique_together = ('currency', 'date')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.currency.code} {self.date}: {self.rate}"
+
 class City(models.Model):
     name = models.CharField(verbose_name=("City Name"), max_length=100, unique=True)
     code = models.CharField(verbose_name=("City Code"), max_length=10, unique=True, validators=[MinLengthValidator(2), MaxLengthValidator(10)])
@@ -118,7 +133,17 @@ class Neighborhood(models.Model):
 
 
 class VehicleType(models.Model):
+    # VehicleCost üzerindeki maliyet sütunları
+    COST_COLUMN_CHOICES = [
+        ('car_cost', _('Car')),
+        ('minivan_cost', _('Minivan')),
+        ('minibus_cost', _('Minibus')),
+        ('midibus_cost', _('Midibus')),
+        ('bus_cost', _('Bus')),
+    ]
+
     name = models.CharField(verbose_name=_("Vehicle Type"), max_length=50)  # Binek, Minivan vs.
+    cost_column = models.CharField(verbose_name=_("Cost Column"), max_length=20, choices=COST_COLUMN_CHOICES, blank=True)
     created_at = models.DateTimeField(verbose_name=_("Created At"), auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name=_("Updated At"), auto_now=True)
     is_active = models.BooleanField(verbose_name=_("Is Active"), default=True)
@@ -450,6 +475,9 @@ class HotelPriceHistory(PriceHistoryBase):
         verbose_name = "Hotel Price History"
         verbose_name_plural = "Hotel Price Histories"
         ordering = ['-valid_from']
+        indexes = [
+            models.Index(fields=['hotel', 'valid_from', 'valid_until', 'is_active'], name='hotel_price_lookup_idx'),
+        ]
 
 # Müze fiyat geçmişi
 class MuseumPriceHistory(PriceHistoryBase):
@@ -464,6 +492,9 @@ class MuseumPriceHistory(PriceHistoryBase):
         verbose_name = "Museum Price History"
         verbose_name_plural = "Museum Price Histories"
         ordering = ['-valid_from']
+        indexes = [
+            models.Index(fields=['museum', 'valid_from', 'valid_until', 'is_active'], name='museum_price_lookup_idx'),
+        ]
 
 # Araç maliyet geçmişi
 class VehicleCostHistory(PriceHistoryBase):
@@ -481,6 +512,9 @@ class VehicleCostHistory(PriceHistoryBase):
         verbose_name = "Vehicle Cost History"
         verbose_name_plural = "Vehicle Cost Histories"
         ordering = ['-valid_from']
+        indexes = [
+            models.Index(fields=['vehicle_cost', 'valid_from', 'valid_until', 'is_active'], name='vehicle_cost_lookup_idx'),
+        ]
 
 # Aktivite maliyet geçmişi
 class ActivityCostHistory(PriceHistoryBase):
@@ -494,6 +528,60 @@ class ActivityCostHistory(PriceHistoryBase):
         verbose_name = "Activity Cost History"
         verbose_name_plural = "Activity Cost Histories"
         ordering = ['-valid_from']
+        indexes = [
+            models.Index(fields=['activity_cost', 'valid_from', 'valid_until', 'is_active'], name='activity_cost_lookup_idx'),
+        ]
+
+class ReferenceCounter(models.Model):
+    """Alıcı kısa adı ve tarih başına son verilen operasyon referans sıra numarası"""
+    prefix = models.CharField(verbose_name="Prefix", max_length=50)
+    date = models.DateField(verbose_name="Date")
+    last_value = models.PositiveIntegerField(verbose_name="Last Value", default=0)
+
+    def __str__(self):
+        return f"{self.prefix} {self.date}: {self.last_value}"
+
+    class Meta:
+        verbose_name = "Reference Counter"
+        verbose_name_plural = "Reference Counters"
+        unique_together = ('prefix', 'date')
+
+# Genel liste araması için kayıt başına katlanmış arama metni; tour.search eşitler
+class SearchDocument(models.Model):
+    model_name = models.CharField(verbose_name="Model", max_length=50)  # hotel, vehiclecost, ...
+    object_id = models.PositiveBigIntegerField(verbose_name="Object ID")
+    text = models.TextField(verbose_name="Text")
+
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id}"
+
+    class Meta:
+        verbose_name = "Search Document"
+        verbose_name_plural = "Search Documents"
+        unique_together = ('model_name', 'object_id')
+
+# Ufku geçmiş fiyat aralıkları; compact_price_history sıcak tablolardan buraya taşır
+class PriceHistoryArchive(models.Model):
+    model_name = models.CharField(verbose_name="Model", max_length=50)  # hotel, museum, vehicle_cost, activity_cost
+    owner_id = models.PositiveBigIntegerField(verbose_name="Owner ID")
+    currency_code = models.CharField(verbose_name="Currency", max_length=3)
+    valid_from = models.DateField(verbose_name="Valid From")
+    valid_until = models.DateField(verbose_name="Valid Until")
+    prices = models.JSONField(verbose_name="Prices")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(verbose_name="Created At")
+    archived_at = models.DateTimeField(verbose_name="Archived At", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model_name} #{self.owner_id} ({self.valid_from} - {self.valid_until})"
+
+    class Meta:
+        verbose_name = "Price History Archive"
+        verbose_name_plural = "Price History Archives"
+        ordering = ['-valid_from']
+        indexes = [
+            models.Index(fields=['model_name', 'owner_id', 'valid_from'], name='price_archive_owner_idx'),
+        ]
 
 class Operation(models.Model):
     DRAFT = 'DRAFT'
@@ -536,11 +624,16 @@ class Operation(models.Model):
         default=DRAFT
     )
     total_pax = models.PositiveIntegerField(verbose_name=_("Total Pax"), default=0)
+    adult_pax = models.PositiveIntegerField(verbose_name=_("Adult Pax"), default=0)
+    child_pax = models.PositiveIntegerField(verbose_name=_("Child Pax"), default=0)
+    infant_pax = models.PositiveIntegerField(verbose_name=_("Infant Pax"), default=0)
     notes = models.TextField(verbose_name=_("Notes"), blank=True, null=True)
     created_at = models.DateTimeField(verbose_name=_("Created At"), auto_now_add=True)
     updated_at = models.DateTimeField(verbose_name=_("Updated At"), auto_now=True)
     is_active = models.BooleanField(verbose_name=_("Is Active"), default=True)
 
+    PAX_COUNTER_FIELDS = ('total_pax', 'adult_pax', 'child_pax', 'infant_pax')
+
     def clean(self):
         if self.end_date < self.start_date:
             raise ValidationError(_("End date cannot be before start date"))
@@ -548,23 +641,31 @@ class Operation(models.Model):
     def save(self, *args, **kwargs):
         from .services import OperationService
         
-        is_new = self.pk is None
-        old_start_date = None
-        old_end_date = None
+        # Eski kaydın anlık görüntüsü tek sorguda alınır
+        old = None
+        if self.pk is not None:
+            old = Operation.objects.filter(pk=self.pk).values(
+                'start_date', 'end_date', 'buyer_company__short_name'
+            ).first()
+        is_new = old is None
+        old_start_date = old['start_date'] if old else None
+        old_end_date = old['end_date'] if old else None
 
         # Referans numarası oluşturma
         if not self.reference_number:
-            if not self.pk or self.buyer_company.short_name != Operation.objects.get(pk=self.pk).buyer_company.short_name or self.start_date != Operation.objects.get(pk=self.pk).start_date:
+            if is_new or self.buyer_company.short_name != old['buyer_company__short_name'] or self.start_date != old_start_date:
                 self.reference_number = OperationService.generate_reference_number(
                     self.buyer_company.short_name,
                     self.start_date
                 )
 
-        # Gün oluşturma işlemleri
-        if not is_new:
-            old_instance = Operation.objects.get(pk=self.pk)
-            old_start_date = old_instance.start_date
-            old_end_date = old_instance.end_date
+        # Kişi sayaçları yalnızca F() güncellemeleriyle değişir; bellekteki eski
+        # değerler tam kayıtta sayaçların üzerine yazılmasın
+        if not is_new and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PAX_COUNTER_FIELDS
+            ]
 
         super().save(*args, **kwargs)
 
@@ -635,23 +736,41 @@ class OperationCustomer(models.Model):
     def __str__(self):
         return self.get_full_name()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kişi sayaçlarındaki farkı hesaplamak için yüklenen durumu sakla
+        instance._loaded_pax_key = instance.get_pax_key()
+        return instance
+
+    def get_pax_key(self):
+        """Sayaçları etkileyen alanlar: (operasyon, müşteri tipi, aktiflik)"""
+        return (self.operation_id, self.customer_type, self.is_active)
+
     def save(self, *args, **kwargs):
+        from .services import CustomerService
+
         self.clean()
-        is_new = self.pk is None
+        old_key = getattr(self, '_loaded_pax_key', None)
+        if old_key is None and self.pk is not None:
+            old_key = OperationCustomer.objects.filter(pk=self.pk).values_list(
+                'operation_id', 'customer_type', 'is_active'
+            ).first()
         super().save(*args, **kwargs)
 
-        # Müşteri eklendiğinde veya silindiğinde total_pax'i güncelle
-        if is_new or not self.is_active:
-            from .services import CustomerService
-            CustomerService.update_operation_total_pax(self.operation)
+        # Operasyonun kişi sayaçları yeniden sayılmadan F() ile artırılır/azaltılır
+        new_key = self.get_pax_key()
+        if old_key != new_key:
+            CustomerService.change_pax_counters(old_key, new_key)
+        self._loaded_pax_key = new_key
 
     def delete(self, *args, **kwargs):
-        operation = self.operation
-        super().delete(*args, **kwargs)
-
-        # Müşteri silindiğinde total_pax'i güncelle
         from .services import CustomerService
-        CustomerService.update_operation_total_pax(operation)
+
+        old_key = getattr(self, '_loaded_pax_key', None) or self.get_pax_key()
+        result = super().delete(*args, **kwargs)
+        CustomerService.change_pax_counters(old_key, None)
+        return result
 
     class Meta:
         verbose_name = _("Operation Customer")
@@ -678,6 +797,21 @@ class OperationDay(models.Model):
     def __str__(self):
         return f"{self.operation} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Tarih değiştiyse öğe ve alt öğelerdeki kopyası da güncellenir
+        loaded_date = getattr(self, '_loaded_date', None)
+        if loaded_date is not None and loaded_date != self.date:
+            OperationItem.objects.filter(operation_day=self).update(date=self.date)
+            OperationSubItem.objects.filter(operation_item__operation_day=self).update(date=self.date)
+        self._loaded_date = self.date
+
     class Meta:
         ordering = ['date']
 
@@ -695,6 +829,9 @@ class OperationItem(models.Model):
     ]
 
     operation_day = models.ForeignKey(OperationDay, verbose_name="Operation Day", on_delete=models.CASCADE, related_name='items')
+    # Gün üzerinden join yapmadan filtrelemek için operasyon ve tarihin kopyası
+    operation = models.ForeignKey(Operation, verbose_name="Operation", on_delete=models.CASCADE, related_name='operation_items', null=True, editable=False)
+    date = models.DateField(verbose_name="Date", null=True, editable=False, db_index=True)
     item_type = models.CharField(verbose_name="Item Type", max_length=20, choices=ITEM_TYPE_CHOICES)
     
     #ortak alanlar 1
@@ -735,6 +872,14 @@ class OperationItem(models.Model):
     def __str__(self):
         return f"{self.operation_day} - {self.get_item_type_display()}"
 
+    def save(self, *args, **kwargs):
+        # Operasyon ve tarih her kayıtta günden kopyalanır
+        if OperationItem.operation_day.is_cached(self):
+            self.operation_id, self.date = self.operation_day.operation_id, self.operation_day.date
+        else:
+            self.operation_id, self.date = OperationDay.objects.values_list('operation_id', 'date').get(pk=self.operation_day_id)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Operation Item"
         verbose_name_plural = "Operation Items"
@@ -765,6 +910,9 @@ class OperationSubItem(models.Model):
     ]
 
     operation_item = models.ForeignKey(OperationItem, verbose_name="Operation Item", on_delete=models.CASCADE, related_name='subitems')
+    # Öğe ve gün üzerinden join yapmadan filtrelemek için operasyon ve tarihin kopyası
+    operation = models.ForeignKey(Operation, verbose_name="Operation", on_delete=models.CASCADE, related_name='operation_sub_items', null=True, editable=False)
+    date = models.DateField(verbose_name="Date", null=True, editable=False, db_index=True)
     ordering = models.PositiveIntegerField(verbose_name="Ordering")
     subitem_type = models.CharField(verbose_name="Subitem Type", max_length=20, choices=SUBITEM_TYPE_CHOICES)
 
@@ -799,9 +947,82 @@ class OperationSubItem(models.Model):
     def __str__(self):
         return f"{self.operation_item} - {self.get_subitem_type_display()}"
 
+    def save(self, *args, **kwargs):
+        # Operasyon ve tarih her kayıtta öğeden kopyalanır
+        if OperationSubItem.operation_item.is_cached(self):
+            self.operation_id, self.date = self.operation_item.operation_id, self.operation_item.date
+        else:
+            self.operation_id, self.date = OperationItem.objects.values_list('operation_id', 'date').get(pk=self.operation_item_id)
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['ordering']
 
+class DispatchRow(models.Model):
+    """
+    Günlük sevk tablosu: her aktif öğe ve alt öğe için tek satır.
+    Kaynak tablolardan sinyallerle güncellenir, rebuild_dispatch ile yeniden kurulur.
+    """
+    operation = models.ForeignKey(Operation, verbose_name="Operation", on_delete=models.CASCADE, related_name='dispatch_rows')
+    operation_day = models.ForeignKey(OperationDay, verbose_name="Operation Day", on_delete=models.CASCADE, related_name='dispatch_rows')
+    operation_item = models.ForeignKey(OperationItem, verbose_name="Operation Item", on_delete=models.CASCADE, related_name='dispatch_rows')
+    operation_sub_item = models.ForeignKey(OperationSubItem, verbose_name="Operation Sub Item", on_delete=models.CASCADE, related_name='dispatch_rows', null=True, blank=True)
+    date = models.DateField(verbose_name="Date")
+    reference_number = models.CharField(verbose_name="Reference Number", max_length=50)
+    buyer_company = models.CharField(verbose_name="Buyer Company", max_length=255)
+    follow_by = models.CharField(verbose_name="Follow By", max_length=255, blank=True)
+    row_type = models.CharField(verbose_name="Row Type", max_length=20)
+    description = models.CharField(verbose_name="Description", max_length=500, blank=True)
+    pick_time = models.TimeField(verbose_name="Pick Time", null=True, blank=True)
+    pick_up_location = models.CharField(verbose_name="Pick Up Location", max_length=100, blank=True)
+    drop_off_location = models.CharField(verbose_name="Drop Off Location", max_length=100, blank=True)
+    vehicle_type = models.CharField(verbose_name="Vehicle Type", max_length=50, blank=True)
+    supplier = models.CharField(verbose_name="Supplier", max_length=255, blank=True)
+    guide = models.CharField(verbose_name="Guide", max_length=255, blank=True)
+    driver_name = models.CharField(verbose_name="Driver Name", max_length=100, blank=True)
+    driver_phone = models.CharField(verbose_name="Driver Phone", max_length=100, blank=True)
+    vehicle_plate_no = models.CharField(verbose_name="Vehicle Plate No", max_length=100, blank=True)
+    cost_price = models.DecimalField(verbose_name="Cost Price", max_digits=10, decimal_places=2, null=True, blank=True)
+    cost_currency = models.CharField(verbose_name="Cost Currency", max_length=3, blank=True)
+    sales_price = models.DecimalField(verbose_name="Sales Price", max_digits=10, decimal_places=2, null=True, blank=True)
+    sales_currency = models.CharField(verbose_name="Sales Currency", max_length=3, blank=True)
+    updated_at = models.DateTimeField(verbose_name="Updated At", auto_now=True)
+
+    def __str__(self):
+        return f"{self.date} - {self.reference_number} - {self.row_type}"
+
+    class Meta:
+        verbose_name = "Dispatch Row"
+        verbose_name_plural = "Dispatch Rows"
+        ordering = ['date', 'pick_time', 'reference_number', 'id']
+        indexes = [
+            models.Index(fields=['date', 'pick_time'], name='dispatch_date_pick_time_idx'),
+        ]
+
+class OperationTotals(models.Model):
+    """
+    Operasyonun para birimi başına gelir ve maliyet toplamı.
+    Gelir: satış fiyatları + öğe ve alt öğe satış fiyatları; maliyet: öğe ve alt öğe maliyetleri.
+    OperationFinanceService tarafından alt kayıtlar değiştikçe yeniden hesaplanır.
+    """
+    operation = models.ForeignKey(Operation, verbose_name="Operation", on_delete=models.CASCADE, related_name='totals')
+    currency = models.ForeignKey(Currency, verbose_name="Currency", on_delete=models.PROTECT)
+    revenue = models.DecimalField(verbose_name="Revenue", max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField(verbose_name="Cost", max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(verbose_name="Updated At", auto_now=True)
+
+    @property
+    def margin(self):
+        return self.revenue - self.cost
+
+    def __str__(self):
+        return f"{self.operation_id} - {self.currency_id}: {self.margin}"
+
+    class Meta:
+        verbose_name = "Operation Totals"
+        verbose_name_plural = "Operation Totals"
+        unique_together = ('operation', 'currency')
+
 class Support(models.Model):
     user = models.ForeignKey(CustomUser, verbose_name="User", on_delete=models.CASCADE)
     subject = models.CharField(verbose_name="Subject", max_length=255)
@@ -0,0 +1,130 @@
+"""
+Anahtar tabanlı (keyset/seek) sayfalama.
+
+Sayfalar OFFSET ve COUNT(*) yerine son görülen satırın (sıralama alanı, pk)
+değerinden sonrası okunarak üretilir; derin sayfalar ilk sayfa kadar ucuzdur.
+İmleçler istemciye opak (base64 JSON) olarak verilir.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """Bir sayfanın kayıtları ve komşu sayfaların imleçleri"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, approximate_count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_count = approximate_count
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    queryset'i (ordering, pk) anahtarına göre sayfalar. ordering tek bir model
+    alanıdır ("-" ile azalan); boş değer alabilen alanlarda yalnızca pk kullanılır.
+    """
+
+    def __init__(self, queryset, per_page, ordering='pk'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = ordering.startswith('-')
+        name = ordering.lstrip('-')
+        pk = queryset.model._meta.pk
+        field = pk if name == 'pk' else queryset.model._meta.get_field(name)
+        # NULL değerler karşılaştırmalara girmediğinden bu alanlarda pk'ye düşülür
+        self.keys = [pk] if field.primary_key or field.null else [field, pk]
+
+    # İmleç: [yön, anahtar değerleri...]; "n" sonraki, "p" önceki sayfa
+    def encode_cursor(self, direction, obj):
+        values = [direction] + [getattr(obj, field.attname) for field in self.keys]
+        raw = json.dumps(values, cls=DjangoJSONEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, *values = json.loads(raw)
+            if direction not in ('n', 'p') or len(values) != len(self.keys):
+                raise ValueError
+            return direction, [field.to_python(value) for field, value in zip(self.keys, values)]
+        except (ValueError, TypeError, ValidationError) as e:
+            raise InvalidCursor('Geçersiz sayfa imleci') from e
+
+    def order_by(self, reverse):
+        descending = self.descending != reverse
+        return [f"{'-' if descending else ''}{field.attname}" for field in self.keys]
+
+    def seek(self, values, reverse):
+        """Anahtarı verilen değerlerden sonra (reverse ise önce) gelen satırlar için filtre"""
+        descending = self.descending != reverse
+        operator = 'lt' if descending else 'gt'
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.keys, values):
+            condition |= Q(**equal, **{f'{field.attname}__{operator}': value})
+            equal[field.attname] = value
+        return condition
+
+    def page(self, cursor=None):
+        direction, values = self.decode_cursor(cursor) if cursor else ('n', None)
+        reverse = direction == 'p'
+        queryset = self.queryset.order_by(*self.order_by(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.seek(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        # Okunan yöndeki fazladan satır o yönde sayfa olduğunu gösterir;
+        # imleçle gelinen yönde ise her zaman bir sayfa vardır
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = self.encode_cursor('n', rows[-1])
+            if has_more if reverse else values is not None:
+                previous_cursor = self.encode_cursor('p', rows[0])
+        return KeysetPage(rows, next_cursor, previous_cursor, self.approximate_count())
+
+    def approximate_count(self):
+        """
+        Filtresiz sorgularda PostgreSQL istatistiklerinden tahmini satır sayısı;
+        diğer durumlarda COUNT(*) atılmaz ve None döner
+        """
+        if connection.vendor != 'postgresql' or self.queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [self.queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return max(row[0], 0) if row else None
@@ -0,0 +1,207 @@
+"""
+Genel CRUD görünümlerinin (list/create/detail/update/delete/export) model kayıtları.
+
+Her model uygulama açılırken (TourConfig.ready) bir kez kaydedilir. Form sınıfı,
+liste sütunları, arama alanları, ilişkili yükleme yolları, dışa aktarma
+dönüştürücüleri ve varsayılan sıralama istek başına yeniden hesaplanmaz.
+Kaydedilmemiş tour modelleri için kayıt ilk istekte formsuz olarak kurulur;
+bunlar listelenemez ve düzenlenemez ama dışa aktarılabilir ve silinebilir.
+"""
+from django.apps import apps
+from django.db.models import Q
+
+REGISTRY = {}
+# Kaydedilmemiş modeller için ilk istekte kurulan kayıtlar; arama indeksine girmezler
+UNREGISTERED = {}
+
+
+def format_datetime(value):
+    return value.strftime('%d.%m.%Y %H:%M')
+
+
+def format_date(value):
+    return value.strftime('%d.%m.%Y')
+
+
+def format_time(value):
+    return value.strftime('%H:%M')
+
+
+def format_active(value):
+    return 'Aktif' if value else 'Pasif'
+
+
+def format_related(value):
+    return str(value)
+
+
+def format_image(value):
+    return value.url
+
+
+def format_many(value):
+    return ', '.join(str(related) for related in value.all())
+
+
+# Dışa aktarmada adı özel anlam taşıyan alanlar
+EXPORT_FORMATTERS = {
+    'image': format_image,
+    'date': format_date,
+    'time': format_time,
+    'is_active': format_active,
+    'created_at': format_datetime,
+    'updated_at': format_datetime,
+}
+
+
+def get_export_converter(field):
+    """Alanın Excel hücresine yazılacak değeri üreten dönüştürücüyü seçer"""
+    if field.many_to_many:
+        return format_many
+    if field.is_relation:
+        return format_related
+    return EXPORT_FORMATTERS.get(field.name)
+
+
+# İlişkili kayıtların __str__ metotları bir seviye daha ilişki kullanıyor
+# (ör. Tour → start_city), bu yüzden yabancı anahtarlar iki seviye izlenir
+SELECT_RELATED_DEPTH = 2
+
+
+def get_select_related(model, depth=SELECT_RELATED_DEPTH, prefix=''):
+    """İleri yönlü yabancı anahtar yollarını (ör. tour, tour__start_city) döndürür"""
+    paths = []
+    for field in model._meta.fields:
+        if field.many_to_one or field.one_to_one:
+            path = f'{prefix}{field.name}'
+            paths.append(path)
+            if depth > 1:
+                paths.extend(get_select_related(field.related_model, depth - 1, f'{path}__'))
+    return tuple(paths)
+
+
+def get_search_fields(model):
+    """Arama metnine giren alanlar: metin alanları ve yabancı anahtarlar (ilişkili kaydın adıyla)"""
+    return tuple(
+        field for field in model._meta.fields
+        if field.get_internal_type() in ('CharField', 'TextField') or field.many_to_one or field.one_to_one
+    )
+
+
+class ModelSpec:
+    """Bir modelin genel görünümlerde kullanılan önceden hesaplanmış bilgileri"""
+
+    def __init__(self, model, form_class=None, select_related=None, ordering=None, indexed=False):
+        self.model = model
+        self.name = model.__name__
+        self.form_class = form_class
+        # Arama SearchDocument tablosunda mı yoksa doğrudan alanlarda mı yapılır
+        self.indexed = indexed
+        # Çoktan çoğa alanlar tablonun sonunda virgülle birleştirilmiş gösterilir
+        self.columns = tuple(model._meta.fields) + tuple(model._meta.many_to_many)
+        self.search_fields = get_search_fields(model)
+        # Liste ve dışa aktarmada satır başına sorgu atılmaması için ilişkiler tek seferde yüklenir
+        self.select_related = tuple(get_select_related(model) if select_related is None else select_related)
+        self.prefetch_related = tuple(field.name for field in model._meta.many_to_many)
+        self.ordering = tuple(ordering or model._meta.ordering or ('pk',))
+        self.export_columns = tuple(
+            (str(field.verbose_name), field.name, get_export_converter(field))
+            for field in self.columns
+        )
+
+    def get_form(self, *args, **kwargs):
+        """
+        Form örneği oluşturur; seçim alanlarının queryset'leri de ilişkileriyle
+        yüklenir ki seçenek etiketleri (__str__) seçenek başına sorgu atmasın
+        """
+        if self.form_class is None:
+            raise ValueError(f'Form sınıfı bulunamadı: {self.name}')
+        form = self.form_class(*args, **kwargs)
+        for field in form.fields.values():
+            queryset = getattr(field, 'queryset', None)
+            if queryset is not None:
+                related = get_select_related(queryset.model, depth=1)
+                if related:
+                    field.queryset = queryset.select_related(*related)
+        return form
+
+    def queryset(self):
+        """
+        Liste ve dışa aktarma için sabit sayıda sorguyla yüklenen queryset.
+        Tablo modelin tüm alanlarını gösterdiğinden only() ile ertelenecek alan
+        yoktur; ilişkili modeller de __str__ ek sorgu atmasın diye tam yüklenir
+        """
+        queryset = self.model.objects.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset.order_by(*self.ordering)
+
+    def search(self, queryset, query):
+        """Arama sorgusunu modelin metin indeksinde (bkz. tour.search), indeksi yoksa alanlarda arar"""
+        if not query or not query.strip():
+            return queryset
+        if not self.indexed:
+            return queryset.filter(self.search_filter(query.strip()))
+        from .search import search_ids
+        return queryset.filter(pk__in=search_ids(self, query))
+
+    def search_filter(self, query):
+        """Metin alanlarında ve ilişkili kaydın adında icontains araması"""
+        filters = Q()
+        for field in self.search_fields:
+            if not field.is_relation:
+                filters |= Q(**{f'{field.name}__icontains': query})
+            elif any(related.name == 'name' for related in field.related_model._meta.fields):
+                filters |= Q(**{f'{field.name}__name__icontains': query})
+        return filters
+
+    def export_row(self, obj):
+        row = []
+        for _, name, converter in self.export_columns:
+            value = getattr(obj, name)
+            if converter is not None and value:
+                value = converter(value)
+            row.append(value)
+        return row
+
+
+def register(model, form_class, **options):
+    spec = ModelSpec(model, form_class, indexed=True, **options)
+    REGISTRY[spec.name.lower()] = spec
+    return spec
+
+
+def get_spec(name):
+    """
+    Adres parametresindeki model adına (büyük/küçük harf duyarsız) karşılık gelen
+    kaydı döndürür; kaydedilmemiş tour modelleri için formsuz kayıt kurar
+    """
+    key = name.lower()
+    spec = REGISTRY.get(key) or UNREGISTERED.get(key)
+    if spec is None:
+        # Model yoksa apps.get_model LookupError fırlatır
+        spec = UNREGISTERED[key] = ModelSpec(apps.get_model(app_label='tour', model_name=name))
+    return spec
+
+
+def register_models():
+    """Genel görünümlerde yönetilen modelleri kaydeder; TourConfig.ready içinden çağrılır"""
+    from . import forms, models
+
+    for model, form_class in (
+        (models.Currency, forms.CurrencyForm),
+        (models.VehicleType, forms.VehicleTypeForm),
+        (models.BuyerCompany, forms.BuyerCompanyForm),
+        (models.Tour, forms.TourForm),
+        (models.NoVehicleTour, forms.NoVehicleTourForm),
+        (models.Transfer, forms.TransferForm),
+        (models.Hotel, forms.HotelForm),
+        (models.Museum, forms.MuseumForm),
+        (models.Activity, forms.ActivityForm),
+        (models.Guide, forms.GuideForm),
+        (models.VehicleSupplier, forms.VehicleSupplierForm),
+        (models.ActivitySupplier, forms.ActivitySupplierForm),
+        (models.VehicleCost, forms.VehicleCostForm),
+        (models.ActivityCost, forms.ActivityCostForm),
+    ):
+        register(model, form_class)
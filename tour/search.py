@@ -0,0 +1,159 @@
+"""
+Genel liste araması için model başına metin indeksi.
+
+Her kayıtlı modelin (bkz. tour.registry) metin alanları ve ilişkilerinin adları
+Türkçe harf katlamasıyla tek bir SearchDocument satırına yazılır. Arama bu
+tabloda yapılır: SQLite'ta FTS5 trigram tablosu, PostgreSQL'de pg_trgm GIN
+indeksi kullanılır (bkz. 0017_searchdocument). Satırlar sinyallerle eşitlenir;
+toplu yüklemelerden sonra rebuild_search_index komutu çalıştırılır.
+"""
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from .models import SearchDocument
+from .registry import REGISTRY
+
+FTS_TABLE = 'tour_searchdocument_fts'
+# Trigram indeksi en az üç karakterlik aramalarda kullanılabilir
+TRIGRAM_LENGTH = 3
+BATCH_SIZE = 1000
+
+# İ/I/ı aynı harf sayılır; "istanbul", "İSTANBUL" ve "ISTANBUL" birbirini bulur
+TURKISH_FOLD = str.maketrans({'İ': 'i', 'I': 'i', 'ı': 'i'})
+
+
+def fold(value):
+    """Metni Türkçe büyük/küçük harf farkı gözetmeyecek biçimde küçültür"""
+    return ' '.join(str(value).translate(TURKISH_FOLD).lower().split())
+
+
+class SearchBackend:
+    """Veritabanından bağımsız arama: katlanmış metinde LIKE (PostgreSQL'de trigram indeksli)"""
+
+    def filter(self, documents, query):
+        return documents.filter(text__contains=query)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 trigram tablosunda alt dize araması"""
+
+    def filter(self, documents, query):
+        if len(query) < TRIGRAM_LENGTH:
+            return super().filter(documents, query)
+        phrase = '"%s"' % query.replace('"', '""')
+        return documents.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [phrase]))
+
+
+_backend = None
+
+
+def get_backend():
+    """Veritabanına uygun arka ucu bir kez seçer"""
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = SearchBackend()
+    return _backend
+
+
+def search_ids(spec, query):
+    """Sorguyla eşleşen kayıtların id'lerini alt sorgu olarak döndürür"""
+    documents = SearchDocument.objects.filter(model_name=spec.name.lower())
+    return get_backend().filter(documents, fold(query)).values('object_id')
+
+
+def document_text(spec, obj):
+    values = []
+    for field in spec.search_fields:
+        value = getattr(obj, field.name)
+        if value not in (None, ''):
+            values.append(str(value))
+    return fold(' '.join(values))
+
+
+class SearchIndex:
+    """SearchDocument satırlarının yazılması ve silinmesi"""
+
+    @staticmethod
+    def update(spec, ids):
+        """Verilen kayıtların belgelerini yeniden yazar; artık bulunmayanlarınkini siler"""
+        ids = set(ids)
+        documents = [
+            SearchDocument(model_name=spec.name.lower(), object_id=obj.pk, text=document_text(spec, obj))
+            for obj in spec.queryset().filter(pk__in=ids)
+        ]
+        SearchDocument.objects.bulk_create(
+            documents, update_conflicts=True,
+            unique_fields=['model_name', 'object_id'], update_fields=['text']
+        )
+        missing = ids - {document.object_id for document in documents}
+        if missing:
+            SearchIndex.remove(spec, missing)
+
+    @staticmethod
+    def remove(spec, ids):
+        SearchDocument.objects.filter(model_name=spec.name.lower(), object_id__in=ids).delete()
+
+    @staticmethod
+    def rebuild(spec):
+        """Modelin tüm belgelerini baştan yazar, yazılan satır sayısını döndürür"""
+        with transaction.atomic():
+            SearchDocument.objects.filter(model_name=spec.name.lower()).delete()
+            written, batch = 0, []
+            for obj in spec.queryset().iterator(chunk_size=BATCH_SIZE):
+                batch.append(SearchDocument(model_name=spec.name.lower(), object_id=obj.pk, text=document_text(spec, obj)))
+                if len(batch) >= BATCH_SIZE:
+                    written += len(SearchDocument.objects.bulk_create(batch))
+                    batch = []
+            written += len(SearchDocument.objects.bulk_create(batch))
+        return written
+
+
+# Model → (bağımlı kayıt, ilişki yolu); ilişkili kaydın adı değişince bağımlıların metni de değişir
+DEPENDENTS = {}
+
+
+def get_path_model(model, path):
+    for name in path.split('__'):
+        model = model._meta.get_field(name).related_model
+    return model
+
+
+def indexed_object_saved(sender, instance, **kwargs):
+    spec = REGISTRY.get(sender.__name__.lower())
+    if spec is not None and spec.model is sender:
+        transaction.on_commit(lambda: SearchIndex.update(spec, [instance.pk]))
+
+
+def indexed_object_deleted(sender, instance, **kwargs):
+    spec = REGISTRY.get(sender.__name__.lower())
+    if spec is not None and spec.model is sender:
+        pk = instance.pk
+        transaction.on_commit(lambda: SearchIndex.remove(spec, [pk]))
+
+
+def related_object_saved(sender, instance, created=False, **kwargs):
+    """İlişkili kayıt güncellenince onu gösteren kayıtların belgelerini yeniler"""
+    if created:
+        return
+    for spec, path in DEPENDENTS.get(sender, ()):
+        def update(spec=spec, path=path):
+            ids = spec.model.objects.filter(**{path: instance.pk}).values_list('pk', flat=True)
+            SearchIndex.update(spec, list(ids))
+        transaction.on_commit(update)
+
+
+def connect_signals():
+    """Kayıtlı modellerin sinyallerini bağlar; TourConfig.ready içinden register_models sonrası çağrılır"""
+    for spec in REGISTRY.values():
+        post_save.connect(indexed_object_saved, sender=spec.model, dispatch_uid=f'search-save-{spec.name}')
+        post_delete.connect(indexed_object_deleted, sender=spec.model, dispatch_uid=f'search-delete-{spec.name}')
+        for path in spec.select_related:
+            model = get_path_model(spec.model, path)
+            dependents = DEPENDENTS.setdefault(model, [])
+            if (spec, path) not in dependents:
+                dependents.append((spec, path))
+            post_save.connect(related_object_saved, sender=model, dispatch_uid=f'search-related-{model.__name__}')
@@ -1,18 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache, caches
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, DateField, ExpressionWrapper, F, Prefetch, Sum
 from django.utils import timezone
+from django.utils.connection import ConnectionProxy
 from django.utils.translation import gettext_lazy as _
 from datetime import date, timedelta
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+import math
 import re
+import threading
+import time
+import uuid
 from .models import (
-    Operation, OperationDay, OperationCustomer,
+    Operation, OperationDay, OperationCustomer, OperationSalesPrice,
+    OperationItem, OperationSubItem, DispatchRow, OperationTotals,
     Hotel, HotelPriceHistory, Museum, MuseumPriceHistory,
-    VehicleCost, VehicleCostHistory, ActivityCost, ActivityCostHistory,
-    CustomUser
+    VehicleCost, VehicleCostHistory, VehicleType, ActivityCost, ActivityCostHistory,
+    CustomUser, Currency, ExchangeRate, PriceHistoryArchive, ReferenceCounter
 )
 import requests
 import random
 import string
 
+try:
+    import numpy as np
+except ImportError:  # NumPy yoksa kur dönüşümü saf Python ile yapılır
+    np = None
+
 class LoginService:
     @staticmethod
     def authenticate_user(username, password):
@@ -62,60 +80,905 @@ class LoginService:
         user.save()
         return user
 
+class ReferenceCounterService:
+    """
+    Operasyon referans numaralarını (kısa ad + GGAAYY + sıra) sayaç tablosundan
+    verir. Sayaç F() ile artırıldığı için eşzamanlı işlemler aynı numarayı alamaz;
+    her tahsis sabit sayıda sorgudur.
+    """
+
+    @staticmethod
+    def base(prefix, target_date):
+        return f"{prefix}{target_date.strftime('%d%m%y')}"
+
+    @classmethod
+    def seed(cls, prefix, target_date):
+        """Sayaç ilk kez açılırken mevcut operasyonlardaki en büyük sıra numarası"""
+        base = cls.base(prefix, target_date)
+        suffixes = [
+            reference[len(base):]
+            for reference in Operation.objects.filter(reference_number__startswith=base).values_list('reference_number', flat=True)
+        ]
+        return max((int(suffix) for suffix in suffixes if suffix.isdigit()), default=0)
+
+    @classmethod
+    def allocate(cls, prefix, target_date, count=1):
+        """count adet ardışık, benzersiz referans numarası döndürür (toplu içe aktarma için)"""
+        with transaction.atomic():
+            # Tohum değeri yalnızca sayaç ilk kez oluşturulurken hesaplanır
+            counter, _ = ReferenceCounter.objects.get_or_create(
+                prefix=prefix, date=target_date,
+                defaults={'last_value': lambda: cls.seed(prefix, target_date)}
+            )
+            ReferenceCounter.objects.filter(pk=counter.pk).update(last_value=F('last_value') + count)
+            counter.refresh_from_db(fields=['last_value'])
+        base = cls.base(prefix, target_date)
+        return [
+            f"{base}{str(value).zfill(3)}"
+            for value in range(counter.last_value - count + 1, counter.last_value + 1)
+        ]
+
 class OperationService:
     @staticmethod
     def generate_reference_number(buyer_company_short_name, start_date):
         """Benzersiz referans numarası oluşturur"""
-        tarih_format = start_date.strftime("%d%m%y")
-        tur_sayisi = 1
-        
-        while True:
-            potansiyel_referans = f"{buyer_company_short_name}{tarih_format}{str(tur_sayisi).zfill(3)}"
-            if not Operation.objects.filter(reference_number=potansiyel_referans).exists():
-                return potansiyel_referans
-            tur_sayisi += 1
+        return ReferenceCounterService.allocate(buyer_company_short_name, start_date)[0]
+
+    @staticmethod
+    def generate_reference_numbers(buyer_company_short_name, start_date, count):
+        """Toplu içe aktarma için tek seferde count adet referans numarası ayırır"""
+        return ReferenceCounterService.allocate(buyer_company_short_name, start_date, count)
 
     @staticmethod
     def update_operation_days(operation, is_new=False, old_start_date=None, old_end_date=None):
-        """Operasyon günlerini günceller"""
-        if is_new:
-            # Yeni kayıt için tüm günleri oluştur
+        """
+        Operasyon günlerini tarih aralığıyla eşitler: mevcut tarihler tek sorguda
+        okunur, eksikler tek bulk_create ile eklenir, aralık dışında kalanlar
+        alt ağaçlarıyla birlikte tek delete() ile silinir. Sorgu sayısı
+        operasyonun uzunluğundan bağımsızdır.
+        """
+        wanted_dates = {
+            operation.start_date + timedelta(days=x)
+            for x in range((operation.end_date - operation.start_date).days + 1)
+        }
+        existing_dates = set() if is_new else set(
+            OperationDay.objects.filter(operation=operation).values_list('date', flat=True)
+        )
+
+        missing_dates = sorted(wanted_dates - existing_dates)
+        if missing_dates:
             OperationDay.objects.bulk_create([
-                OperationDay(
-                    operation=operation,
-                    date=current_date,
-                    is_active=True
-                )
-                for current_date in [
-                    operation.start_date + timedelta(days=x)
-                    for x in range((operation.end_date - operation.start_date).days + 1)
-                ]
+                OperationDay(operation=operation, date=current_date, is_active=True)
+                for current_date in missing_dates
             ])
+        removed_dates = existing_dates - wanted_dates
+        if removed_dates:
+            OperationService.delete_days(operation.id, removed_dates)
+
+        # bulk_create sinyal göndermediği için önbellek sürümünü burada artır
+        OperationService.bump_version_on_commit(operation.id)
+
+    @staticmethod
+    def delete_days(operation_id, dates):
+        """
+        Günleri alt ağaçlarıyla birlikte siler. Ağaç sinyalleri susturulur ki
+        satır başına sürüm/toplam işi kuyruğa alınmasın; kalan günlerin
+        toplamları commit sonrası bir kez yeniden hesaplanır.
+        """
+        from .signals import tree_signals_muted
+
+        with transaction.atomic(), tree_signals_muted():
+            OperationDay.objects.filter(operation_id=operation_id, date__in=dates).delete()
+            transaction.on_commit(lambda: OperationFinanceService.rebuild([operation_id]))
+
+    @staticmethod
+    def bump_version_on_commit(operation_id):
+        """Sürümü hemen ve (transaction içindeysek) commit sonrasında tekrar artırır"""
+        from .signals import bump_operation_version
+        bump_operation_version(operation_id)
+
+    @staticmethod
+    def shift_date(field, delta):
+        return ExpressionWrapper(F(field) + delta, output_field=DateField())
+
+    @classmethod
+    def shift_operation(cls, operation, days):
+        """
+        Operasyonu tüm günleri, öğeleri ve alt öğeleriyle birlikte days gün kaydırır.
+        Günler silinip yeniden açılmaz; tarihler tablo başına tek UPDATE ile taşınır.
+        Referans numarası değişmez.
+        """
+        delta = timedelta(days=days)
+        with transaction.atomic():
+            Operation.objects.filter(pk=operation.pk).update(
+                start_date=cls.shift_date('start_date', delta),
+                end_date=cls.shift_date('end_date', delta)
+            )
+            OperationDay.objects.filter(operation=operation).update(date=cls.shift_date('date', delta))
+            OperationItem.objects.filter(operation=operation).update(date=cls.shift_date('date', delta))
+            OperationSubItem.objects.filter(operation=operation).update(date=cls.shift_date('date', delta))
+            DispatchRow.objects.filter(operation=operation).update(date=cls.shift_date('date', delta))
+            # update sinyal göndermediği için sürüm ve görev panosu burada, commit sonrası güncellenir
+            cls.bump_version_on_commit(operation.id)
+            transaction.on_commit(lambda: cls.publish_shifted(operation.id, delta))
+        operation.start_date += delta
+        operation.end_date += delta
+        return operation
+
+    @staticmethod
+    def publish_shifted(operation_id, delta):
+        """Kaydırılan kartları yeni günlerin panolarına ekler, eski günlerinkinden kaldırır"""
+        from .signals import publish_items_changed, publish_sub_items_changed
+        publish_items_changed(OperationItem.objects.filter(operation_id=operation_id).values('pk'), moved_by=delta)
+        publish_sub_items_changed(OperationSubItem.objects.filter(operation_id=operation_id).values('pk'), moved_by=delta)
+
+class OperationGraph:
+    """
+    Bir operasyonun tüm ağacını (gün → öğe → alt öğe → müze) sabit sayıda
+    sorguda yükler ve iç içe geçmiş olarak döndürür. Şablon ağacı doğrusal
+    olarak dolaşır: day.items.all → item.subitems.all → subitem.museums.all
+    """
+
+    ITEM_RELATED = (
+        'vehicle_type',
+        'vehicle_supplier',
+        'no_vehicle_tour__city',
+        'no_vehicle_activity',
+        'no_vehicle_guide',
+        'activity_supplier',
+        'sales_currency',
+        'cost_currency',
+    )
+    SUB_ITEM_RELATED = (
+        'tour__start_city',
+        'tour__end_city',
+        'transfer__start_city',
+        'transfer__end_city',
+        'hotel__city',
+        'guide',
+        'activity',
+        'activity_supplier',
+        'sales_currency',
+        'cost_currency',
+    )
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.customers = operation.customers.all()
+        self.sales_prices = operation.sales_prices.all()
+        self.days = operation.days.all()
+
+    @classmethod
+    def sub_item_queryset(cls):
+        """Alt öğeleri ilişkili kayıtları ve müzeleriyle birlikte döndürür"""
+        return OperationSubItem.objects.select_related(*cls.SUB_ITEM_RELATED).prefetch_related(
+            Prefetch('museums', queryset=Museum.objects.select_related('city'))
+        )
+
+    @classmethod
+    def item_queryset(cls):
+        """Öğeleri alt öğeleriyle birlikte döndürür"""
+        return OperationItem.objects.select_related(*cls.ITEM_RELATED).prefetch_related(
+            Prefetch('subitems', queryset=cls.sub_item_queryset())
+        )
+
+    @classmethod
+    def day_queryset(cls):
+        """Günleri öğe ağacıyla birlikte döndürür"""
+        return OperationDay.objects.prefetch_related(
+            Prefetch('items', queryset=cls.item_queryset())
+        )
+
+    @classmethod
+    def load(cls, operation_id):
+        """
+        Operasyonu 7 sorguda yükler: operasyon, müşteriler, satış fiyatları,
+        günler, öğeler, alt öğeler ve müzeler. Sorgu sayısı gün/öğe sayısından
+        bağımsızdır.
+        """
+        operation = Operation.objects.select_related(
+            'buyer_company',
+            'created_by',
+            'follow_by'
+        ).prefetch_related(
+            'customers',
+            Prefetch('sales_prices', queryset=OperationSalesPrice.objects.select_related('currency')),
+            Prefetch('days', queryset=cls.day_queryset())
+        ).get(pk=operation_id)
+        return cls(operation)
+
+    @classmethod
+    def load_day(cls, day_id):
+        """Tek bir günü öğe ağacıyla birlikte yükler (kısmi yanıtlar için)"""
+        return cls.day_queryset().select_related('operation').get(pk=day_id)
+
+    @classmethod
+    def load_item(cls, item_id):
+        """Tek bir öğeyi alt öğeleriyle birlikte yükler (kısmi yanıtlar için)"""
+        return cls.item_queryset().select_related('operation_day__operation').get(pk=item_id)
+
+    @staticmethod
+    def load_customers(operation_id):
+        """Operasyonu yalnızca müşterileriyle birlikte yükler"""
+        return Operation.objects.prefetch_related('customers').get(pk=operation_id)
+
+    @staticmethod
+    def load_sales_prices(operation_id):
+        """Operasyonu yalnızca satış fiyatlarıyla birlikte yükler"""
+        return Operation.objects.prefetch_related(
+            Prefetch('sales_prices', queryset=OperationSalesPrice.objects.select_related('currency'))
+        ).get(pk=operation_id)
+
+    def as_context(self):
+        """Şablon için bağlam sözlüğü döndürür"""
+        return {
+            'operation': self.operation,
+            'customers': self.customers,
+            'sales_prices': self.sales_prices,
+            'days': self.days,
+        }
+
+# Tüm süreçlerin aynı değeri görmesi gereken sürüm anahtarları (bkz. settings.CACHES)
+shared_cache = ConnectionProxy(caches, 'shared')
+
+
+def new_version():
+    """Daha önce verilmiş hiçbir sürümle çakışmayan sürüm değeri"""
+    return uuid.uuid4().hex
+
+class OperationCacheService:
+    """
+    Operasyon detay HTML'ini operasyon başına bir sürüm numarasıyla önbellekler.
+    Sürüm, operasyon ağacındaki her yazmada sinyallerle artırılır; eski
+    anahtarlar okunmaz ve zaman aşımıyla düşer. Sürümler tüm süreçlerin
+    gördüğü ortak önbellekte, HTML ise süreç belleğinde tutulur; bir süreçteki
+    yazma diğerlerinin parçalarını da geçersiz kılar.
+    """
+
+    VERSION_KEY = 'operation:{}:version'
+    DETAIL_KEY = 'operation:{}:detail:{}'
+    TIMEOUT = 60 * 60 * 6
+
+    @classmethod
+    def get_version(cls, operation_id):
+        """Operasyonun güncel sürüm numarasını döndürür"""
+        key = cls.VERSION_KEY.format(operation_id)
+        version = shared_cache.get(key)
+        if version is None:
+            # Sürüm anahtarı düşmüşse eski parçalarla çakışmayacak bir başlangıç değeri kullan
+            shared_cache.add(key, new_version(), None)
+            version = shared_cache.get(key)
+        return version
+
+    @classmethod
+    def get_versions(cls, operation_ids):
+        """Birden fazla operasyonun sürümlerini tek önbellek çağrısıyla döndürür"""
+        keys = {cls.VERSION_KEY.format(operation_id): operation_id for operation_id in operation_ids}
+        found = shared_cache.get_many(list(keys))
+        versions = {keys[key]: version for key, version in found.items()}
+        for key, operation_id in keys.items():
+            if operation_id not in versions:
+                versions[operation_id] = cls.get_version(operation_id)
+        return versions
+
+    @classmethod
+    def bump_version(cls, operation_id):
+        """Operasyona yeni bir sürüm verir, önbellekteki tüm parçaları geçersiz kılar"""
+        # incr DatabaseCache'te okuyup yazar ve eşzamanlı iki artış aynı değeri
+        # yazabilir; bu yüzden artırmak yerine her seferinde yeni bir değer yazılır
+        shared_cache.set(cls.VERSION_KEY.format(operation_id), new_version(), None)
+
+    @classmethod
+    def get_detail(cls, operation_id, version):
+        """Önbellekteki detay HTML'ini döndürür, yoksa None"""
+        return cache.get(cls.DETAIL_KEY.format(operation_id, version))
+
+    @classmethod
+    def set_detail(cls, operation_id, version, html):
+        """Detay HTML'ini verilen sürümle önbelleğe yazar"""
+        cache.set(cls.DETAIL_KEY.format(operation_id, version), html, cls.TIMEOUT)
+
+class DispatchService:
+    """
+    DispatchRow tablosunu kaynak tablolardan üretir. Satırlar her zaman
+    silinip yeniden yazılır; böylece güncelleme ve yeniden kurma aynı yoldan geçer.
+    """
+
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def text(value):
+        """İlişkili kaydı metne çevirir, boşsa boş metin döndürür"""
+        return str(value) if value else ''
+
+    @classmethod
+    def item_row(cls, item, day, operation):
+        """Bir öğe için sevk satırı oluşturur (kaydetmez)"""
+        if item.item_type == OperationItem.VEHICLE:
+            description = item.vehicle_type
+            supplier = item.vehicle_supplier
+        elif item.item_type == OperationItem.NO_VEHICLE_TOUR:
+            description = item.no_vehicle_tour
+            supplier = None
+        elif item.item_type == OperationItem.NO_VEHICLE_ACTIVITY:
+            description = item.no_vehicle_activity
+            supplier = item.activity_supplier
         else:
-            # Sadece değişen günleri güncelle
-            OperationDay.objects.filter(
-                operation=operation,
-                date__lt=min(old_start_date, operation.start_date)
-            ).delete()
-            
-            OperationDay.objects.filter(
-                operation=operation,
-                date__gt=max(old_end_date, operation.end_date)
-            ).delete()
-
-            # Yeni günleri ekle
-            current_date = operation.start_date
-            while current_date <= operation.end_date:
-                if not OperationDay.objects.filter(
-                    operation=operation,
-                    date=current_date
-                ).exists():
-                    OperationDay.objects.create(
-                        operation=operation,
-                        date=current_date,
-                        is_active=True
-                    )
-                current_date += timedelta(days=1)
+            description = item.no_vehicle_guide
+            supplier = None
+        return cls.base_row(item, day, operation,
+            operation_sub_item=None,
+            row_type=item.item_type,
+            description=cls.text(description),
+            supplier=cls.text(supplier),
+            guide=cls.text(item.no_vehicle_guide),
+            cost_price=item.cost_price,
+            cost_currency=item.cost_currency.code if item.cost_currency else '',
+            sales_price=item.sales_price,
+            sales_currency=item.sales_currency.code if item.sales_currency else '',
+        )
+
+    @classmethod
+    def sub_item_row(cls, sub_item, item, day, operation):
+        """Bir alt öğe için sevk satırı oluşturur; saat, yer ve şoför öğeden gelir"""
+        descriptions = {
+            OperationSubItem.TOUR: sub_item.tour,
+            OperationSubItem.TRANSFER: sub_item.transfer,
+            OperationSubItem.ACTIVITY: sub_item.activity,
+            OperationSubItem.HOTEL: sub_item.hotel,
+            OperationSubItem.GUIDE: sub_item.guide,
+            OperationSubItem.OTHER_PRICE: sub_item.other_price_description,
+        }
+        if sub_item.subitem_type == OperationSubItem.MUSEUM:
+            description = ', '.join(str(museum) for museum in sub_item.museums.all())
+        else:
+            description = cls.text(descriptions.get(sub_item.subitem_type))
+        return cls.base_row(item, day, operation,
+            operation_sub_item=sub_item,
+            row_type=sub_item.subitem_type,
+            description=description[:500],
+            supplier=cls.text(sub_item.activity_supplier),
+            guide=cls.text(sub_item.guide),
+            cost_price=sub_item.cost_price,
+            cost_currency=sub_item.cost_currency.code if sub_item.cost_currency else '',
+            sales_price=sub_item.sales_price,
+            sales_currency=sub_item.sales_currency.code if sub_item.sales_currency else '',
+        )
+
+    @classmethod
+    def base_row(cls, item, day, operation, **fields):
+        """Öğe, gün ve operasyondan gelen ortak alanlarla satırı oluşturur"""
+        return DispatchRow(
+            operation=operation,
+            operation_day=day,
+            operation_item=item,
+            date=day.date,
+            reference_number=operation.reference_number,
+            buyer_company=operation.buyer_company.name,
+            follow_by=operation.follow_by.get_full_name(),
+            pick_time=item.pick_time,
+            pick_up_location=item.pick_up_location or '',
+            drop_off_location=item.drop_off_location or '',
+            vehicle_type=cls.text(item.vehicle_type),
+            driver_name=item.driver_name or '',
+            driver_phone=item.driver_phone or '',
+            vehicle_plate_no=item.vehicle_plate_no or '',
+            **fields
+        )
+
+    @classmethod
+    def rows_for_item(cls, item, day, operation):
+        """Aktif öğe ve aktif alt öğeleri için satırları döndürür"""
+        if not (operation.is_active and day.is_active and item.is_active):
+            return []
+        rows = [cls.item_row(item, day, operation)]
+        rows.extend(
+            cls.sub_item_row(sub_item, item, day, operation)
+            for sub_item in item.subitems.all()
+            if sub_item.is_active
+        )
+        return rows
+
+    @classmethod
+    def rows_for_days(cls, days):
+        """Öğe ağacı önceden yüklenmiş günler için satırları döndürür"""
+        for day in days:
+            for item in day.items.all():
+                yield from cls.rows_for_item(item, day, day.operation)
+
+    @staticmethod
+    def day_queryset():
+        """Satır üretmek için gereken tüm ilişkilerle günler"""
+        return OperationGraph.day_queryset().select_related(
+            'operation__buyer_company',
+            'operation__follow_by'
+        )
+
+    @classmethod
+    def write(cls, rows):
+        DispatchRow.objects.bulk_create(rows, batch_size=cls.BATCH_SIZE)
+
+    @classmethod
+    def rebuild_days(cls, days):
+        """Verilen günlerin satırlarını silip yeniden yazar"""
+        days = cls.day_queryset().filter(pk__in=days.values('pk'))
+        DispatchRow.objects.filter(operation_day__in=days.values('pk')).delete()
+        cls.write(list(cls.rows_for_days(days)))
+
+    @classmethod
+    def rebuild_operation(cls, operation_id):
+        cls.rebuild_days(OperationDay.objects.filter(operation_id=operation_id))
+
+    @classmethod
+    def rebuild_day(cls, day_id):
+        cls.rebuild_days(OperationDay.objects.filter(pk=day_id))
+
+    @classmethod
+    def rebuild_item(cls, item_id):
+        cls.rebuild_items([item_id])
+
+    @classmethod
+    def rebuild_items(cls, item_ids):
+        """Öğelerin kendi satırlarını ve alt öğe satırlarını yeniden yazar"""
+        item_ids = list(item_ids)
+        if not item_ids:
+            return
+        DispatchRow.objects.filter(operation_item_id__in=item_ids).delete()
+        items = OperationGraph.item_queryset().select_related(
+            'operation_day__operation__buyer_company',
+            'operation_day__operation__follow_by'
+        ).filter(pk__in=item_ids)
+        cls.write([
+            row for item in items
+            for row in cls.rows_for_item(item, item.operation_day, item.operation_day.operation)
+        ])
+
+    @classmethod
+    def rebuild_sub_item(cls, sub_item_id):
+        cls.rebuild_sub_items([sub_item_id])
+
+    @classmethod
+    def rebuild_sub_items(cls, sub_item_ids):
+        """Yalnızca alt öğelerin kendi satırlarını yeniden yazar"""
+        sub_item_ids = list(sub_item_ids)
+        if not sub_item_ids:
+            return
+        DispatchRow.objects.filter(operation_sub_item_id__in=sub_item_ids).delete()
+        sub_items = OperationGraph.sub_item_queryset().select_related(
+            *('operation_item__' + related for related in OperationGraph.ITEM_RELATED),
+            'operation_item__operation_day__operation__buyer_company',
+            'operation_item__operation_day__operation__follow_by'
+        ).filter(pk__in=sub_item_ids, is_active=True)
+        rows = []
+        for sub_item in sub_items:
+            item = sub_item.operation_item
+            day = item.operation_day
+            operation = day.operation
+            if operation.is_active and day.is_active and item.is_active:
+                rows.append(cls.sub_item_row(sub_item, item, day, operation))
+        cls.write(rows)
+
+    @classmethod
+    def rebuild_range(cls, date_from=None, date_to=None):
+        """Tarih aralığındaki tüm satırları yeniden kurar, yazılan satır sayısını döndürür"""
+        days = OperationDay.objects.all()
+        if date_from:
+            days = days.filter(date__gte=date_from)
+        if date_to:
+            days = days.filter(date__lte=date_to)
+        rows = DispatchRow.objects.all()
+        if date_from:
+            rows = rows.filter(date__gte=date_from)
+        if date_to:
+            rows = rows.filter(date__lte=date_to)
+        rows.delete()
+        written = 0
+        batch = []
+        for row in cls.rows_for_days(cls.day_queryset().filter(pk__in=days.values('pk')).iterator(chunk_size=100)):
+            batch.append(row)
+            if len(batch) >= cls.BATCH_SIZE:
+                cls.write(batch)
+                written += len(batch)
+                batch = []
+        cls.write(batch)
+        return written + len(batch)
+
+class VersionedMemoryCache:
+    """
+    Süreç içi bellek tabloları için ortak sürüm kontrolü. Sürüm tüm süreçlerin
+    gördüğü ortak önbellekte tutulur; başka bir süreç sürümü değiştirdiğinde
+    tablo bir sonraki okumada rebuild ile yeniden kurulur. Alt sınıflar
+    VERSION_KEY, lock ve rebuild tanımlar.
+    """
+
+    VERSION_KEY = None
+    version = None
+
+    @classmethod
+    def get_version(cls):
+        version = shared_cache.get(cls.VERSION_KEY)
+        if version is None:
+            shared_cache.add(cls.VERSION_KEY, new_version(), None)
+            version = shared_cache.get(cls.VERSION_KEY)
+        return version
+
+    @classmethod
+    def bump_version(cls):
+        version = new_version()
+        shared_cache.set(cls.VERSION_KEY, version, None)
+        return version
+
+    @classmethod
+    def ensure_current(cls):
+        version = cls.get_version()
+        if cls.version != version:
+            with cls.lock:
+                if cls.version != version:
+                    cls.rebuild(version)
+
+    @classmethod
+    def invalidate(cls):
+        """Tüm süreçlerde tablonun yeniden kurulmasını sağlar"""
+        cls.bump_version()
+
+
+class VehicleCostMatrix(VersionedMemoryCache):
+    """
+    Araç maliyet geçmişini (tedarikçi, tur/transfer) anahtarıyla bellekte tutar.
+    Her anahtarın kayıtları başlangıç tarihine göre sıralıdır, tarih araması
+    bisect ile yapılır. Sürüm ortak önbellekte tutulur; başka bir süreç maliyet
+    değiştirdiğinde bu süreçteki matris bir sonraki aramada yeniden kurulur.
+    """
+
+    VERSION_KEY = 'vehicle_cost_matrix:version'
+    COST_COLUMNS = [column for column, _ in VehicleType.COST_COLUMN_CHOICES]
+
+    lock = threading.Lock()
+    entries = {}
+    keys_by_cost = {}
+    columns = {}
+
+    @staticmethod
+    def route_key(supplier_id, tour_id=None, transfer_id=None):
+        if tour_id:
+            return (supplier_id, 'tour', tour_id)
+        return (supplier_id, 'transfer', transfer_id)
+
+    @classmethod
+    def history_rows(cls, **filters):
+        """Aktif maliyetlerin aktif geçmiş kayıtlarını (anahtar, satır) olarak döndürür"""
+        histories = VehicleCostHistory.objects.filter(
+            is_active=True, vehicle_cost__is_active=True, **filters
+        ).order_by('valid_from', 'id').values(
+            'vehicle_cost_id', 'vehicle_cost__supplier_id', 'vehicle_cost__tour_id',
+            'vehicle_cost__transfer_id', 'currency_id', 'currency__code',
+            'valid_from', 'valid_until', *cls.COST_COLUMNS
+        )
+        for history in histories:
+            key = cls.route_key(
+                history['vehicle_cost__supplier_id'],
+                history['vehicle_cost__tour_id'],
+                history['vehicle_cost__transfer_id']
+            )
+            yield key, history
+
+    @staticmethod
+    def insert(entries, key, history):
+        starts, rows = entries.setdefault(key, ([], []))
+        index = bisect_right(starts, history['valid_from'])
+        starts.insert(index, history['valid_from'])
+        rows.insert(index, history)
+
+    @classmethod
+    def rebuild(cls, version):
+        """Matrisi tüm aktif geçmiş kayıtlarından yeniden kurar"""
+        entries = {}
+        keys_by_cost = {}
+        for key, history in cls.history_rows():
+            cls.insert(entries, key, history)
+            keys_by_cost[history['vehicle_cost_id']] = key
+        cls.columns = dict(VehicleType.objects.exclude(cost_column='').values_list('id', 'cost_column'))
+        cls.entries = entries
+        cls.keys_by_cost = keys_by_cost
+        cls.version = version
+
+    @classmethod
+    def refresh_vehicle_cost(cls, vehicle_cost_id):
+        """
+        Tek bir maliyetin satırlarını yeniden yükler. Matris güncel değilse
+        yalnızca sürümü artırır; tam kurulum ilk aramaya bırakılır.
+        """
+        with cls.lock:
+            current = cls.version is not None and cls.version == cls.get_version()
+            version = cls.bump_version()
+            if not current:
+                return
+            old_key = cls.keys_by_cost.pop(vehicle_cost_id, None)
+            if old_key in cls.entries:
+                starts, rows = cls.entries[old_key]
+                kept = [row for row in rows if row['vehicle_cost_id'] != vehicle_cost_id]
+                cls.entries[old_key] = ([row['valid_from'] for row in kept], kept)
+            # Okuyan iş parçacıkları yarım liste görmesin diye anahtarın listeleri kopyalanır
+            for key, history in cls.history_rows(vehicle_cost_id=vehicle_cost_id):
+                starts, rows = cls.entries.get(key, ((), ()))
+                cls.entries[key] = (list(starts), list(rows))
+                cls.insert(cls.entries, key, history)
+                cls.keys_by_cost[vehicle_cost_id] = key
+            cls.version = version
+
+    @staticmethod
+    def valid_row(entry, column, target_date):
+        """Anahtarın kayıtlarından tarihi kapsayan ve sütunu dolu olan en son başlayanı"""
+        starts, rows = entry
+        for index in range(bisect_right(starts, target_date) - 1, -1, -1):
+            row = rows[index]
+            if row['valid_until'] >= target_date and row[column] is not None:
+                return row
+        return None
+
+    @classmethod
+    def lookup(cls, supplier_id, vehicle_type_id, target_date, tour_id=None, transfer_id=None):
+        """
+        Tarihte geçerli maliyeti döndürür: cost_price, cost_currency, currency_code
+        ve vehicle_cost. Güzergah verilmezse (yeni öğe) tedarikçinin tüm
+        güzergahlarına bakılır ve hepsinde aynı maliyet geçerliyse o döndürülür.
+        Eşleşme yoksa ya da güzergahlar farklı maliyet veriyorsa None.
+        """
+        cls.ensure_current()
+        column = cls.columns.get(vehicle_type_id)
+        if not column:
+            return None
+        if tour_id or transfer_id:
+            rows = [cls.valid_row(
+                cls.entries.get(cls.route_key(supplier_id, tour_id, transfer_id), ((), ())), column, target_date
+            )]
+        else:
+            rows = [
+                cls.valid_row(entry, column, target_date)
+                for key, entry in list(cls.entries.items()) if key[0] == supplier_id
+            ]
+        rows = [row for row in rows if row is not None]
+        if len({(row[column], row['currency_id']) for row in rows}) != 1:
+            return None
+        row = rows[0]
+        return {
+            'cost_price': row[column],
+            'cost_currency': row['currency_id'],
+            'currency_code': row['currency__code'],
+            # Aynı maliyet birden çok güzergahtan geliyorsa hangisi olduğu belli değil
+            'vehicle_cost': row['vehicle_cost_id'] if len(rows) == 1 else None,
+        }
+
+class CurrencyConverter(VersionedMemoryCache):
+    """
+    Döviz kurlarını para birimi başına tarihe göre sıralı dizilerde tutar ve
+    (tutar, para birimi id, tarih) listelerini toplu olarak dönüştürür. Bir
+    tarihte kur yoksa o tarihten önceki son kur kullanılır. Kurlar ana para
+    birimi (BASE_CURRENCY, varsayılan TRY) cinsindendir; NumPy kuruluysa
+    dönüşüm vektörel yapılır.
+    """
+
+    VERSION_KEY = 'exchange_rates:version'
+    CENT = Decimal('0.01')
+
+    lock = threading.Lock()
+    codes = {}
+    dates = {}
+    rates = {}
+
+    @classmethod
+    def rebuild(cls, version):
+        dates = defaultdict(list)
+        rates = defaultdict(list)
+        for currency_id, day, rate in ExchangeRate.objects.order_by('currency_id', 'date').values_list(
+            'currency_id', 'date', 'rate'
+        ):
+            dates[currency_id].append(day.toordinal())
+            rates[currency_id].append(float(rate))
+        if np is not None:
+            dates = {currency_id: np.array(values, dtype=np.int64) for currency_id, values in dates.items()}
+            rates = {currency_id: np.array(values, dtype=np.float64) for currency_id, values in rates.items()}
+        cls.codes = dict(Currency.objects.values_list('code', 'id'))
+        cls.dates = dict(dates)
+        cls.rates = dict(rates)
+        cls.version = version
+
+    @classmethod
+    def base_currency_id(cls):
+        return cls.codes.get(getattr(settings, 'BASE_CURRENCY', 'TRY'))
+
+    @classmethod
+    def rate_for(cls, currency_id, ordinal):
+        """Tek bir para biriminin gündeki kuru; bulunamazsa None"""
+        if currency_id == cls.base_currency_id():
+            return 1.0
+        dates = cls.dates.get(currency_id)
+        if dates is None:
+            return None
+        index = bisect_right(dates, ordinal) - 1
+        return float(cls.rates[currency_id][index]) if index >= 0 else None
+
+    @classmethod
+    def rates_for(cls, currency_ids, ordinals):
+        """NumPy dizileri için kurlar; bulunamayanlar NaN"""
+        result = np.full(len(ordinals), np.nan)
+        base_id = cls.base_currency_id()
+        for currency_id in set(currency_ids.tolist()):
+            mask = currency_ids == currency_id
+            if currency_id == base_id:
+                result[mask] = 1.0
+                continue
+            dates = cls.dates.get(currency_id)
+            if dates is None:
+                continue
+            index = np.searchsorted(dates, ordinals[mask], side='right') - 1
+            found = index >= 0
+            values = np.full(len(index), np.nan)
+            values[found] = cls.rates[currency_id][index[found]]
+            result[mask] = values
+        return result
+
+    @classmethod
+    def convert_many(cls, rows, target='TRY'):
+        """
+        rows: (tutar, para birimi id, tarih) demetleri. Hedef para birimi koduna
+        çevrilmiş Decimal listesi döndürür; kuru bulunamayan satırlar None olur.
+        """
+        cls.ensure_current()
+        rows = list(rows)
+        target_id = cls.codes.get(target)
+        if target_id is None:
+            return [None] * len(rows)
+        if np is not None and rows:
+            amounts = np.array([np.nan if amount is None else float(amount) for amount, _, _ in rows])
+            currency_ids = np.array([-1 if currency_id is None else currency_id for _, currency_id, _ in rows], dtype=np.int64)
+            ordinals = np.array([day.toordinal() for _, _, day in rows], dtype=np.int64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = (amounts * cls.rates_for(currency_ids, ordinals)
+                          / cls.rates_for(np.full(len(rows), target_id, dtype=np.int64), ordinals)).tolist()
+        else:
+            values = []
+            for amount, currency_id, day in rows:
+                source = cls.rate_for(currency_id, day.toordinal())
+                target_rate = cls.rate_for(target_id, day.toordinal())
+                if amount is None or source is None or not target_rate:
+                    values.append(None)
+                else:
+                    values.append(float(amount) * source / target_rate)
+        return [
+            Decimal(value).quantize(cls.CENT) if value is not None and math.isfinite(value) else None
+            for value in values
+        ]
+
+    @classmethod
+    def convert(cls, amount, currency_id, day, target='TRY'):
+        return cls.convert_many([(amount, currency_id, day)], target)[0]
+
+class PriceResolver:
+    """
+    Çok sayıda (model, id, tarih) fiyat sorgusunu toplu çözer: her geçmiş
+    tablosuna tek sorgu atılır. Sonuçlar get_price_for_date ile aynıdır;
+    kayıt yoksa None döner.
+
+        resolver = PriceResolver()
+        resolver.add(Hotel, hotel_id, day.date)
+        prices = resolver.resolve()
+        prices[(Hotel, hotel_id, day.date)]
+    """
+
+    # model: (geçmiş modeli, yabancı anahtar, yalnızca aktif kayıtlar mı)
+    HISTORY = {
+        Hotel: (HotelPriceHistory, 'hotel', False),
+        Museum: (MuseumPriceHistory, 'museum', False),
+        VehicleCost: (VehicleCostHistory, 'vehicle_cost', True),
+        ActivityCost: (ActivityCostHistory, 'activity_cost', True),
+    }
+
+    def __init__(self):
+        self.lookups = defaultdict(set)
+
+    def add(self, model, pk, target_date):
+        if pk is not None and target_date is not None:
+            self.lookups[model].add((pk, target_date))
+
+    def resolve(self):
+        """Tüm sorguları çözer ve {(model, id, tarih): geçmiş kaydı veya None} döndürür"""
+        prices = {}
+        for model, lookups in self.lookups.items():
+            history_model, field, active_only = self.HISTORY[model]
+            dates = [target_date for _, target_date in lookups]
+            histories = history_model.objects.filter(**{
+                f'{field}_id__in': {pk for pk, _ in lookups},
+                'valid_from__lte': max(dates),
+                'valid_until__gte': min(dates),
+            })
+            if active_only:
+                histories = histories.filter(is_active=True)
+            # get_price_for_date ile aynı sıra: en yeni başlangıç önce
+            by_owner = defaultdict(list)
+            for history in histories.order_by('-valid_from', '-id'):
+                by_owner[getattr(history, f'{field}_id')].append(history)
+            for pk, target_date in lookups:
+                prices[(model, pk, target_date)] = next((
+                    history for history in by_owner[pk]
+                    if history.valid_from <= target_date <= history.valid_until
+                ), None)
+        return prices
+
+    @classmethod
+    def for_days(cls, days):
+        """
+        Öğe ağacı yüklenmiş günlerdeki (bkz. OperationGraph) tüm otel, müze,
+        araç ve aktivite fiyatlarını gün tarihine göre çözer
+        """
+        resolver = cls()
+        for day in days:
+            for item in day.items.all():
+                resolver.add(VehicleCost, item.vehicle_cost_id, day.date)
+                resolver.add(ActivityCost, item.activity_cost_id, day.date)
+                for sub_item in item.subitems.all():
+                    resolver.add(Hotel, sub_item.hotel_id, day.date)
+                    resolver.add(ActivityCost, sub_item.activity_cost_id, day.date)
+                    for museum in sub_item.museums.all():
+                        resolver.add(Museum, museum.id, day.date)
+        return resolver.resolve()
+
+class OperationFinanceService:
+    """
+    Operasyonların para birimi başına gelir, maliyet ve kârını SQL toplamlarıyla
+    hesaplar. Operasyon sayısından bağımsız olarak 5 sorgu atılır; sonuçlar
+    OperationTotals tablosuna yazılır.
+    """
+
+    @staticmethod
+    def sums(queryset, operation, currency, amount):
+        """(operasyon, para birimi) başına toplam tutarları döndürür"""
+        return queryset.filter(**{f'{amount}__isnull': False, f'{currency}__isnull': False}).values(
+            operation_key=F(operation), currency_key=F(currency)
+        ).annotate(total=Sum(amount)).values_list('operation_key', 'currency_key', 'total')
+
+    @classmethod
+    def compute(cls, operation_ids):
+        """{operasyon id: {para birimi id: [gelir, maliyet]}} döndürür"""
+        sales_prices = OperationSalesPrice.objects.filter(operation_id__in=operation_ids, is_active=True)
+        items = OperationItem.objects.filter(
+            operation_id__in=operation_ids,
+            operation_day__is_active=True,
+            is_active=True
+        )
+        sub_items = OperationSubItem.objects.filter(
+            operation_id__in=operation_ids,
+            operation_item__operation_day__is_active=True,
+            operation_item__is_active=True,
+            is_active=True
+        )
+        revenue = [
+            cls.sums(sales_prices, 'operation_id', 'currency_id', 'price'),
+            cls.sums(items, 'operation_id', 'sales_currency_id', 'sales_price'),
+            cls.sums(sub_items, 'operation_id', 'sales_currency_id', 'sales_price'),
+        ]
+        cost = [
+            cls.sums(items, 'operation_id', 'cost_currency_id', 'cost_price'),
+            cls.sums(sub_items, 'operation_id', 'cost_currency_id', 'cost_price'),
+        ]
+        totals = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for column, queries in enumerate((revenue, cost)):
+            for query in queries:
+                for operation_id, currency_id, total in query:
+                    totals[operation_id][currency_id][column] += total
+        return totals
+
+    @classmethod
+    def rebuild(cls, operation_ids):
+        """Verilen operasyonların toplam satırlarını yeniden yazar"""
+        operation_ids = list(operation_ids)
+        totals = cls.compute(operation_ids)
+        OperationTotals.objects.filter(operation_id__in=operation_ids).delete()
+        OperationTotals.objects.bulk_create(
+            OperationTotals(operation_id=operation_id, currency_id=currency_id, revenue=revenue, cost=cost)
+            for operation_id, currencies in totals.items()
+            for currency_id, (revenue, cost) in currencies.items()
+        )
 
 class CustomerService:
     @staticmethod
@@ -144,16 +1007,161 @@ class CustomerService:
 
 
 
+    # Müşteri tipine göre operasyondaki sayaç alanı
+    PAX_FIELDS = {
+        OperationCustomer.ADULT: 'adult_pax',
+        OperationCustomer.CHILD: 'child_pax',
+        OperationCustomer.INFANT: 'infant_pax',
+    }
+
+    @classmethod
+    def apply_pax_deltas(cls, deltas):
+        """{operasyon id: {alan: fark}} farklarını operasyon başına tek UPDATE ile uygular"""
+        for operation_id, fields in deltas.items():
+            fields = {field: delta for field, delta in fields.items() if delta}
+            if fields:
+                Operation.objects.filter(pk=operation_id).update(
+                    **{field: F(field) + delta for field, delta in fields.items()}
+                )
+
+    @classmethod
+    def add_pax_delta(cls, deltas, key, sign):
+        operation_id, customer_type, is_active = key
+        if not is_active:
+            return
+        deltas[operation_id]['total_pax'] += sign
+        if customer_type in cls.PAX_FIELDS:
+            deltas[operation_id][cls.PAX_FIELDS[customer_type]] += sign
+
+    @classmethod
+    def change_pax_counters(cls, old_key, new_key):
+        """
+        Bir müşterinin eski ve yeni (operasyon, tip, aktiflik) durumuna göre
+        sayaçları günceller; None eklenme/silinme anlamına gelir
+        """
+        deltas = defaultdict(lambda: defaultdict(int))
+        if old_key is not None:
+            cls.add_pax_delta(deltas, old_key, -1)
+        if new_key is not None:
+            cls.add_pax_delta(deltas, new_key, 1)
+        cls.apply_pax_deltas(deltas)
+
+    @classmethod
+    def bulk_create_customers(cls, customers, batch_size=500):
+        """Toplu müşteri içe aktarma: kayıtlar ve sayaçlar operasyon başına tek seferde yazılır"""
+        customers = list(customers)
+        deltas = defaultdict(lambda: defaultdict(int))
+        for customer in customers:
+            customer.clean()
+            cls.add_pax_delta(deltas, customer.get_pax_key(), 1)
+        with transaction.atomic():
+            created = OperationCustomer.objects.bulk_create(customers, batch_size=batch_size)
+            cls.apply_pax_deltas(deltas)
+        # bulk_create sinyal göndermediği için önbellek sürümünü burada artır
+        for operation_id in deltas:
+            OperationCacheService.bump_version(operation_id)
+        return created
+
+    @classmethod
+    def recount_pax(cls, operation_ids):
+        """Sayaçları aktif müşterilerden yeniden hesaplar (toplu durum değişiklikleri için)"""
+        counts = {operation_id: dict.fromkeys(('total_pax', *cls.PAX_FIELDS.values()), 0) for operation_id in operation_ids}
+        for operation_id, customer_type, total in OperationCustomer.objects.filter(
+            operation_id__in=counts, is_active=True
+        ).values_list('operation_id', 'customer_type').annotate(total=Count('id')).order_by():
+            counts[operation_id]['total_pax'] += total
+            if customer_type in cls.PAX_FIELDS:
+                counts[operation_id][cls.PAX_FIELDS[customer_type]] = total
+        for operation_id, fields in counts.items():
+            Operation.objects.filter(pk=operation_id).update(**fields)
+
+    @classmethod
+    def update_operation_total_pax(cls, operation):
+        """Operasyon kişi sayaçlarını tam sayımla günceller"""
+        cls.recount_pax([operation.pk])
+        operation.refresh_from_db(fields=['total_pax', *cls.PAX_FIELDS.values()])
+
+class SoftDeleteService:
+    """
+    is_active bayrağını bir kaydın tüm alt ağacına yayar. Her seviye tek UPDATE
+    ile güncellenir (öğe ve alt öğeler operasyon kopyası sayesinde join'siz);
+    kaç kök verilirse verilsin statement sayısı sabittir.
+    """
+
+    # Kök model → (güncellenecek model, kök id'lerine göre filtre) listesi
+    TREE = {
+        Operation: [
+            (Operation, 'pk'),
+            (OperationCustomer, 'operation_id'),
+            (OperationSalesPrice, 'operation_id'),
+            (OperationDay, 'operation_id'),
+            (OperationItem, 'operation_id'),
+            (OperationSubItem, 'operation_id'),
+        ],
+        OperationDay: [
+            (OperationDay, 'pk'),
+            (OperationItem, 'operation_day_id'),
+            (OperationSubItem, 'operation_item__operation_day_id'),
+        ],
+        OperationItem: [
+            (OperationItem, 'pk'),
+            (OperationSubItem, 'operation_item_id'),
+        ],
+        OperationSubItem: [(OperationSubItem, 'pk')],
+        OperationCustomer: [(OperationCustomer, 'pk')],
+        OperationSalesPrice: [(OperationSalesPrice, 'pk')],
+    }
+
+    # Kök adresleri ve toplu işlem parametresi için kısa adlar
+    MODELS = {
+        'operation': Operation,
+        'day': OperationDay,
+        'item': OperationItem,
+        'sub_item': OperationSubItem,
+        'customer': OperationCustomer,
+        'sales_price': OperationSalesPrice,
+    }
+
     @staticmethod
-    def update_operation_total_pax(operation):
-        """Operasyon toplam kişi sayısını günceller"""
-        active_customers = OperationCustomer.objects.filter(
-            operation=operation,
-            is_active=True
-        ).count()
+    def operation_ids(model, ids):
+        if model is Operation:
+            return set(ids)
+        return set(model.objects.filter(pk__in=ids).values_list('operation_id', flat=True))
 
-        operation.total_pax = active_customers
-        operation.save(update_fields=['total_pax'])
+    @classmethod
+    def set_active(cls, root, flag):
+        """Tek bir kaydı alt ağacıyla birlikte aktif/pasif yapar"""
+        counts = cls.set_active_many(type(root), [root.pk], flag)
+        root.is_active = flag
+        return counts
+
+    @classmethod
+    def set_active_many(cls, model, ids, flag, operation_ids=None):
+        """
+        Aynı modelden birden çok kökü alt ağaçlarıyla birlikte günceller ve
+        {model adı: etkilenen satır sayısı} döndürür. Köklerin operasyonları
+        biliniyorsa operation_ids ile verilerek bir sorgu atlanabilir.
+        """
+        ids = list(ids)
+        now = timezone.now()
+        counts = {}
+        with transaction.atomic():
+            if operation_ids is None:
+                operation_ids = cls.operation_ids(model, ids)
+            for target, lookup in cls.TREE[model]:
+                counts[target._meta.model_name] = target.objects.filter(**{f'{lookup}__in': ids}).update(
+                    is_active=flag, updated_at=now
+                )
+            # update sinyal çalıştırmaz: sayaçlar, toplamlar, sevk satırları ve önbellek burada yenilenir
+            if 'operationcustomer' in counts:
+                CustomerService.recount_pax(operation_ids)
+            transaction.on_commit(lambda: OperationFinanceService.rebuild(operation_ids))
+            transaction.on_commit(lambda: DispatchService.rebuild_days(
+                OperationDay.objects.filter(operation_id__in=operation_ids)
+            ))
+        for operation_id in operation_ids:
+            OperationCacheService.bump_version(operation_id)
+        return counts
 
 class PriceHistoryService:
     @staticmethod
@@ -297,6 +1305,172 @@ class PriceHistoryService:
                 price=activity_cost.price
             ) 
 
+class RepricingService:
+    """
+    Fiyatları toplu günceller: kayıtlar tek bulk_update ile yazılır, açık geçmiş
+    aralıkları tablo başına tek UPDATE ile kapatılır ve yeni geçmiş satırları
+    bulk_create ile eklenir. Yalnızca geçerlilik tarihi değişen kayıtlarda yeni
+    aralık açılmaz, açık aralık yerinde uzatılır. Model.save ve sinyaller çalışmaz.
+    """
+
+    # ad: (model, geçmiş modeli, yabancı anahtar, fiyat alanları)
+    MODELS = {
+        'hotel': (Hotel, HotelPriceHistory, 'hotel', ['single_price', 'double_price', 'triple_price']),
+        'museum': (Museum, MuseumPriceHistory, 'museum', ['local_price', 'foreign_price']),
+        'vehicle_cost': (VehicleCost, VehicleCostHistory, 'vehicle_cost',
+                         ['car_cost', 'minivan_cost', 'minibus_cost', 'midibus_cost', 'bus_cost']),
+        'activity_cost': (ActivityCost, ActivityCostHistory, 'activity_cost', ['price']),
+    }
+    BATCH_SIZE = 500
+    CENT = Decimal('0.01')
+
+    @classmethod
+    def adjust(cls, value, percent=None, amount=None):
+        """Fiyata yüzde ve/veya sabit tutar ekler"""
+        if value is None:
+            return None
+        if percent is not None:
+            value = value * (1 + Decimal(percent) / 100)
+        if amount is not None:
+            value = value + Decimal(amount)
+        return max(value, Decimal('0')).quantize(cls.CENT)
+
+    @classmethod
+    def reprice(cls, name, queryset=None, percent=None, amount=None, prices=None, fields=None, valid_until=None):
+        """
+        Seçilen kayıtların fiyatlarını değiştirir ve değişen kayıt sayısını döndürür.
+        prices verilirse ({id: {alan: fiyat}}, ör. CSV'den) yalnızca o kayıtlara
+        bu değerler yazılır; aksi halde percent/amount seçili alanlara uygulanır.
+        """
+        model, history_model, field, price_fields = cls.MODELS[name]
+        fields = fields or price_fields
+        unknown = set(fields) - set(price_fields)
+        if unknown:
+            raise ValidationError(_("Geçersiz fiyat alanı: %s") % ', '.join(sorted(unknown)))
+        if queryset is None:
+            queryset = model.objects.all()
+        if prices is not None:
+            queryset = queryset.filter(pk__in=prices)
+
+        today = timezone.now().date()
+        now = timezone.now()
+        # Fiyatı değişenler için geçmiş aralığı kapatılıp yenisi açılır; yalnızca
+        # geçerlilik tarihi değişenlerin açık aralığı yerinde uzatılır
+        repriced, extended = [], []
+        for obj in queryset:
+            new_prices = prices.get(obj.pk, {}) if prices is not None else {
+                price_field: cls.adjust(getattr(obj, price_field), percent, amount)
+                for price_field in fields
+            }
+            updates = {
+                price_field: value for price_field, value in new_prices.items()
+                if price_field in fields and value is not None and value != getattr(obj, price_field)
+            }
+            extend = valid_until is not None and valid_until != obj.valid_until
+            if not updates and not extend:
+                continue
+            for price_field, value in updates.items():
+                setattr(obj, price_field, value)
+            if valid_until is not None:
+                obj.valid_until = valid_until
+            obj.updated_at = now
+            (repriced if updates else extended).append(obj)
+
+        if not repriced and not extended:
+            return 0
+        with transaction.atomic():
+            if extended:
+                model.objects.filter(pk__in=[obj.pk for obj in extended]).update(
+                    valid_until=valid_until, updated_at=now
+                )
+                history_model.objects.filter(**{
+                    f'{field}__in': extended, 'valid_until__gte': today
+                }).update(valid_until=valid_until)
+            if repriced:
+                model.objects.bulk_update(repriced, [*fields, 'valid_until', 'updated_at'], batch_size=cls.BATCH_SIZE)
+                history_model.objects.filter(**{
+                    f'{field}__in': repriced, 'valid_until__gte': today
+                }).update(valid_until=today)
+                history_model.objects.bulk_create([
+                    history_model(**{
+                        field: obj,
+                        'currency_id': obj.currency_id,
+                        'valid_from': today,
+                        'valid_until': obj.valid_until,
+                        **{price_field: getattr(obj, price_field) for price_field in price_fields},
+                    })
+                    for obj in repriced
+                ], batch_size=cls.BATCH_SIZE)
+            if model is VehicleCost:
+                # bulk işlemler sinyal tetiklemez; matris commit sonrası yeniden kurulur
+                transaction.on_commit(VehicleCostMatrix.invalidate)
+        return len(repriced) + len(extended)
+
+class PriceHistoryMaintenanceService:
+    """
+    Fiyat geçmişi tablolarını küçük tutar: aynı fiyatlı ardışık aralıkları
+    birleştirir ve ufku geçmiş aralıkları PriceHistoryArchive tablosuna taşır.
+    """
+
+    BATCH_SIZE = 500
+
+    @classmethod
+    def compact(cls, name):
+        """
+        Sahip başına başlangıç tarihine göre sıralı kayıtlarda, fiyatı, para birimi
+        ve durumu aynı olan bitişik ya da çakışan aralıkları tek aralığa indirir.
+        Silinen kayıt sayısını döndürür.
+        """
+        _, history_model, field, price_fields = RepricingService.MODELS[name]
+        owner_field = f'{field}_id'
+        same_fields = ['currency_id', 'is_active', *price_fields]
+        extended = {}
+        merged_ids = []
+        current = None
+        for history in history_model.objects.order_by(owner_field, 'valid_from', 'id').iterator(chunk_size=2000):
+            if (current is not None
+                    and getattr(history, owner_field) == getattr(current, owner_field)
+                    and all(getattr(history, attr) == getattr(current, attr) for attr in same_fields)
+                    and history.valid_from <= current.valid_until + timedelta(days=1)):
+                if history.valid_until > current.valid_until:
+                    current.valid_until = history.valid_until
+                    extended[current.pk] = current
+                merged_ids.append(history.pk)
+                continue
+            current = history
+
+        with transaction.atomic():
+            history_model.objects.bulk_update(extended.values(), ['valid_until'], batch_size=cls.BATCH_SIZE)
+            for start in range(0, len(merged_ids), cls.BATCH_SIZE):
+                history_model.objects.filter(pk__in=merged_ids[start:start + cls.BATCH_SIZE]).delete()
+        return len(merged_ids)
+
+    @classmethod
+    def archive(cls, name, before):
+        """Bitişi verilen tarihten önce olan aralıkları arşive taşır, taşınan sayıyı döndürür"""
+        _, history_model, field, price_fields = RepricingService.MODELS[name]
+        archived = 0
+        while True:
+            batch = list(history_model.objects.filter(valid_until__lt=before).select_related('currency').order_by('id')[:cls.BATCH_SIZE])
+            if not batch:
+                return archived
+            with transaction.atomic():
+                PriceHistoryArchive.objects.bulk_create([
+                    PriceHistoryArchive(
+                        model_name=name,
+                        owner_id=getattr(history, f'{field}_id'),
+                        currency_code=history.currency.code,
+                        valid_from=history.valid_from,
+                        valid_until=history.valid_until,
+                        prices={price_field: str(getattr(history, price_field)) for price_field in price_fields},
+                        is_active=history.is_active,
+                        created_at=history.created_at,
+                    )
+                    for history in batch
+                ])
+                history_model.objects.filter(pk__in=[history.pk for history in batch]).delete()
+            archived += len(batch)
+
 def sms(phone, mesaj):
     url = "https://api.netgsm.com.tr/sms/send/xml"
     headers = {'Content-Type': 'application/xml'}
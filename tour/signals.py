@@ -0,0 +1,354 @@
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.urls import reverse
+
+from .models import (
+    Operation, OperationCustomer, OperationSalesPrice,
+    OperationDay, OperationItem, OperationSubItem,
+    VehicleCost, VehicleCostHistory, VehicleType, Currency, ExchangeRate
+)
+from .events import publish_jobs_event
+from .services import (
+    CurrencyConverter, DispatchService, OperationCacheService, OperationFinanceService, VehicleCostMatrix
+)
+
+
+def get_operation_id(instance):
+    """Değişen kaydın bağlı olduğu operasyonun id'sini döndürür"""
+    if isinstance(instance, Operation):
+        return instance.pk
+    if isinstance(instance, (OperationCustomer, OperationSalesPrice, OperationDay)):
+        return instance.operation_id
+    if isinstance(instance, (OperationItem, OperationSubItem)) and instance.operation_id is not None:
+        return instance.operation_id
+    if isinstance(instance, OperationItem):
+        # İlişki zaten yüklüyse ekstra sorgu atma
+        if OperationItem.operation_day.is_cached(instance):
+            return instance.operation_day.operation_id
+        return OperationDay.objects.filter(
+            pk=instance.operation_day_id
+        ).values_list('operation_id', flat=True).first()
+    if isinstance(instance, OperationSubItem):
+        if OperationSubItem.operation_item.is_cached(instance):
+            return get_operation_id(instance.operation_item)
+        return OperationItem.objects.filter(
+            pk=instance.operation_item_id
+        ).values_list('operation_day__operation_id', flat=True).first()
+    return None
+
+
+class PendingKeys:
+    """
+    Bir transaction'da kuyruğa alınmış anahtarlar. Nesneyi yalnızca kaydedildiği
+    on_commit listesi tutar: commit'te çağrılıp temizlenir, rollback'te Django
+    listeyi boşaltınca nesne de bırakılır.
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.keys = set()
+        self.skipped = set()
+
+    def __call__(self):
+        self.batch.flush(self)
+
+
+class CommitBatch:
+    """
+    Transaction boyunca biriken anahtarları commit sonrası tek çağrıda işler.
+    Aynı operasyon/gün/öğe için satır başına tekrar tekrar iş kuyruğa alınmaz;
+    transaction başına yalnızca bir on_commit kaydedilir. Bekleyen anahtarlara
+    iş parçacığına özel zayıf referansla ulaşılır; geri alınan transaction'ın
+    kaydı bırakıldığında referans da düşer ve sonraki yazma yeni kayıt açar.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.local = threading.local()
+
+    def pending(self):
+        """Açık transaction'ın bekleyen anahtarlarını döndürür, yoksa kaydeder"""
+        ref = getattr(self.local, 'pending', None)
+        pending = ref() if ref is not None else None
+        if pending is None:
+            pending = PendingKeys(self)
+            self.local.pending = weakref.ref(pending)
+            # Bir işleyicinin hatası diğer commit işlerini (sürüm, sevk) engellemez
+            transaction.on_commit(pending, robust=True)
+        return pending
+
+    def add(self, key):
+        """Anahtarı ekler; bu transaction'da ilk kez eklendiyse True döndürür"""
+        if not transaction.get_connection().in_atomic_block:
+            self.handler({key})
+            return True
+        pending = self.pending()
+        if key in pending.keys or key in pending.skipped:
+            return False
+        pending.keys.add(key)
+        return True
+
+    def skip(self, key):
+        """Anahtarı bu transaction'ın geri kalanında yok sayar (ör. operasyonun kendisi siliniyorsa)"""
+        if not transaction.get_connection().in_atomic_block:
+            return
+        pending = self.pending()
+        pending.keys.discard(key)
+        pending.skipped.add(key)
+
+    def flush(self, pending):
+        ref = getattr(self.local, 'pending', None)
+        if ref is not None and ref() is pending:
+            del self.local.pending
+        if pending.keys:
+            self.handler(pending.keys)
+
+
+def bump_versions(operation_ids):
+    for operation_id in operation_ids:
+        OperationCacheService.bump_version(operation_id)
+
+
+# Commit sonrası sürüm artırma ve toplamların yeniden hesaplanması operasyon başına bir kez
+version_batch = CommitBatch(bump_versions)
+finance_batch = CommitBatch(lambda operation_ids: OperationFinanceService.rebuild(operation_ids))
+
+# Gelir/maliyet toplamlarını etkileyen modeller
+FINANCE_MODELS = (OperationSalesPrice, OperationDay, OperationItem, OperationSubItem)
+
+
+def bump_operation_version(operation_id):
+    """
+    Sürümü hemen artırır; bir transaction içindeysek commit sonrasında
+    tekrar artırır ki commit öncesi okunan eski veri önbellekte kalmasın.
+    Transaction içinde aynı operasyon için yalnızca ilk değişiklik anında artırılır
+    """
+    if operation_id is None:
+        return
+    if not transaction.get_connection().in_atomic_block:
+        OperationCacheService.bump_version(operation_id)
+    elif version_batch.add(operation_id):
+        OperationCacheService.bump_version(operation_id)
+
+
+class TreeSignalState(threading.local):
+    muted = False
+
+
+tree_signal_state = TreeSignalState()
+
+
+@contextmanager
+def tree_signals_muted():
+    """
+    Toplu silmelerde operasyon ağacı alıcılarını susturur; Collector'ın her
+    satır için gönderdiği sinyaller iş kuyruğa almaz. Sürüm, toplam ve sevk
+    işlerini çağıran taraf bir kez kendisi kuyruğa alır.
+    """
+    previous = tree_signal_state.muted
+    tree_signal_state.muted = True
+    try:
+        yield
+    finally:
+        tree_signal_state.muted = previous
+
+
+@receiver(post_save, sender=Operation)
+@receiver(post_save, sender=OperationCustomer)
+@receiver(post_save, sender=OperationSalesPrice)
+@receiver(post_save, sender=OperationDay)
+@receiver(post_save, sender=OperationItem)
+@receiver(post_save, sender=OperationSubItem)
+@receiver(post_delete, sender=Operation)
+@receiver(post_delete, sender=OperationCustomer)
+@receiver(post_delete, sender=OperationSalesPrice)
+@receiver(post_delete, sender=OperationDay)
+@receiver(post_delete, sender=OperationItem)
+@receiver(post_delete, sender=OperationSubItem)
+def operation_tree_changed(sender, instance, **kwargs):
+    """
+    Operasyon ağacındaki her yazmada operasyonun önbellek sürümünü artırır;
+    fiyat taşıyan kayıtlarda commit sonrası toplamları operasyon başına bir kez yeniden hesaplar
+    """
+    if tree_signal_state.muted:
+        return
+    operation_id = get_operation_id(instance)
+    bump_operation_version(operation_id)
+    if operation_id is None:
+        return
+    # Operasyon siliniyorsa toplamları da birlikte silinir, yeniden hesaplanmaz
+    if sender is Operation and kwargs.get('signal') is post_delete:
+        finance_batch.skip(operation_id)
+        return
+    # Yeni açılan günün öğesi olmadığından toplamlar değişmez
+    if sender is OperationDay and kwargs.get('created'):
+        return
+    if sender in FINANCE_MODELS:
+        finance_batch.add(operation_id)
+
+
+@receiver(m2m_changed, sender=OperationSubItem.museums.through)
+def operation_sub_item_museums_changed(sender, instance, action, **kwargs):
+    """Alt öğenin müzeleri değiştiğinde operasyonun sürümünü artırır"""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, OperationSubItem):
+        bump_operation_version(get_operation_id(instance))
+
+
+# Sevk tablosu: değişiklikler commit sonrası işlenir ki toplu güncellemeler
+# (ör. durum değiştirme) tamamlandıktan sonra satırlar tek seferde yazılsın
+OPERATION_DISPATCH_FIELDS = {
+    'reference_number', 'buyer_company', 'follow_by', 'is_active',
+    'start_date', 'end_date'
+}
+
+
+def rebuild_dispatch(keys):
+    """
+    Biriken (tür, id) anahtarlarını en geniş kapsamdan başlayarak yeniden yazar;
+    operasyonu ya da günü yeniden yazılan öğeler ayrıca işlenmez
+    """
+    ids = {kind: {key for key_kind, key in keys if key_kind == kind} for kind in ('operation', 'day', 'item', 'sub_item')}
+    days = Q(operation_id__in=ids['operation']) | Q(pk__in=ids['day'])
+    if ids['operation'] or ids['day']:
+        DispatchService.rebuild_days(OperationDay.objects.filter(days))
+    day_ids = OperationDay.objects.filter(days).values('pk')
+    if ids['item']:
+        DispatchService.rebuild_items(
+            OperationItem.objects.filter(pk__in=ids['item']).exclude(operation_day__in=day_ids).values_list('pk', flat=True)
+        )
+    if ids['sub_item']:
+        DispatchService.rebuild_sub_items(
+            OperationSubItem.objects.filter(pk__in=ids['sub_item']).exclude(
+                Q(operation_item__in=ids['item']) | Q(operation_item__operation_day__in=day_ids)
+            ).values_list('pk', flat=True)
+        )
+
+
+dispatch_batch = CommitBatch(rebuild_dispatch)
+
+
+@receiver(post_save, sender=Operation)
+def operation_dispatch_changed(sender, instance, update_fields=None, **kwargs):
+    """Operasyon başlığı değişince operasyonun tüm sevk satırlarını yeniler"""
+    if kwargs.get('created'):
+        return
+    if update_fields and not OPERATION_DISPATCH_FIELDS.intersection(update_fields):
+        return
+    dispatch_batch.add(('operation', instance.pk))
+
+
+@receiver(post_save, sender=OperationDay)
+def operation_day_dispatch_changed(sender, instance, created, **kwargs):
+    """Gün güncellenince o günün sevk satırlarını yeniler"""
+    if not created:
+        dispatch_batch.add(('day', instance.pk))
+
+
+@receiver(post_save, sender=OperationItem)
+def operation_item_dispatch_changed(sender, instance, **kwargs):
+    """Öğe değişince öğenin ve alt öğelerinin satırlarını yeniler"""
+    dispatch_batch.add(('item', instance.pk))
+
+
+@receiver(post_save, sender=OperationSubItem)
+def operation_sub_item_dispatch_changed(sender, instance, **kwargs):
+    """Alt öğe değişince yalnızca onun satırını yeniler"""
+    dispatch_batch.add(('sub_item', instance.pk))
+
+
+@receiver(m2m_changed, sender=OperationSubItem.museums.through)
+def operation_sub_item_museums_dispatch_changed(sender, instance, action, **kwargs):
+    """Müzeler değişince alt öğenin satırındaki açıklamayı yeniler"""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, OperationSubItem):
+        dispatch_batch.add(('sub_item', instance.pk))
+
+
+# Görev panosu: değişen kartlar commit sonrası izleyen panolara bildirilir
+def publish_items_changed(item_ids, moved_by=None):
+    """
+    Kartları güncel günlerinin panolarına bildirir. moved_by verilirse kart o
+    kadar gün kaydırılmıştır; eski günün panosuna kartı kaldırması için de olay gider
+    """
+    for item in OperationItem.objects.filter(pk__in=item_ids).values('id', 'operation_day_id', 'date'):
+        event = dict(
+            type='item', id=item['id'], day_id=item['operation_day_id'],
+            target=f"#item-container-{item['id']}", url=reverse('tour:jobs_item', args=[item['id']])
+        )
+        publish_jobs_event(item['date'], **event)
+        if moved_by:
+            publish_jobs_event(item['date'] - moved_by, removed=True, **event)
+
+
+def publish_sub_items_changed(sub_item_ids, moved_by=None):
+    for sub_item in OperationSubItem.objects.filter(pk__in=sub_item_ids).values(
+        'id', 'operation_item__operation_day_id', 'date'
+    ):
+        event = dict(
+            type='sub_item', id=sub_item['id'], day_id=sub_item['operation_item__operation_day_id'],
+            target=f"#sub-item-container-{sub_item['id']}", url=reverse('tour:jobs_sub_item', args=[sub_item['id']])
+        )
+        publish_jobs_event(sub_item['date'], **event)
+        if moved_by:
+            publish_jobs_event(sub_item['date'] - moved_by, removed=True, **event)
+
+
+def publish_jobs_changed(keys):
+    publish_items_changed([key for kind, key in keys if kind == 'item'])
+    publish_sub_items_changed([key for kind, key in keys if kind == 'sub_item'])
+
+
+jobs_batch = CommitBatch(publish_jobs_changed)
+
+
+@receiver(post_save, sender=OperationItem)
+def operation_item_jobs_changed(sender, instance, **kwargs):
+    """Öğe kaydedilince görev panosuna olay gönderir"""
+    jobs_batch.add(('item', instance.pk))
+
+
+@receiver(post_save, sender=OperationSubItem)
+def operation_sub_item_jobs_changed(sender, instance, **kwargs):
+    """Alt öğe kaydedilince görev panosuna olay gönderir"""
+    jobs_batch.add(('sub_item', instance.pk))
+
+
+@receiver(m2m_changed, sender=OperationSubItem.museums.through)
+def operation_sub_item_museums_jobs_changed(sender, instance, action, **kwargs):
+    """Müzeler değişince alt öğenin kartını güncellenmiş olarak bildirir"""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, OperationSubItem):
+        jobs_batch.add(('sub_item', instance.pk))
+
+
+# Araç maliyet matrisi: maliyet veya geçmişi değişince yalnızca o maliyet yeniden yüklenir
+@receiver(post_save, sender=VehicleCost)
+@receiver(post_delete, sender=VehicleCost)
+def vehicle_cost_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: VehicleCostMatrix.refresh_vehicle_cost(instance.pk))
+
+
+@receiver(post_save, sender=VehicleCostHistory)
+@receiver(post_delete, sender=VehicleCostHistory)
+def vehicle_cost_history_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: VehicleCostMatrix.refresh_vehicle_cost(instance.vehicle_cost_id))
+
+
+@receiver(post_save, sender=VehicleType)
+@receiver(post_delete, sender=VehicleType)
+def vehicle_type_changed(sender, instance, **kwargs):
+    """Araç tipinin maliyet sütunu değişebileceği için matris yeniden kurulur"""
+    transaction.on_commit(VehicleCostMatrix.invalidate)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+def exchange_rates_changed(sender, instance, **kwargs):
+    """Kur veya para birimi değişince bellekteki kur tablosu yeniden kurulur"""
+    transaction.on_commit(CurrencyConverter.invalidate)
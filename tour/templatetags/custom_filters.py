@@ -55,6 +55,15 @@ def getattr_filter(obj, attr):
     except (AttributeError, TypeError):
         return None
 
+@register.filter
+def join_related(manager):
+    """
+    Çoktan çoğa ilişkideki kayıtları virgülle birleştirir; prefetch_related
+    ile yüklenmişse ek sorgu atmaz.
+    Kullanım: {{ object|getattr_filter:'cities'|join_related }}
+    """
+    return ', '.join(str(related) for related in manager.all())
+
 @register.filter
 def filter_by_date(days, date):
     """
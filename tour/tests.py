@@ -1,3 +1,1364 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from . import urls
+from .events import InProcessBroadcaster, event_stream, get_broadcaster, jobs_channel
+from .pagination import InvalidCursor, KeysetPaginator
+from .forms import (
+    OperationCustomerForm, OperationForm, OperationItemVehicleForm, OperationSalesPriceForm,
+    OperationSubItemHotelForm, OperationSubItemMuseumForm, VehicleTypeForm
+)
+from .registry import REGISTRY, get_spec
+from .search import SearchIndex, fold
+from .services import (
+    CurrencyConverter, CustomerService, DispatchService, OperationCacheService, OperationFinanceService,
+    OperationGraph, PriceResolver, OperationService, PriceHistoryMaintenanceService, ReferenceCounterService,
+    RepricingService, SoftDeleteService,
+    VehicleCostMatrix
+)
+from .models import (
+    CustomUser, Currency, City, VehicleType, BuyerCompany, Tour, NoVehicleTour,
+    Transfer, Hotel, Museum, Activity, Guide, VehicleSupplier, ActivitySupplier,
+    VehicleCost, ActivityCost, Operation, OperationCustomer, OperationDay, OperationSalesPrice,
+    OperationItem, OperationSubItem, DispatchRow, OperationTotals, ExchangeRate, HotelPriceHistory,
+    PriceHistoryArchive, SearchDocument
+)
+
+
+def form_data(form):
+    """Formun mevcut değerlerini test istemcisine verilecek POST verisine çevirir"""
+    data = {}
+    for field in form:
+        value = field.value()
+        if value is None or value is False:
+            continue
+        if value is True:
+            value = 'on'
+        elif isinstance(value, (list, tuple)):
+            value = [getattr(choice, 'pk', choice) for choice in value]
+        data[field.name] = value
+    return data
+
+
+class QueryBudgetMixin:
+    """Sorgu sayısı ve süre bütçesi kontrolleri"""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, label=''):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(query['sql'] for query in context.captured_queries)
+            self.fail(f'{label}: {executed} sorgu çalıştı, bütçe {budget}\n{queries}')
+
+    @contextmanager
+    def assertMaxDuration(self, seconds, label=''):
+        started = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - started
+        if elapsed > seconds:
+            self.fail(f'{label}: {elapsed:.2f} sn sürdü, sınır {seconds} sn')
+
+
+class OperationFixtureMixin:
+    """
+    Gerçekçi bir operasyon ağacı kurar: birden çok günlük operasyonlar, her
+    günde tüm öğe türleri ve her araç öğesinde tüm alt öğe türleri (müzeler dahil)
+    """
+
+    OPERATION_COUNT = 2
+    DAY_COUNT = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='operasyon', password='test1234', first_name='Ayşe', last_name='Yılmaz',
+            role='operation_staff', phone='5550000000'
+        )
+        cls.currency = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        cls.city = City.objects.create(name='İstanbul', code='34')
+        cls.other_city = City.objects.create(name='Nevşehir', code='50')
+        cls.buyer_company = BuyerCompany.objects.create(name='Alıcı Şirket', short_name='ALC', contact='İletişim')
+        cls.vehicle_type = VehicleType.objects.create(name='Minivan', cost_column='minivan_cost')
+        cls.vehicle_supplier = VehicleSupplier.objects.create(name='Araç Tedarikçisi')
+        cls.activity_supplier = ActivitySupplier.objects.create(name='Aktivite Tedarikçisi')
+        cls.tour = Tour.objects.create(name='Şehir Turu', start_city=cls.city, end_city=cls.city)
+        cls.transfer = Transfer.objects.create(name='Havalimanı', start_city=cls.city, end_city=cls.other_city)
+        cls.no_vehicle_tour = NoVehicleTour.objects.create(name='Yürüyüş Turu', city=cls.city)
+        cls.activity = Activity.objects.create(name='Balon')
+        cls.guide = Guide.objects.create(name='Rehber', phone='5551111111', document_no='R-1')
+        cls.guide.cities.add(cls.city)
+        valid_until = date.today() + timedelta(days=365)
+        hotels = [
+            Hotel.objects.create(
+                name=f'Otel {index}', city=cls.city, single_price=100, double_price=150, triple_price=200,
+                currency=cls.currency, valid_until=valid_until
+            )
+            for index in range(3)
+        ]
+        cls.hotel = hotels[0]
+        cls.museums = [
+            Museum.objects.create(
+                name=f'Müze {index}', city=cls.city, local_price=10, foreign_price=20,
+                currency=cls.currency, valid_until=valid_until
+            )
+            for index in range(3)
+        ]
+        vehicle_costs = [
+            VehicleCost.objects.create(
+                supplier=cls.vehicle_supplier, tour=cls.tour if index % 2 else None,
+                transfer=None if index % 2 else cls.transfer, car_cost=40, minivan_cost=50,
+                minibus_cost=60, midibus_cost=70, bus_cost=80,
+                currency=cls.currency, valid_until=valid_until
+            )
+            for index in range(3)
+        ]
+        cls.vehicle_cost = vehicle_costs[0]
+        cls.activity_cost = ActivityCost.objects.create(
+            activity=cls.activity, supplier=cls.activity_supplier, price=30,
+            currency=cls.currency, valid_until=valid_until
+        )
+
+        cls.operations = []
+        # Sınıf transaction'ı hiç commit edilmez; commit sonrası işler burada bir kez
+        # çalıştırılır ki testlerdeki yazmalar kendi on_commit kayıtlarını açsın
+        with cls.captureOnCommitCallbacks(execute=True):
+            for index in range(cls.OPERATION_COUNT):
+                cls.operations.append(cls.create_operation())
+        cls.operation = cls.operations[0]
+        cls.day = cls.operation.days.first()
+        cls.item = OperationItem.objects.filter(operation_day=cls.day, item_type=OperationItem.VEHICLE).first()
+        cls.customer = cls.operation.customers.first()
+        cls.sales_price = cls.operation.sales_prices.first()
+
+    @classmethod
+    def create_operation(cls):
+        """Müşterileri, satış fiyatı ve her günü dolu bir operasyon oluşturur"""
+        operation = Operation.objects.create(
+            buyer_company=cls.buyer_company, created_by=cls.user, follow_by=cls.user,
+            start_date=date.today(), end_date=date.today() + timedelta(days=cls.DAY_COUNT - 1)
+        )
+        for customer_index in range(4):
+            OperationCustomer.objects.create(
+                operation=operation, first_name=f'Müşteri {customer_index}', last_name='Test',
+                customer_type=OperationCustomer.ADULT
+            )
+        OperationSalesPrice.objects.create(operation=operation, price=Decimal('1000'), currency=cls.currency)
+        for day in operation.days.all():
+            cls.create_day_items(day)
+        return operation
+
+    @classmethod
+    def create_day_items(cls, day):
+        """Bir güne her türden öğe ve araç öğesine her türden alt öğe ekler"""
+        vehicle = OperationItem.objects.create(
+            operation_day=day, item_type=OperationItem.VEHICLE, pick_time=dtime(9, 0),
+            vehicle_type=cls.vehicle_type, vehicle_supplier=cls.vehicle_supplier,
+            cost_price=50, cost_currency=cls.currency
+        )
+        OperationItem.objects.create(
+            operation_day=day, item_type=OperationItem.NO_VEHICLE_TOUR, pick_time=dtime(10, 0),
+            no_vehicle_tour=cls.no_vehicle_tour, sales_currency=cls.currency
+        )
+        activity_item = OperationItem.objects.create(
+            operation_day=day, item_type=OperationItem.NO_VEHICLE_ACTIVITY, pick_time=dtime(11, 0),
+            no_vehicle_activity=cls.activity, activity_supplier=cls.activity_supplier
+        )
+        OperationItem.objects.create(
+            operation_day=day, item_type=OperationItem.NO_VEHICLE_GUIDE, pick_time=dtime(12, 0),
+            no_vehicle_guide=cls.guide
+        )
+        cls.create_sub_items(vehicle)
+        OperationSubItem.objects.create(
+            operation_item=activity_item, ordering=1, subitem_type=OperationSubItem.HOTEL, hotel=cls.hotel
+        )
+
+    @classmethod
+    def create_sub_items(cls, vehicle):
+        """Araç öğesine her türden birer alt öğe ekler"""
+        start = vehicle.subitems.count()
+        sub_items = [
+            dict(subitem_type=OperationSubItem.TOUR, tour=cls.tour),
+            dict(subitem_type=OperationSubItem.TRANSFER, transfer=cls.transfer),
+            dict(subitem_type=OperationSubItem.ACTIVITY, activity=cls.activity, activity_supplier=cls.activity_supplier),
+            dict(subitem_type=OperationSubItem.MUSEUM),
+            dict(subitem_type=OperationSubItem.HOTEL, hotel=cls.hotel, room_type='DOUBLE'),
+            dict(subitem_type=OperationSubItem.GUIDE, guide=cls.guide),
+            dict(subitem_type=OperationSubItem.OTHER_PRICE, other_price_description='Otopark'),
+        ]
+        for ordering, fields in enumerate(sub_items, start + 1):
+            sub_item = OperationSubItem.objects.create(
+                operation_item=vehicle, ordering=ordering, sales_currency=cls.currency,
+                cost_currency=cls.currency, **fields
+            )
+            if sub_item.subitem_type == OperationSubItem.MUSEUM:
+                sub_item.museums.set(cls.museums)
+
+
+class RouteQueryBudgetTests(QueryBudgetMixin, OperationFixtureMixin, TestCase):
+    """
+    tour/urls.py içindeki her isimli adres için sorgu ve süre bütçesi.
+    Her adres kendi transaction'ında çağrılıp geri alınır; akış yanıtları sonuna
+    kadar okunur. Fikstür büyütüldüğünde sorgu sayısı değişmemeli (N+1 yok).
+    Sürümler testlerde veritabanı önbelleğinde tutulur: her sürüm okuması bir,
+    her sürüm yazması beş (COUNT, savepoint, SELECT, yazma, release) sorgudur.
+    """
+
+    MAX_SECONDS = 2.0
+
+    # Bu adresler mevcut haliyle çalıştırılamıyor
+    SKIPPED = {
+        'password_reset_verify': 'URL (uidb64/token) ile view imzası (phone) uyuşmuyor',
+    }
+
+    def routes(self):
+        """GET adresleri: (ad, argümanlar, ek istek parametreleri, sorgu bütçesi)"""
+        operation = self.operation
+        day = self.day
+        item = self.item
+        sub_items = {sub_item.subitem_type: sub_item for sub_item in item.subitems.all()}
+        htmx = {'HTTP_HX_REQUEST': 'true'}
+        next_url = {'next': reverse('tour:operation', args=[operation.id])}
+        item_ids = {
+            item_type: OperationItem.objects.filter(operation_day=day, item_type=item_type).values_list('id', flat=True).first()
+            for item_type, _ in OperationItem.ITEM_TYPE_CHOICES
+        }
+        return [
+            ('password_reset_request', [], {}, 0),
+            ('list', ['Hotel'], {}, 5),
+            ('list', ['VehicleCost'], {}, 7),
+            ('list', ['Guide'], {}, 5),
+            ('create', ['Hotel'], {}, 4),
+            ('detail', ['Hotel', self.hotel.id], htmx, 5),
+            ('update', ['Hotel', self.hotel.id], {}, 5),
+            ('delete', ['Currency', Currency.objects.get_or_create(code='USD', name='Dolar', symbol='$')[0].id], {}, 19),
+            ('export', ['Hotel'], {}, 3),
+            ('export', ['VehicleCost'], {}, 3),
+            ('export', ['Guide'], {}, 4),
+            ('operation', [operation.id], {}, 11),
+            ('operation_update', [operation.id], {}, 3),
+            ('operation_shift', [operation.id], {}, 1),
+            ('toggle_operation_customer', [self.customer.id], {'data': next_url}, 13),
+            ('toggle_operation_sales_price', [self.sales_price.id], {'data': next_url}, 11),
+            ('toggle_operation_day', [day.id], {'data': next_url}, 13),
+            ('toggle_operation_item', [item.id], {'data': next_url}, 12),
+            ('toggle_operation_sub_item', [sub_items['HOTEL'].id], {'data': next_url}, 11),
+            ('toggle_operation', [self.operations[1].id], {}, 18),
+            ('operation_customer_update', [self.customer.id], {}, 1),
+            ('operation_sales_price_update', [self.sales_price.id], {}, 2),
+            ('no_vehicle_activity_item_create', [day.id], {}, 5),
+            ('no_vehicle_tour_item_create', [day.id], {}, 4),
+            ('no_vehicle_guide_item_create', [day.id], {}, 4),
+            ('vehicle_item_create', [day.id], {}, 4),
+            ('no_vehicle_activity_item_update', [item_ids['NO_VEHICLE_ACTIVITY']], {}, 5),
+            ('no_vehicle_tour_item_update', [item_ids['NO_VEHICLE_TOUR']], {}, 4),
+            ('no_vehicle_guide_item_update', [item_ids['NO_VEHICLE_GUIDE']], {}, 4),
+            ('vehicle_item_update', [item.id], {}, 5),
+            ('sub_item_tour_create', [item.id], {}, 4),
+            ('sub_item_transfer_create', [item.id], {}, 4),
+            ('sub_item_hotel_create', [item.id], {}, 4),
+            ('sub_item_activity_create', [item.id], {}, 5),
+            ('sub_item_museum_create', [item.id], {}, 4),
+            ('sub_item_guide_create', [item.id], {}, 4),
+            ('sub_item_other_price_create', [item.id], {}, 3),
+            ('sub_item_tour_update', [sub_items['TOUR'].id], {}, 4),
+            ('sub_item_transfer_update', [sub_items['TRANSFER'].id], {}, 4),
+            ('sub_item_hotel_update', [sub_items['HOTEL'].id], {}, 4),
+            ('sub_item_activity_update', [sub_items['ACTIVITY'].id], {}, 5),
+            ('sub_item_museum_update', [sub_items['MUSEUM'].id], {}, 5),
+            ('sub_item_guide_update', [sub_items['GUIDE'].id], {}, 4),
+            ('sub_item_other_price_update', [sub_items['OTHER_PRICE'].id], {}, 3),
+            ('operation_customer_create', [operation.id], {}, 1),
+            ('operation_sales_price_create', [operation.id], {}, 2),
+            ('operation_create', [], {}, 4),
+            ('operation_list', [], {}, 5),
+            ('operation_jobs', [], {}, 9),
+            ('operation_jobs', [], dict(htmx, data={'date': (date.today() + timedelta(days=1)).isoformat()}), 9),
+            ('jobs_vehicle_item_update', [item.id], {}, 5),
+            ('jobs_no_vehicle_tour_item_update', [item_ids['NO_VEHICLE_TOUR']], {}, 4),
+            ('jobs_no_vehicle_activity_item_update', [item_ids['NO_VEHICLE_ACTIVITY']], {}, 5),
+            ('jobs_no_vehicle_guide_item_update', [item_ids['NO_VEHICLE_GUIDE']], {}, 4),
+            ('jobs_sub_item_hotel_update', [sub_items['HOTEL'].id], {}, 4),
+            ('jobs_sub_item_activity_update', [sub_items['ACTIVITY'].id], {}, 5),
+            ('jobs_sub_item_museum_update', [sub_items['MUSEUM'].id], {}, 5),
+            ('jobs_sub_item_guide_update', [sub_items['GUIDE'].id], {}, 4),
+            ('jobs_sub_item_other_price_update', [sub_items['OTHER_PRICE'].id], {}, 3),
+            ('jobs_sub_item_transfer_update', [sub_items['TRANSFER'].id], {}, 4),
+            ('jobs_sub_item_tour_update', [sub_items['TOUR'].id], {}, 4),
+            ('my_operation_jobs', [], {}, 9),
+            ('jobs_item', [item.id], {}, 1),
+            ('jobs_sub_item', [sub_items['MUSEUM'].id], {}, 2),
+            ('vehicle_cost_suggestion', [], {'data': {
+                'vehicle_supplier': self.vehicle_supplier.id, 'vehicle_type': self.vehicle_type.id,
+                'date': date.today().isoformat(), 'transfer': self.transfer.id
+            }}, 3),
+            ('operation_finance', [], {}, 9),
+            ('operation_dispatch', [], {}, 3),
+            ('operation_dispatch_export', [], {}, 1),
+            ('logout', [], {}, 4),
+        ]
+
+    def post_routes(self):
+        """Kayıt oluşturan/güncelleyen POST adresleri: (ad, argümanlar, form verisi, sorgu bütçesi)"""
+        operation = self.operation
+        item = self.item
+        sub_items = {sub_item.subitem_type: sub_item for sub_item in item.subitems.all()}
+        hotel = form_data(get_spec('Hotel').get_form(instance=self.hotel))
+        vehicle = form_data(OperationItemVehicleForm(instance=item))
+        hotel_sub_item = form_data(OperationSubItemHotelForm(instance=sub_items['HOTEL']))
+        museum_sub_item = form_data(OperationSubItemMuseumForm(instance=sub_items['MUSEUM']))
+        customer = form_data(OperationCustomerForm(instance=self.customer))
+        sales_price = form_data(OperationSalesPriceForm(instance=self.sales_price))
+        return [
+            ('list', ['Hotel'], hotel, 8),
+            ('create', ['Hotel'], hotel, 8),
+            ('update', ['Hotel', self.hotel.id], hotel, 10),
+            ('operation_create', [], dict(form_data(OperationForm(instance=operation)), reference_number=''), 19),
+            ('operation_update', [operation.id], form_data(OperationForm(instance=operation)), 21),
+            ('operation_shift', [operation.id], {'days': 1}, 21),
+            ('operation_customer_create', [operation.id], customer, 10),
+            ('operation_customer_update', [self.customer.id], customer, 9),
+            ('operation_sales_price_create', [operation.id], sales_price, 11),
+            ('operation_sales_price_update', [self.sales_price.id], sales_price, 11),
+            ('vehicle_item_create', [self.day.id], vehicle, 17),
+            ('vehicle_item_update', [item.id], vehicle, 17),
+            ('sub_item_hotel_create', [item.id], hotel_sub_item, 16),
+            ('sub_item_hotel_update', [sub_items['HOTEL'].id], hotel_sub_item, 16),
+            ('sub_item_museum_create', [item.id], museum_sub_item, 18),
+            ('sub_item_museum_update', [sub_items['MUSEUM'].id], museum_sub_item, 19),
+            ('jobs_vehicle_item_update', [item.id], vehicle, 13),
+            ('jobs_sub_item_hotel_update', [sub_items['HOTEL'].id], hotel_sub_item, 14),
+            ('toggle_active_bulk', [], {
+                'model': 'item', 'ids': list(self.day.items.values_list('id', flat=True)), 'is_active': '0'
+            }, 12),
+        ]
+
+    def grow_fixture(self):
+        """Ölçülen kayıtların çevresini ve altını büyütür: yeni operasyonlar, öğeler, alt öğeler"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(self.OPERATION_COUNT * 2):
+                self.operations.append(self.create_operation())
+            self.create_day_items(self.day)
+            self.create_sub_items(self.item)
+            for index in range(4):
+                OperationCustomer.objects.create(
+                    operation=self.operation, first_name=f'Ek Müşteri {index}', last_name='Test',
+                    customer_type=OperationCustomer.ADULT
+                )
+                OperationSalesPrice.objects.create(operation=self.operation, price=Decimal('500'), currency=self.currency)
+                Guide.objects.create(name=f'Ek Rehber {index}', phone='5552222222', document_no=f'E-{index}')
+                Hotel.objects.create(
+                    name=f'Ek Otel {index}', city=self.city, single_price=100, double_price=150, triple_price=200,
+                    currency=self.currency, valid_until=self.hotel.valid_until
+                )
+                VehicleCost.objects.create(
+                    supplier=self.vehicle_supplier, tour=self.tour, car_cost=40, minivan_cost=50, minibus_cost=60,
+                    midibus_cost=70, bus_cost=80, currency=self.currency, valid_until=self.vehicle_cost.valid_until
+                )
+
+    @contextmanager
+    def isolated(self):
+        """
+        İsteği kendi transaction'ında çalıştırıp geri alır. Süreç belleği (önbellek ve
+        bellek tabloları) boş, ortak önbellekteki sürümler ise çalışan bir sistemdeki
+        gibi kuruludur; böylece her istek fikstürden bağımsız aynı durumdan başlar
+        """
+        cache.clear()
+        self.client.force_login(self.user)
+        with transaction.atomic():
+            for table in (VehicleCostMatrix, CurrencyConverter):
+                table.get_version()
+                table.version = None
+            yield
+            transaction.set_rollback(True)
+
+    def request(self, method, name, args, data=None, extra=None):
+        url = reverse(f'tour:{name}', args=args)
+        response = getattr(self.client, method)(url, data, **(extra or {}))
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def assertSucceeded(self, response):
+        self.assertIn(response.status_code, (200, 302))
+        form = response.context.get('form') if response.context else None
+        if form is not None:
+            self.assertFalse(form.errors)
+
+    def get_requests(self):
+        for name, args, extra, budget in self.routes():
+            extra = dict(extra)
+            data = extra.pop('data', None)
+            yield 'get', name, args, data, extra, budget
+
+    def post_requests(self):
+        for name, args, data, budget in self.post_routes():
+            yield 'post', name, args, data, {}, budget
+
+    def query_counts(self):
+        counts = {}
+        for index, (method, name, args, data, extra, _) in enumerate([*self.get_requests(), *self.post_requests()]):
+            with self.isolated(), CaptureQueriesContext(connection) as context:
+                self.request(method, name, args, data, extra)
+            counts[index, method, name] = len(context.captured_queries)
+        return counts
+
+    def test_every_named_route_has_a_budget(self):
+        """urls.py'ye eklenen her adres için bütçe tanımlanmalı"""
+        named = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        covered = {name for name, _, _, _ in [*self.routes(), *self.post_routes()]}
+        covered |= set(self.SKIPPED) | {'login', 'operation_jobs_events'}
+        self.assertEqual(named - covered, set())
+
+    def test_route_query_budgets(self):
+        for method, name, args, data, extra, budget in [*self.get_requests(), *self.post_requests()]:
+            with self.subTest(method=method, route=name, args=args), self.isolated():
+                with self.assertMaxDuration(self.MAX_SECONDS, name), self.assertMaxQueries(budget, name):
+                    response = self.request(method, name, args, data, extra)
+                self.assertSucceeded(response)
+
+    def test_query_counts_do_not_grow_with_fixture(self):
+        before = self.query_counts()
+        self.grow_fixture()
+        self.assertEqual(self.query_counts(), before)
+
+    def test_events_route_query_budget(self):
+        """Akış yalnızca oturumu ve kullanıcıyı okur; olay beklerken veritabanına gitmez"""
+        async_to_sync(self.async_client.aforce_login)(self.user)
+        with self.assertMaxQueries(2, 'operation_jobs_events'):
+            response = async_to_sync(self.async_client.get)(reverse('tour:operation_jobs_events'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    def test_login_page_query_budget(self):
+        self.client.logout()
+        with self.assertMaxQueries(1, 'login'):
+            response = self.client.get(reverse('tour:login'))
+        self.assertEqual(response.status_code, 200)
+
+
+class OperationCacheServiceTests(TestCase):
+    """Operasyon sürümlerinin süreçler arasında paylaşılması"""
+
+    def test_versions_are_shared_between_processes(self):
+        from django.core.cache import caches
+        from django.core.cache.backends.db import DatabaseCache
+
+        version = OperationCacheService.get_version(1)
+        # Süreç belleğindeki önbellek boşalsa da sürüm kaybolmaz
+        caches['default'].clear()
+        self.assertEqual(OperationCacheService.get_version(1), version)
+        # Başka bir sürecin yazdığı sürüm bu süreçte de görülür
+        other_process = DatabaseCache('tour_shared_cache', {})
+        other_process.set(OperationCacheService.VERSION_KEY.format(1), 'diğer', None)
+        self.assertEqual(OperationCacheService.get_version(1), 'diğer')
+        OperationCacheService.bump_version(1)
+        self.assertNotIn(OperationCacheService.get_version(1), (version, 'diğer'))
+
+
+class OperationEtagTests(OperationFixtureMixin, TestCase):
+    """Operasyon ve görev ekranlarının koşullu yanıtları"""
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('tour:operation', args=[self.operation.id])
+
+    def get(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_version_bumped_by_another_process_invalidates_the_etag(self):
+        from django.core.cache.backends.db import DatabaseCache
+
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+        other_process = DatabaseCache('tour_shared_cache', {})
+        other_process.set(OperationCacheService.VERSION_KEY.format(self.operation.id), 'diğer', None)
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_pending_messages_are_not_answered_with_304(self):
+        etag = self.client.get(self.url)['ETag']
+        currency = Currency.objects.create(code='USD', name='Dolar', symbol='$')
+        self.client.get(reverse('tour:delete', args=['Currency', currency.id]))
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class DispatchServiceTests(OperationFixtureMixin, TestCase):
+    """Sevk tablosunun kaynak ağaçla tutarlılığı"""
+
+    # Her günde 4 öğe, araç öğesinde 7, aktivite öğesinde 1 alt öğe
+    ROWS_PER_DAY = 12
+
+    def test_rebuild_range_writes_one_row_per_active_item_and_sub_item(self):
+        written = DispatchService.rebuild_range()
+        self.assertEqual(written, self.OPERATION_COUNT * self.DAY_COUNT * self.ROWS_PER_DAY)
+        self.assertEqual(DispatchRow.objects.count(), written)
+        museum_row = DispatchRow.objects.get(operation_sub_item__subitem_type=OperationSubItem.MUSEUM,
+                                             operation_day=self.day)
+        self.assertEqual(museum_row.description, ', '.join(str(museum) for museum in self.museums))
+
+        written = DispatchService.rebuild_range(self.day.date, self.day.date)
+        self.assertEqual(written, self.OPERATION_COUNT * self.ROWS_PER_DAY)
+        self.assertEqual(DispatchRow.objects.count(), self.OPERATION_COUNT * self.DAY_COUNT * self.ROWS_PER_DAY)
+
+    def test_item_changes_are_synced_after_commit(self):
+        DispatchService.rebuild_range()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.driver_name = 'Mehmet'
+            self.item.save()
+        self.assertEqual(
+            set(DispatchRow.objects.filter(operation_item=self.item).values_list('driver_name', flat=True)),
+            {'Mehmet'}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.is_active = False
+            self.item.save()
+        self.assertFalse(DispatchRow.objects.filter(operation_item=self.item).exists())
+
+    def test_operation_header_change_rewrites_rows(self):
+        DispatchService.rebuild_range()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.operation.is_active = False
+            self.operation.save()
+        self.assertFalse(DispatchRow.objects.filter(operation=self.operation).exists())
+        self.assertTrue(DispatchRow.objects.exclude(operation=self.operation).exists())
+
+
+class JobsBoardTests(OperationFixtureMixin, TestCase):
+    """Görev panosunun gün sayıları ve kartları"""
+
+    def test_counts_and_cards_skip_inactive_items(self):
+        self.client.force_login(self.user)
+        OperationItem.objects.filter(pk=self.item.pk).update(is_active=False)
+        response = self.client.get(reverse('tour:operation_jobs'))
+        active = OperationItem.objects.filter(date=date.today(), is_active=True).count()
+        self.assertEqual(response.context['day_counts'][date.today()]['item_count'], active)
+        cards = [item for day in response.context['days'] for item in day.items.all()]
+        self.assertEqual(len(cards), active)
+        self.assertNotIn(self.item.pk, [item.pk for item in cards])
+
+
+class EventStreamTests(OperationFixtureMixin, TestCase):
+    """Görev panosu canlı olaylarının üretimi ve dağıtımı"""
+
+    def test_item_save_publishes_jobs_event_after_commit(self):
+        with mock.patch('tour.signals.publish_jobs_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.item.driver_name = 'Mehmet'
+                self.item.save()
+        publish.assert_called_once_with(
+            self.day.date, type='item', id=self.item.id, day_id=self.day.id,
+            target=f'#item-container-{self.item.id}', url=reverse('tour:jobs_item', args=[self.item.id])
+        )
+
+    async def test_events_endpoint_requires_login(self):
+        response = await self.async_client.get(reverse('tour:operation_jobs_events'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_wsgi_board_polls_instead_of_streaming(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('tour:operation_jobs'))
+        self.assertFalse(response.context['live_events'])
+        self.assertNotContains(response, 'data-live')
+        self.assertContains(response, 'data-poll-url=')
+        # WSGI altında akış açılmaz; 204 EventSource'un yeniden bağlanmasını durdurur
+        self.assertEqual(self.client.get(reverse('tour:operation_jobs_events')).status_code, 204)
+
+    async def test_asgi_board_streams_events(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('tour:operation_jobs'))
+        self.assertTrue(response.context['live_events'])
+        self.assertContains(response, 'data-live')
+
+
+class BroadcasterTests(SimpleTestCase):
+
+    def test_stream_delivers_published_events_to_channel_subscribers(self):
+        async def scenario():
+            stream = event_stream(jobs_channel(date(2025, 5, 1)), heartbeat=0.05)
+            self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+            next_message = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0)
+            get_broadcaster().publish(jobs_channel(date(2025, 5, 2)), {'id': 2})
+            get_broadcaster().publish(jobs_channel(date(2025, 5, 1)), {'id': 1})
+            self.assertEqual(await next_message, 'data: {}\n\n'.format(json.dumps({'id': 1})))
+            self.assertEqual(await anext(stream), ': ping\n\n')
+            await stream.aclose()
+            self.assertEqual(get_broadcaster().subscribers, {})
+
+        asyncio.run(scenario())
+
+    def test_full_queue_drops_events(self):
+        async def scenario():
+            broadcaster = InProcessBroadcaster()
+            queue = broadcaster.subscribe('kanal')
+            for index in range(broadcaster.QUEUE_SIZE + 5):
+                broadcaster.publish('kanal', index)
+            await asyncio.sleep(0)
+            self.assertEqual(queue.qsize(), broadcaster.QUEUE_SIZE)
+            broadcaster.unsubscribe('kanal', queue)
+
+        asyncio.run(scenario())
+
+
+class VehicleCostMatrixTests(OperationFixtureMixin, TestCase):
+    """Araç maliyet matrisinin araması ve artımlı güncellenmesi"""
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+
+    def lookup(self, **route):
+        return VehicleCostMatrix.lookup(self.vehicle_supplier.id, self.vehicle_type.id, self.today, **route)
+
+    def test_lookup_reads_the_vehicle_type_column_for_the_route(self):
+        cost = self.lookup(transfer_id=self.transfer.id)
+        self.assertEqual(cost['cost_price'], Decimal('50'))
+        self.assertEqual(cost['cost_currency'], self.currency.id)
+        self.assertIsNone(VehicleCostMatrix.lookup(
+            self.vehicle_supplier.id, self.vehicle_type.id, self.today, transfer_id=self.transfer.id + 100
+        ))
+        self.assertIsNone(VehicleCostMatrix.lookup(
+            self.vehicle_supplier.id, self.vehicle_type.id, self.today + timedelta(days=400),
+            transfer_id=self.transfer.id
+        ))
+
+    def test_vehicle_cost_save_refreshes_only_that_cost(self):
+        self.lookup(tour_id=self.tour.id)
+        vehicle_cost = VehicleCost.objects.get(tour=self.tour)
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle_cost.minivan_cost = 65
+            vehicle_cost.save()
+        # Yalnızca ortak önbellekteki sürüm okunur; matris yeniden kurulmaz
+        with self.assertNumQueries(1):
+            cost = self.lookup(tour_id=self.tour.id)
+        self.assertEqual(cost['cost_price'], Decimal('65'))
+
+    def test_suggestion_endpoint(self):
+        url = reverse('tour:vehicle_cost_suggestion')
+        params = {'vehicle_supplier': self.vehicle_supplier.id, 'vehicle_type': self.vehicle_type.id,
+                  'date': self.today.isoformat(), 'transfer': self.transfer.id}
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()['cost_price'], '50.00')
+        self.assertEqual(self.client.get(url, dict(params, vehicle_supplier=0)).status_code, 404)
+        self.assertEqual(self.client.get(url, dict(params, date='x')).status_code, 400)
+
+    def test_new_item_without_route_uses_the_suppliers_common_cost(self):
+        # Yeni öğenin henüz alt öğesi (güzergahı) yok; adres yalnızca tarihi taşır
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('tour:vehicle_item_create', args=[self.day.id]))
+        # Form betiği seçimleri adresin sonuna ekler
+        url = response.context['cost_suggestion_url'] + '&' + urlencode({
+            'vehicle_supplier': self.vehicle_supplier.id, 'vehicle_type': self.vehicle_type.id
+        })
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cost_price'], '50.00')
+        self.assertIsNone(response.json()['vehicle_cost'])
+
+        # Güzergahlar farklı maliyet veriyorsa öneri yapılmaz
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle_cost = VehicleCost.objects.get(tour=self.tour)
+            vehicle_cost.minivan_cost = 65
+            vehicle_cost.save()
+        self.assertIsNone(self.lookup())
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_vehicle_type_form_round_trips_cost_column(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('tour:list', args=['VehicleType']), {'name': 'Otobüs', 'cost_column': 'bus_cost'})
+        bus = VehicleType.objects.get(name='Otobüs')
+        self.assertEqual(bus.cost_column, 'bus_cost')
+        cost = VehicleCostMatrix.lookup(self.vehicle_supplier.id, bus.id, self.today, transfer_id=self.transfer.id)
+        self.assertEqual(cost['cost_price'], Decimal('80'))
+
+        form = VehicleTypeForm(instance=bus)
+        self.assertEqual(form.initial['cost_column'], 'bus_cost')
+        form = VehicleTypeForm({'name': 'Otobüs', 'cost_column': 'midibus_cost'}, instance=bus)
+        self.assertTrue(form.is_valid(), form.errors)
+        with self.captureOnCommitCallbacks(execute=True):
+            form.save()
+        cost = VehicleCostMatrix.lookup(self.vehicle_supplier.id, bus.id, self.today, transfer_id=self.transfer.id)
+        self.assertEqual(cost['cost_price'], Decimal('70'))
+
+
+class PriceResolverTests(OperationFixtureMixin, TestCase):
+    """Toplu fiyat çözümlemesi get_price_for_date ile aynı sonucu vermeli"""
+
+    def test_resolves_each_history_table_in_one_query(self):
+        today = timezone.now().date()
+        entities = [self.hotel, self.vehicle_cost, self.activity_cost, *self.museums]
+        resolver = PriceResolver()
+        for entity in entities:
+            for target_date in (today, today + timedelta(days=400)):
+                resolver.add(type(entity), entity.id, target_date)
+        with self.assertNumQueries(4):
+            prices = resolver.resolve()
+        for (model, pk, target_date), history in prices.items():
+            self.assertEqual(history, model.objects.get(pk=pk).get_price_for_date(target_date))
+        self.assertIsNotNone(prices[(type(self.hotel), self.hotel.id, today)])
+
+    def test_for_days_covers_a_full_operation(self):
+        days = OperationGraph.load(self.operation.id).days
+        with self.assertNumQueries(2):
+            prices = PriceResolver.for_days(days)
+        self.assertEqual(len(prices), self.DAY_COUNT * (1 + len(self.museums)))
+
+
+class OperationFinanceServiceTests(OperationFixtureMixin, TestCase):
+    """Operasyon gelir/maliyet toplamları"""
+
+    def totals(self):
+        total = OperationTotals.objects.get(operation=self.operation, currency=self.currency)
+        return total.revenue, total.cost
+
+    def test_compute_uses_a_fixed_number_of_queries(self):
+        operation_ids = [operation.id for operation in self.operations]
+        with self.assertNumQueries(5):
+            totals = OperationFinanceService.compute(operation_ids)
+        for operation_id in operation_ids:
+            self.assertEqual(totals[operation_id][self.currency.id], [Decimal('1000'), Decimal('50') * self.DAY_COUNT])
+
+    def test_child_writes_update_totals_after_commit(self):
+        OperationFinanceService.rebuild([self.operation.id])
+        self.assertEqual(self.totals(), (Decimal('1000'), Decimal('350')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.cost_price = 80
+            self.item.save()
+        self.assertEqual(self.totals(), (Decimal('1000'), Decimal('380')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.is_active = False
+            self.item.save()
+        self.assertEqual(self.totals(), (Decimal('1000'), Decimal('300')))
+        self.assertEqual(self.totals()[0] - self.totals()[1], OperationTotals.objects.get(
+            operation=self.operation, currency=self.currency
+        ).margin)
+
+    def test_writes_in_one_transaction_rebuild_each_operation_once(self):
+        items = list(OperationItem.objects.filter(operation=self.operation))
+        with mock.patch.object(OperationFinanceService, 'rebuild') as rebuild, \
+                mock.patch.object(DispatchService, 'rebuild_items') as rebuild_items:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    for item in items:
+                        item.cost_price = 60
+                        item.save()
+        # Sürüm, toplam, sevk ve görev panosu için birer commit işi
+        self.assertEqual(len(callbacks), 4)
+        rebuild.assert_called_once_with({self.operation.id})
+        rebuild_items.assert_called_once()
+        self.assertEqual(set(rebuild_items.call_args.args[0]), {item.id for item in items})
+
+    def test_rolled_back_writes_do_not_swallow_later_ones(self):
+        item = OperationItem.objects.filter(operation=self.operation).first()
+        with mock.patch.object(OperationFinanceService, 'rebuild') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        item.save()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                item.save()
+        rebuild.assert_called_once_with({self.operation.id})
+
+    def test_deleting_the_operation_skips_the_rebuild(self):
+        with mock.patch.object(OperationFinanceService, 'rebuild') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                Operation.objects.get(pk=self.operations[1].pk).delete()
+        self.assertLessEqual(len(callbacks), 4)
+        rebuild.assert_not_called()
+
+
+class CurrencyConverterTests(TestCase):
+    """Tarihli kurlarla toplu para birimi dönüşümü"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.try_currency = Currency.objects.create(code='TRY', name='Türk Lirası', symbol='₺')
+        cls.eur = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+        cls.usd = Currency.objects.create(code='USD', name='Dolar', symbol='$')
+        ExchangeRate.objects.create(currency=cls.eur, date=date(2025, 1, 1), rate=Decimal('35'))
+        ExchangeRate.objects.create(currency=cls.eur, date=date(2025, 2, 1), rate=Decimal('36'))
+        ExchangeRate.objects.create(currency=cls.usd, date=date(2025, 1, 1), rate=Decimal('30'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_convert_many_uses_the_last_rate_on_or_before_the_date(self):
+        rows = [
+            (Decimal('10'), self.eur.id, date(2025, 1, 15)),
+            (Decimal('10'), self.eur.id, date(2025, 2, 15)),
+            (Decimal('10'), self.eur.id, date(2024, 12, 31)),
+            (Decimal('350'), self.try_currency.id, date(2025, 1, 15)),
+            (None, self.eur.id, date(2025, 1, 15)),
+        ]
+        # Sürümün ortak önbelleğe ilk yazılması (7) ve kurların yüklenmesi (2)
+        with self.assertNumQueries(9):
+            converted = CurrencyConverter.convert_many(rows, 'TRY')
+        self.assertEqual(converted, [Decimal('350.00'), Decimal('360.00'), None, Decimal('350.00'), None])
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                CurrencyConverter.convert(Decimal('30'), self.usd.id, date(2025, 1, 15), 'EUR'),
+                Decimal('25.71')
+            )
+
+    def test_new_rate_invalidates_after_commit(self):
+        CurrencyConverter.convert(Decimal('1'), self.usd.id, date(2025, 3, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeRate.objects.create(currency=self.usd, date=date(2025, 3, 1), rate=Decimal('32'))
+        self.assertEqual(CurrencyConverter.convert(Decimal('1'), self.usd.id, date(2025, 3, 1)), Decimal('32.00'))
+
+
+class RepricingServiceTests(OperationFixtureMixin, TestCase):
+    """Toplu fiyat güncelleme ve geçmiş yazımı"""
+
+    def test_percent_reprice_writes_history_in_bulk(self):
+        today = timezone.now().date()
+        with self.assertNumQueries(6):
+            changed = RepricingService.reprice('hotel', percent=Decimal('10'), fields=['single_price'])
+        self.assertEqual(changed, 3)
+        hotel = Hotel.objects.get(pk=self.hotel.pk)
+        self.assertEqual((hotel.single_price, hotel.double_price), (Decimal('110.00'), Decimal('150.00')))
+        history = HotelPriceHistory.objects.filter(hotel=hotel).order_by('id')
+        self.assertEqual([h.valid_until for h in history], [today, hotel.valid_until])
+        self.assertEqual(history.last().single_price, Decimal('110.00'))
+        self.assertEqual(hotel.get_price_for_date(today).single_price, Decimal('110.00'))
+
+    def test_reprice_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as csv_file:
+            csv_file.write(f'id,double_price,triple_price\n{self.hotel.id},175,\n')
+        self.addCleanup(os.remove, csv_file.name)
+        call_command('reprice', 'hotel', csv=csv_file.name, stdout=io.StringIO())
+        hotel = Hotel.objects.get(pk=self.hotel.pk)
+        self.assertEqual((hotel.double_price, hotel.triple_price), (Decimal('175.00'), Decimal('200.00')))
+        self.assertEqual(HotelPriceHistory.objects.filter(hotel=hotel).count(), 2)
+
+    def test_valid_until_only_run_extends_the_open_range_in_place(self):
+        valid_until = self.hotel.valid_until + timedelta(days=30)
+        history_count = HotelPriceHistory.objects.count()
+        # Okuma, kayıtların ve açık geçmiş aralıklarının UPDATE'i (savepoint ile)
+        with self.assertNumQueries(5):
+            changed = RepricingService.reprice('hotel', valid_until=valid_until)
+        self.assertEqual(changed, 3)
+        self.assertEqual(HotelPriceHistory.objects.count(), history_count)
+        hotel = Hotel.objects.get(pk=self.hotel.pk)
+        self.assertEqual(hotel.valid_until, valid_until)
+        self.assertEqual(HotelPriceHistory.objects.get(hotel=hotel).valid_until, valid_until)
+        self.assertEqual(hotel.get_price_for_date(valid_until).single_price, Decimal('100.00'))
+
+        # Aynı fiyat ve tarihle tekrar çalıştırmak hiçbir şey yazmaz
+        with self.assertNumQueries(1):
+            self.assertEqual(RepricingService.reprice('hotel', percent=0, valid_until=valid_until), 0)
+
+
+class PriceHistoryMaintenanceTests(OperationFixtureMixin, TestCase):
+    """Fiyat geçmişi birleştirme ve arşivleme"""
+
+    def add_history(self, valid_from, valid_until, single_price=100):
+        return HotelPriceHistory.objects.create(
+            hotel=self.hotel, currency=self.currency, valid_from=valid_from, valid_until=valid_until,
+            single_price=single_price, double_price=150, triple_price=200
+        )
+
+    def test_compact_merges_adjacent_identical_intervals_only(self):
+        start = date(2024, 1, 1)
+        first = self.add_history(start, start + timedelta(days=9))
+        self.add_history(start + timedelta(days=10), start + timedelta(days=19))
+        self.add_history(start + timedelta(days=19), start + timedelta(days=29))
+        changed = self.add_history(start + timedelta(days=30), start + timedelta(days=39), single_price=120)
+
+        self.assertEqual(PriceHistoryMaintenanceService.compact('hotel'), 2)
+        first.refresh_from_db()
+        self.assertEqual(first.valid_until, start + timedelta(days=29))
+        self.assertTrue(HotelPriceHistory.objects.filter(pk=changed.pk).exists())
+        self.assertEqual(self.hotel.get_price_for_date(start + timedelta(days=25)), first)
+
+    def test_archive_moves_intervals_older_than_the_horizon(self):
+        old = self.add_history(date(2020, 1, 1), date(2020, 12, 31))
+        hot_count = HotelPriceHistory.objects.count()
+        call_command('compact_price_history', model='hotel', horizon_days=365, stdout=io.StringIO())
+        self.assertFalse(HotelPriceHistory.objects.filter(pk=old.pk).exists())
+        self.assertEqual(HotelPriceHistory.objects.count(), hot_count - 1)
+        archived = PriceHistoryArchive.objects.get(model_name='hotel', owner_id=self.hotel.id)
+        self.assertEqual((archived.valid_from, archived.prices['single_price']), (date(2020, 1, 1), '100.00'))
+
+
+class ReferenceCounterTests(OperationFixtureMixin, TestCase):
+    """Sayaç tablosundan referans numarası ayırma"""
+
+    def test_new_operations_continue_the_sequence(self):
+        prefix = self.operation.reference_number[:-3]
+        self.assertEqual(
+            sorted(operation.reference_number for operation in self.operations),
+            [f'{prefix}{index:03d}' for index in range(1, self.OPERATION_COUNT + 1)]
+        )
+        with self.assertNumQueries(5):
+            reference = ReferenceCounterService.allocate('ALC', date.today())[0]
+        self.assertEqual(reference, f'{prefix}{self.OPERATION_COUNT + 1:03d}')
+
+    def test_counter_is_seeded_from_existing_reference_numbers(self):
+        target_date = date(2025, 1, 1)
+        Operation.objects.filter(pk=self.operation.pk).update(reference_number='ALC010125007')
+        self.assertEqual(
+            ReferenceCounterService.allocate('ALC', target_date, count=3),
+            ['ALC010125008', 'ALC010125009', 'ALC010125010']
+        )
+        self.assertEqual(ReferenceCounterService.allocate('ALC', target_date), ['ALC010125011'])
+
+
+class OperationDayReconciliationTests(OperationFixtureMixin, TestCase):
+    """Tarih değişikliğinde günlerin küme farkıyla eşitlenmesi"""
+
+    def save_with_dates(self, start_date, end_date):
+        operation = Operation.objects.get(pk=self.operation.pk)
+        operation.start_date, operation.end_date = start_date, end_date
+        # Her kayıt ayrı bir transaction gibi commit edilir; sayılan yalnızca kaydın kendi sorgularıdır
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            operation.save()
+        return len(queries)
+
+    def test_extending_costs_the_same_for_any_length(self):
+        start = self.operation.start_date
+        short = self.save_with_dates(start, self.operation.end_date + timedelta(days=1))
+        long = self.save_with_dates(start, self.operation.end_date + timedelta(days=60))
+        self.assertEqual(short, long)
+        self.assertEqual(self.operation.days.count(), self.DAY_COUNT + 60)
+
+    def test_shifting_adds_and_removes_days(self):
+        start = self.operation.start_date + timedelta(days=2)
+        end = self.operation.end_date + timedelta(days=2)
+        self.save_with_dates(start, end)
+        dates = list(self.operation.days.order_by('date').values_list('date', flat=True))
+        self.assertEqual(dates, [start + timedelta(days=x) for x in range(self.DAY_COUNT)])
+        self.assertEqual(Operation.objects.get(pk=self.operation.pk).reference_number, self.operation.reference_number)
+
+    def shrink_to(self, operation, days):
+        operation = Operation.objects.get(pk=operation.pk)
+        operation.end_date = operation.start_date + timedelta(days=days - 1)
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            operation.save()
+        # Kalan günlerin sevk satırları SQLite parametre sınırına göre parçalı yazılır
+        queries = [query for query in queries.captured_queries if not query['sql'].startswith('INSERT INTO "tour_dispatchrow"')]
+        return len(queries), len(callbacks)
+
+    def test_shrinking_costs_the_same_for_any_number_of_removed_days(self):
+        DispatchService.rebuild_range()
+        OperationFinanceService.rebuild([operation.id for operation in self.operations])
+        one_day = self.shrink_to(self.operations[0], self.DAY_COUNT - 1)
+        all_but_one = self.shrink_to(self.operations[1], 1)
+        self.assertEqual(one_day, all_but_one)
+
+        operation = self.operations[1]
+        self.assertEqual(operation.days.count(), 1)
+        self.assertEqual(OperationItem.objects.filter(operation=operation).count(), 4)
+        self.assertFalse(OperationSubItem.objects.filter(operation=operation).exclude(date=operation.start_date).exists())
+        self.assertFalse(DispatchRow.objects.filter(operation=operation).exclude(date=operation.start_date).exists())
+        self.assertEqual(
+            OperationTotals.objects.get(operation=operation, currency=self.currency).cost, Decimal('50')
+        )
+
+
+class OperationShiftTests(OperationFixtureMixin, TestCase):
+    """Operasyonun ağacıyla birlikte kaydırılması"""
+
+    def test_shift_moves_days_without_touching_items(self):
+        item_ids = set(OperationItem.objects.filter(operation_day__operation=self.operation).values_list('id', flat=True))
+        start, end = self.operation.start_date, self.operation.end_date
+        with self.captureOnCommitCallbacks(execute=True):
+            DispatchService.rebuild_operation(self.operation.id)
+        with self.assertNumQueries(12):
+            OperationService.shift_operation(self.operation, 3)
+
+        operation = Operation.objects.get(pk=self.operation.pk)
+        self.assertEqual((operation.start_date, operation.end_date), (start + timedelta(days=3), end + timedelta(days=3)))
+        self.assertEqual(operation.reference_number, self.operation.reference_number)
+        dates = list(operation.days.values_list('date', flat=True))
+        self.assertEqual(dates, [start + timedelta(days=3 + x) for x in range(self.DAY_COUNT)])
+        self.assertEqual(
+            set(OperationItem.objects.filter(operation_day__operation=operation).values_list('id', flat=True)), item_ids
+        )
+        self.assertEqual(set(OperationItem.objects.filter(operation=operation).values_list('date', flat=True)), set(dates))
+        self.assertEqual(set(OperationSubItem.objects.filter(operation=operation).values_list('date', flat=True)), set(dates))
+        dispatch_dates = set(DispatchRow.objects.filter(operation=operation).values_list('date', flat=True))
+        self.assertTrue(dispatch_dates)
+        self.assertLessEqual(dispatch_dates, set(dates))
+
+    def test_shift_publishes_moved_cards_and_bumps_version_after_commit(self):
+        item_ids = set(OperationItem.objects.filter(operation=self.operation).values_list('id', flat=True))
+        sub_item_count = OperationSubItem.objects.filter(operation=self.operation).count()
+        with mock.patch('tour.signals.publish_jobs_event') as publish, \
+                mock.patch.object(OperationCacheService, 'bump_version') as bump:
+            with self.captureOnCommitCallbacks() as callbacks:
+                OperationService.shift_operation(self.operation, 2)
+            self.assertEqual(bump.call_count, 1)
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+        self.assertEqual(bump.call_count, 2)
+
+        events = [(call.args[0], call.kwargs) for call in publish.call_args_list]
+        self.assertEqual(len(events), 2 * (len(item_ids) + sub_item_count))
+        self.assertEqual({event['id'] for _, event in events if event['type'] == 'item'}, item_ids)
+        day_dates = dict(OperationDay.objects.filter(operation=self.operation).values_list('id', 'date'))
+        for event_date, event in events:
+            expected = day_dates[event['day_id']] - (timedelta(days=2) if event.get('removed') else timedelta())
+            self.assertEqual(event_date, expected)
+
+    def test_shift_view_renders_shifted_detail(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('tour:operation_shift', args=[self.operation.id]), {'days': -2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            Operation.objects.get(pk=self.operation.pk).start_date, self.operation.start_date - timedelta(days=2)
+        )
+
+
+class PaxCounterTests(OperationFixtureMixin, TestCase):
+    """Kişi sayaçlarının F() ile artımlı güncellenmesi"""
+
+    def pax(self):
+        return Operation.objects.filter(pk=self.operation.pk).values_list(
+            'total_pax', 'adult_pax', 'child_pax', 'infant_pax'
+        ).get()
+
+    def test_save_and_delete_adjust_counters(self):
+        self.assertEqual(self.pax(), (4, 4, 0, 0))
+        customer = OperationCustomer.objects.filter(operation=self.operation).first()
+        customer.customer_type = OperationCustomer.CHILD
+        with self.assertNumQueries(7):
+            customer.save()
+        self.assertEqual(self.pax(), (4, 3, 1, 0))
+        customer.is_active = False
+        customer.save()
+        self.assertEqual(self.pax(), (3, 3, 0, 0))
+        customer.save()
+        self.assertEqual(self.pax(), (3, 3, 0, 0))
+        OperationCustomer.objects.filter(operation=self.operation, is_active=True).first().delete()
+        self.assertEqual(self.pax(), (2, 2, 0, 0))
+
+    def test_bulk_import_updates_counters_once_per_operation(self):
+        customers = [
+            OperationCustomer(
+                operation=self.operation, first_name=f'Yeni {index}', last_name='Test',
+                customer_type=OperationCustomer.INFANT if index % 2 else OperationCustomer.ADULT
+            )
+            for index in range(10)
+        ]
+        with self.assertNumQueries(9):
+            CustomerService.bulk_create_customers(customers)
+        self.assertEqual(self.pax(), (14, 9, 0, 5))
+        OperationCustomer.objects.filter(operation=self.operation).update(is_active=False)
+        CustomerService.recount_pax([self.operation.pk])
+        self.assertEqual(self.pax(), (0, 0, 0, 0))
+
+    def test_operation_save_does_not_overwrite_counters(self):
+        operation = Operation.objects.get(pk=self.operation.pk)
+        OperationCustomer.objects.create(
+            operation=self.operation, first_name='Geç', last_name='Gelen', customer_type=OperationCustomer.ADULT
+        )
+        operation.notes = 'Not'
+        operation.save()
+        self.assertEqual(self.pax(), (5, 5, 0, 0))
+
+
+class DenormalizedItemFieldsTests(OperationFixtureMixin, TestCase):
+    """Öğe ve alt öğelerdeki operasyon/tarih kopyaları"""
+
+    def test_items_copy_operation_and_date_from_their_day(self):
+        for item in OperationItem.objects.select_related('operation_day'):
+            self.assertEqual((item.operation_id, item.date), (item.operation_day.operation_id, item.operation_day.date))
+        for sub_item in OperationSubItem.objects.select_related('operation_item__operation_day'):
+            day = sub_item.operation_item.operation_day
+            self.assertEqual((sub_item.operation_id, sub_item.date), (day.operation_id, day.date))
+
+    def test_day_date_change_is_copied_to_items(self):
+        day = OperationDay.objects.get(pk=self.day.pk)
+        day.date = day.date + timedelta(days=30)
+        day.save()
+        self.assertEqual(set(OperationItem.objects.filter(operation_day=day).values_list('date', flat=True)), {day.date})
+        self.assertEqual(
+            set(OperationSubItem.objects.filter(operation_item__operation_day=day).values_list('date', flat=True)), {day.date}
+        )
+
+
+class SoftDeleteServiceTests(OperationFixtureMixin, TestCase):
+    """Aktiflik bayrağının alt ağaca toplu yayılması"""
+
+    def test_operation_subtree_is_updated_in_one_statement_per_level(self):
+        items = OperationItem.objects.filter(operation=self.operation).count()
+        sub_items = OperationSubItem.objects.filter(operation=self.operation).count()
+        with self.captureOnCommitCallbacks(execute=True):
+            DispatchService.rebuild_operation(self.operation.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = SoftDeleteService.set_active(self.operation, False)
+        self.assertEqual(counts, {
+            'operation': 1, 'operationcustomer': 4, 'operationsalesprice': 1,
+            'operationday': self.DAY_COUNT, 'operationitem': items, 'operationsubitem': sub_items,
+        })
+        self.assertFalse(OperationSubItem.objects.filter(operation=self.operation, is_active=True).exists())
+        self.assertEqual(Operation.objects.get(pk=self.operation.pk).total_pax, 0)
+        self.assertFalse(DispatchRow.objects.filter(operation=self.operation).exists())
+        self.assertFalse(OperationTotals.objects.filter(operation=self.operation).exists())
+
+    def test_bulk_toggle_returns_counts(self):
+        self.client.force_login(self.user)
+        day_ids = list(self.operation.days.values_list('id', flat=True)[:2])
+        sub_items = OperationSubItem.objects.filter(operation_item__operation_day_id__in=day_ids).count()
+        with self.assertNumQueries(13):
+            response = self.client.post(reverse('tour:toggle_active_bulk'), {
+                'model': 'day', 'ids': day_ids, 'is_active': '0'
+            })
+        data = response.json()
+        self.assertEqual(data['counts']['operationday'], 2)
+        self.assertEqual(data['counts']['operationsubitem'], sub_items)
+        self.assertEqual(self.operation.days.filter(is_active=False).count(), 2)
+        response = self.client.post(reverse('tour:toggle_active_bulk'), {'model': 'hotel', 'ids': day_ids})
+        self.assertEqual(response.status_code, 400)
+
+
+class RegistryTests(OperationFixtureMixin, TestCase):
+    """Genel CRUD görünümlerinin model kayıtları"""
+
+    def test_specs_are_registered_once_and_found_case_insensitively(self):
+        self.assertIs(get_spec('ActivityCost'), get_spec('activitycost'))
+        self.assertIs(get_spec('Hotel').form_class, REGISTRY['hotel'].form_class)
+        with self.assertRaises(LookupError):
+            get_spec('YokBoyleModel')
+
+    def test_unregistered_models_get_a_formless_spec(self):
+        spec = get_spec('OperationCustomer')
+        self.assertIs(spec, get_spec('operationcustomer'))
+        self.assertNotIn('operationcustomer', REGISTRY)
+        self.assertIsNone(spec.form_class)
+        with self.assertRaises(ValueError):
+            spec.get_form()
+        # İndeksi olmayan modellerde arama doğrudan alanlarda yapılır
+        self.assertEqual(
+            spec.search(spec.queryset(), 'Müşteri 1').count(),
+            OperationCustomer.objects.filter(first_name='Müşteri 1').count()
+        )
+
+    def test_search_and_export_use_precomputed_fields(self):
+        spec = get_spec('Hotel')
+        self.assertIn('city', [field.name for field in spec.search_fields])
+        self.assertIn('currency', [field.name for field in spec.search_fields])
+        SearchIndex.rebuild(spec)
+        self.assertEqual([hotel.name for hotel in spec.search(spec.queryset(), 'otel 1')], ['Otel 1'])
+        row = dict(zip((name for _, name, _ in spec.export_columns), spec.export_row(self.hotel)))
+        self.assertEqual(row['currency'], str(self.currency))
+        self.assertEqual(row['is_active'], 'Aktif')
+
+    def test_list_and_export_query_count_does_not_grow_with_rows(self):
+        self.client.force_login(self.user)
+
+        def count(name):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(f'tour:{name}', args=['VehicleCost']))
+            return len(queries)
+
+        before = {name: count(name) for name in ('list', 'export')}
+        for _ in range(10):
+            VehicleCost.objects.create(
+                supplier=self.vehicle_supplier, tour=self.tour, car_cost=40, minivan_cost=50, minibus_cost=60,
+                midibus_cost=70, bus_cost=80, currency=self.currency, valid_until=date.today()
+            )
+        self.assertEqual({name: count(name) for name in ('list', 'export')}, before)
+
+
+class KeysetPaginatorTests(TestCase):
+    """İmleçli sayfalama: derin sayfalar ilk sayfa kadar sorgu atar, COUNT(*) atılmaz"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Currency.objects.bulk_create(
+            Currency(code=f'{i:03d}', name=f'Para {i % 3}', symbol='¤') for i in range(250)
+        )
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append([currency.code for currency in page])
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages = self.walk(KeysetPaginator(Currency.objects.all(), 100))
+        self.assertEqual([len(page) for page in pages], [100, 100, 50])
+        self.assertEqual(sum(pages, []), [f'{i:03d}' for i in range(250)])
+
+        # Sıralama alanında tekrar eden değerler pk ile ayrılır
+        paginator = KeysetPaginator(Currency.objects.all(), 40, ordering='-name')
+        expected = list(Currency.objects.order_by('-name', '-pk').values_list('code', flat=True))
+        self.assertEqual(sum(self.walk(paginator), []), expected)
+
+    def test_previous_cursor_returns_the_same_page(self):
+        paginator = KeysetPaginator(Currency.objects.all(), 100)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(list(paginator.page(back.previous_cursor)), list(first))
+        self.assertFalse(paginator.page(back.previous_cursor).has_previous)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Currency.objects.all(), 10)
+        for cursor in ('bozuk', 'WzFd', 'WyJ4IiwgMV0'):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        user = CustomUser.objects.create_user(username='sayfa', password='x')
+        self.client.force_login(user)
+        url = reverse('tour:list', args=['Currency'])
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url, HTTP_HX_REQUEST='true')
+        page = response.context['objects']
+        while page.has_next:
+            with CaptureQueriesContext(connection) as deep:
+                response = self.client.get(url, {'cursor': page.next_cursor}, HTTP_HX_REQUEST='true')
+            page = response.context['objects']
+        self.assertEqual(len(deep), len(first))
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in first.captured_queries))
+        self.assertEqual(self.client.get(url, {'cursor': 'bozuk'}).status_code, 200)
+
+
+class SearchIndexTests(OperationFixtureMixin, TestCase):
+    """Genel liste aramasının metin indeksi"""
+
+    def setUp(self):
+        call_command('rebuild_search_index', stdout=io.StringIO())
+
+    def names(self, model, query):
+        spec = get_spec(model)
+        return sorted(obj.name for obj in spec.search(spec.queryset(), query))
+
+    def test_turkish_case_folding(self):
+        self.assertEqual(fold('İSTANBUL Işık  ılık'), 'istanbul işik ilik')
+        for query in ('istanbul', 'İSTANBUL', 'ISTANBUL', 'stanb'):
+            self.assertEqual(self.names('Hotel', query), ['Otel 0', 'Otel 1', 'Otel 2'], query)
+        self.assertEqual(self.names('Tour', 'şehir'), ['Şehir Turu'])
+        self.assertEqual(self.names('Hotel', 'ot'), ['Otel 0', 'Otel 1', 'Otel 2'])
+        self.assertEqual(self.names('Hotel', 'yok'), [])
+
+    def test_relations_without_name_are_searchable(self):
+        # Currency'nin name alanı yok sayılmaz; __str__ (kod ve sembol) indekse girer
+        self.assertEqual(self.names('Hotel', 'eur'), ['Otel 0', 'Otel 1', 'Otel 2'])
+
+    def test_migration_backfills_existing_rows(self):
+        backfill = importlib.import_module('tour.migrations.0018_backfill_searchdocument')
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.names('Hotel', 'otel'), [])
+        backfill.fill_search_index(None, None)
+        self.assertEqual(self.names('Hotel', 'otel'), ['Otel 0', 'Otel 1', 'Otel 2'])
+        self.assertEqual(self.names('Guide', 'rehber'), ['Rehber'])
+
+    def test_index_follows_saves_deletes_and_related_renames(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            hotel = Hotel.objects.create(
+                name='Geçici Otel', city=self.other_city, single_price=1, double_price=1, triple_price=1,
+                currency=self.currency, valid_until=date.today()
+            )
+        self.assertEqual(self.names('Hotel', 'nevşehir'), ['Geçici Otel'])
+        with self.captureOnCommitCallbacks(execute=True):
+            hotel.delete()
+        self.assertEqual(self.names('Hotel', 'nevşehir'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            hotel = Hotel.objects.get(name='Otel 1')
+            hotel.name = 'Kapadokya Konak'
+            hotel.save()
+        self.assertEqual(self.names('Hotel', 'konak'), ['Kapadokya Konak'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.city.name = 'İzmir'
+            self.city.save()
+        self.assertEqual(self.names('Hotel', 'izmir'), ['Kapadokya Konak', 'Otel 0', 'Otel 2'])
+        self.assertEqual(self.names('Hotel', 'istanbul'), [])
+
+    def test_list_search_is_a_single_indexed_lookup(self):
+        self.client.force_login(self.user)
+        url = reverse('tour:list', args=['Hotel'])
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(url, HTTP_HX_REQUEST='true')
+        with CaptureQueriesContext(connection) as searched:
+            response = self.client.get(url, {'search': 'İstanbul'}, HTTP_HX_REQUEST='true')
+        self.assertEqual(len(searched), len(plain))
+        self.assertEqual(len(response.context['objects']), 3)
+        self.assertEqual(SearchDocument.objects.filter(model_name='hotel').count(), 3)
+        if connection.vendor == 'sqlite':
+            self.assertIn('MATCH', searched.captured_queries[-1]['sql'])
+
+
+class ExportTests(OperationFixtureMixin, TestCase):
+    """Sabit bellekli Excel/CSV dışa aktarma"""
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_xlsx_export_rows_and_sampled_widths(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('tour:export', args=['Hotel']))
+        self.assertTrue(response.streaming)
+        self.assertIn('hotel_export.xlsx', response['Content-Disposition'])
+        ws = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(ws.iter_rows(values_only=True))
+        spec = get_spec('Hotel')
+        self.assertEqual(list(rows[0]), [header for header, _, _ in spec.export_columns])
+        self.assertEqual(sorted(row[1] for row in rows[1:]), ['Otel 0', 'Otel 1', 'Otel 2'])
+        self.assertTrue(ws.cell(row=1, column=1).font.bold)
+        self.assertGreaterEqual(ws.column_dimensions['B'].width, len('Otel 0'))
+
+    def test_csv_export_streams_rows(self):
+        response = self.client.get(reverse('tour:export', args=['Guide']), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        with CaptureQueriesContext(connection) as queries:
+            content = b''.join(response.streaming_content).decode('utf-8')
+        # Satırlar yanıt okunurken sorgulanır
+        self.assertEqual(len(queries), 2)
+        lines = content.lstrip('\ufeff').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Rehber', lines[1])
+        self.assertIn('İstanbul', lines[1])
+
+    def test_unregistered_model_still_exports(self):
+        response = self.client.get(reverse('tour:export', args=['OperationCustomer']), {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode('utf-8').lstrip('\ufeff').splitlines()
+        self.assertEqual(len(lines), OperationCustomer.objects.count() + 1)
+
+    def test_dispatch_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('tour:operation_dispatch_export'))
+        ws = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(ws.title, date.today().strftime('%d.%m.%Y'))
@@ -20,12 +20,14 @@ urlpatterns = [
     #Operation
     path('operation/<int:operation_id>/', views.operation, name='operation'),
     path('operation/update/<int:operation_id>/', views.operation_update, name='operation_update'),
+    path('operation/shift/<int:operation_id>/', views.operation_shift, name='operation_shift'),
     path('operation/toggle/<int:operation_id>/', views.toggle_operation, name='toggle_operation'),
     path('operation/customer/toggle/<int:operation_customer_id>/', views.toggle_operation_customer, name='toggle_operation_customer'),
     path('operation/sales_price/toggle/<int:operation_sales_price_id>/', views.toggle_operation_sales_price, name='toggle_operation_sales_price'),
     path('operation/day/toggle/<int:operation_day_id>/', views.toggle_operation_day, name='toggle_operation_day'),
     path('operation/item/toggle/<int:operation_item_id>/', views.toggle_operation_item, name='toggle_operation_item'),
     path('operation/sub_item/toggle/<int:operation_sub_item_id>/', views.toggle_operation_sub_item, name='toggle_operation_sub_item'),
+    path('operation/toggle/bulk/', views.toggle_active_bulk, name='toggle_active_bulk'),
     path('operation/customer/update/<int:operation_customer_id>/', views.operation_customer_update, name='operation_customer_update'),
     path('operation/sales_price/update/<int:operation_sales_price_id>/', views.operation_sales_price_update, name='operation_sales_price_update'),
 
@@ -81,4 +83,11 @@ urlpatterns = [
     path('operation/jobs/sub_item/transfer_update/<int:operation_sub_item_id>/', views.jobs_sub_item_transfer_update, name='jobs_sub_item_transfer_update'),
     path('operation/jobs/sub_item/tour_update/<int:operation_sub_item_id>/', views.jobs_sub_item_tour_update, name='jobs_sub_item_tour_update'),
     path('operation/jobs/my', views.my_operation_jobs, name='my_operation_jobs'),
+    path('operation/jobs/events', views.operation_jobs_events, name='operation_jobs_events'),
+    path('operation/jobs/item/<int:operation_item_id>/', views.jobs_item, name='jobs_item'),
+    path('operation/jobs/sub_item/<int:operation_sub_item_id>/', views.jobs_sub_item, name='jobs_sub_item'),
+    path('operation/vehicle_cost_suggestion', views.vehicle_cost_suggestion, name='vehicle_cost_suggestion'),
+    path('operation/finance', views.operation_finance, name='operation_finance'),
+    path('operation/dispatch', views.operation_dispatch, name='operation_dispatch'),
+    path('operation/dispatch/export', views.operation_dispatch_export, name='operation_dispatch_export'),
 ]   
\ No newline at end of file
@@ -1,17 +1,23 @@
 from gettext import translation
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.contrib.auth import login, logout
 from django.contrib import messages
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
-from django.apps import apps
 from django.core.cache import cache
-from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Prefetch, Q, Sum
 from django.db.models.functions import Coalesce
 from django import forms
 from django.forms import ModelChoiceField, ModelMultipleChoiceField, ChoiceField
 from django.contrib.auth.decorators import login_required
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.conf import settings
 from tour.services import sms
 from tour.models import (
     CustomUser, Operation, OperationCustomer, OperationDay, 
@@ -19,28 +25,33 @@ from tour.models import (
     Currency, City, District, Neighborhood, Support, VehicleType, 
     BuyerCompany, Tour, NoVehicleTour, Transfer, Hotel, 
     Museum, Activity, Guide, VehicleSupplier, ActivitySupplier,
-    VehicleCost
+    VehicleCost, DispatchRow, OperationTotals
 )
 
-from .services import LoginService, PasswordResetService, sms
+from .events import event_stream, jobs_channel
+from .exports import EXPORT_CHUNK_SIZE, csv_response, xlsx_response
+from .pagination import InvalidCursor, KeysetPaginator
+from .registry import get_spec
+from .services import (
+    CurrencyConverter, LoginService, OperationCacheService, OperationGraph, OperationService,
+    PasswordResetService, SoftDeleteService, VehicleCostMatrix, sms
+)
 from .forms import (
-    CurrencyForm, CityForm, DistrictForm, NeighborhoodForm, 
     OperationItemActivityForm, OperationItemNoVehicleGuideForm, OperationItemNoVehicleTourForm, 
     OperationItemVehicleForm, OperationSubItemActivityForm, 
     OperationSubItemGuideForm, OperationSubItemHotelForm, 
     OperationSubItemMuseumForm, OperationSubItemOtherPriceForm, 
     OperationSubItemTourForm, OperationSubItemTransferForm, SendSmsForm, SupportForm,
-    VehicleTypeForm, BuyerCompanyForm, TourForm, NoVehicleTourForm, 
-    TransferForm, HotelForm, MuseumForm, ActivityForm, GuideForm, 
-    VehicleSupplierForm, ActivitySupplierForm, VehicleCostForm, 
-    ActivityCostForm, OperationForm, OperationCustomerForm, 
-    OperationSalesPriceForm
+    OperationForm, OperationCustomerForm, 
+    OperationSalesPriceForm, OperationShiftForm
 )
 
 from datetime import datetime, timedelta
+import hashlib
+from decimal import Decimal
+from urllib.parse import urlencode
 from django.utils import timezone
 from django.db import transaction
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
 
 def send_sms(request):
@@ -151,73 +162,39 @@ def logout_view(request):
 @login_required
 def generic_list_view(request, model):
     try:
-        model_class = apps.get_model(app_label="tour", model_name=model)
-        objects = model_class.objects.all()
-        
+        spec = get_spec(model)
+
         # Arama işlemi
         search_query = request.GET.get('search', '')
-        if search_query:
-            from django.db.models import Q
-            search_filters = Q()
-            for field in model_class._meta.fields:
-                if field.get_internal_type() in ['CharField', 'TextField']:
-                    search_filters |= Q(**{f"{field.name}__icontains": search_query})
-                elif field.get_internal_type() in ['ForeignKey']:
-                    search_filters |= Q(**{f"{field.name}__name__icontains": search_query})
-            objects = objects.filter(search_filters)
-        
-        # Form sınıfını belirle
-        form_classes = {
-            'Currency': CurrencyForm,
-            'VehicleType': VehicleTypeForm,
-            'BuyerCompany': BuyerCompanyForm,
-            'Tour': TourForm,
-            'NoVehicleTour': NoVehicleTourForm,
-            'Transfer': TransferForm,
-            'Hotel': HotelForm,
-            'Museum': MuseumForm,
-            'Activity': ActivityForm,
-            'Guide': GuideForm,
-            'VehicleSupplier': VehicleSupplierForm,
-            'ActivitySupplier': ActivitySupplierForm,
-            'VehicleCost': VehicleCostForm,
-        }
-        
-        form_class = form_classes.get(model)
-        if not form_class:
-            raise ValueError(f'Form sınıfı bulunamadı: {model}')
-            
+        objects = spec.search(spec.queryset(), search_query)
+
         if request.method == 'POST':
-            form = form_class(request.POST, request.FILES)
+            form = spec.get_form(request.POST, request.FILES)
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Kayıt başarıyla oluşturuldu.')
                 
                 # HTMX isteği ise sadece form şablonunu döndür
                 if request.headers.get('HX-Request'):
-                    return render(request, 'generic/generic_form.html', {'form': form_class()})
+                    return render(request, 'generic/generic_form.html', {'form': spec.get_form()})
                     
                 return redirect('tour:list', model=model)
         else:
-            form = form_class()
+            form = spec.get_form()
             
-        # Sayfalama işlemi
-        paginator = Paginator(objects, 100)  # Her sayfada 100 kayıt göster
-        page = request.GET.get('page')
-        
+        # Sayfalama işlemi: COUNT(*) ve OFFSET yerine imleçle sonraki/önceki sayfa okunur
+        paginator = KeysetPaginator(objects, 100, ordering=spec.ordering[0])  # Her sayfada 100 kayıt göster
         try:
-            objects = paginator.page(page)
-        except PageNotAnInteger:
-            objects = paginator.page(1)
-        except EmptyPage:
-            objects = paginator.page(paginator.num_pages)
-            
+            objects = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            objects = paginator.page()
+
         context = {
             'page_title': f'{model} Listesi',
             'model': model,
             'form': form,
             'objects': objects,
-            'fields': model_class._meta.fields,
+            'fields': spec.columns,
             'detail_url': 'tour:detail',
             'update_url': 'tour:update',
             'delete_url': 'tour:delete',
@@ -238,32 +215,11 @@ def generic_list_view(request, model):
 @login_required
 def generic_update_view(request, model, pk):
     try:
-        model_class = apps.get_model(app_label="tour", model_name=model)
-        object = model_class.objects.get(id=pk)
-        
-        # Form sınıfını belirle
-        form_classes = {
-            'Currency': CurrencyForm,
-            'VehicleType': VehicleTypeForm,
-            'BuyerCompany': BuyerCompanyForm,
-            'Tour': TourForm,
-            'NoVehicleTour': NoVehicleTourForm,
-            'Transfer': TransferForm,
-            'Hotel': HotelForm,
-            'Museum': MuseumForm,
-            'Activity': ActivityForm,
-            'Guide': GuideForm,
-            'VehicleSupplier': VehicleSupplierForm,
-            'ActivitySupplier': ActivitySupplierForm,
-            'VehicleCost': VehicleCostForm,
-        }
-        
-        form_class = form_classes.get(model)
-        if not form_class:
-            raise ValueError(f'Form sınıfı bulunamadı: {model}')
+        spec = get_spec(model)
+        object = spec.model.objects.get(id=pk)
             
         if request.method == 'POST':
-            form = form_class(request.POST, request.FILES, instance=object)
+            form = spec.get_form(request.POST, request.FILES, instance=object)
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Kayıt başarıyla güncellendi.')
@@ -272,8 +228,8 @@ def generic_update_view(request, model, pk):
                 if request.headers.get('HX-Request'):
                     # Tablo verilerini hazırla
                     table_context = {
-                        'objects': model_class.objects.all(),
-                        'fields': model_class._meta.fields,
+                        'objects': KeysetPaginator(spec.queryset(), 100, ordering=spec.ordering[0]).page(),
+                        'fields': spec.columns,
                         'detail_url': 'tour:detail',
                         'update_url': 'tour:update',
                         'delete_url': 'tour:delete',
@@ -285,7 +241,7 @@ def generic_update_view(request, model, pk):
                     
                     # Form verilerini hazırla
                     form_context = {
-                        'form': form_class(),
+                        'form': spec.get_form(),
                         'model': model
                     }
                     
@@ -297,7 +253,7 @@ def generic_update_view(request, model, pk):
                     
                 return redirect('tour:list', model=model)
         else:
-            form = form_class(instance=object)  
+            form = spec.get_form(instance=object)  
             
         context = {
             'item': object,
@@ -321,10 +277,10 @@ def generic_update_view(request, model, pk):
 @login_required
 def generic_delete_view(request, model, pk):
     try:
-        # Model sınıfını al
-        model_class = apps.get_model(app_label="tour", model_name=model)
+        # Model kaydını al
+        spec = get_spec(model)
         # Nesneyi bul
-        obj = get_object_or_404(model_class, pk=pk)
+        obj = get_object_or_404(spec.model, pk=pk)
         
         # Nesneyi sil
         obj.delete()
@@ -348,74 +304,14 @@ def generic_delete_view(request, model, pk):
 @login_required
 def generic_export_view(request, model):
     try:
-        model_class = apps.get_model(app_label="tour", model_name=model)
-        objects = model_class.objects.all()
-        
-        # Excel dosyası oluştur
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
-        from django.http import HttpResponse
-        
-        # Yeni bir Excel çalışma kitabı oluştur
-        wb = Workbook()
-        ws = wb.active
-        ws.title = model
-        
-        # Başlık satırı için stil tanımla
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Başlık satırını ekle
-        headers = [field.verbose_name for field in model_class._meta.fields]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Veri satırlarını ekle
-        for row, obj in enumerate(objects, 2):
-            for col, field in enumerate(model_class._meta.fields, 1):
-                value = getattr(obj, field.name)
-                
-                # İlişkili alanları işle
-                if hasattr(value, '_meta'):  # Eğer değer bir model nesnesi ise
-                    value = str(value)
-                elif field.name == 'image' and value:
-                    value = value.url
-                elif field.name == 'date' and value:
-                    value = value.strftime('%d.%m.%Y')
-                elif field.name == 'time' and value:
-                    value = value.strftime('%H:%M')
-                elif field.name == 'is_active' and value is not None:
-                    value = 'Aktif' if value else 'Pasif'
-                elif field.name == 'created_at' and value:
-                    value = value.strftime('%d.%m.%Y %H:%M')
-                elif field.name == 'updated_at' and value:
-                    value = value.strftime('%d.%m.%Y %H:%M')
-                
-                ws.cell(row=row, column=col, value=value)
-        
-        # Sütun genişliklerini otomatik ayarla
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Excel dosyasını HTTP yanıtı olarak döndür
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="{model.lower()}_export.xlsx"'
-        wb.save(response)
-        
-        return response
+        spec = get_spec(model)
+        # Kayıtlar parça parça okunur; tablo boyutundan bağımsız olarak bellek sabit kalır
+        rows = (spec.export_row(obj) for obj in spec.queryset().iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        header = [header for header, _, _ in spec.export_columns]
+
+        if request.GET.get('format') == 'csv':
+            return csv_response(f'{model.lower()}_export.csv', header, rows)
+        return xlsx_response(f'{model.lower()}_export.xlsx', model, header, rows)
         
     except Exception as e:
         messages.error(request, f'Dışa aktarma hatası: {str(e)}')
@@ -424,35 +320,13 @@ def generic_export_view(request, model):
 @login_required
 def generic_detail_view(request, model, pk):
     try:
-        # Model sınıfını al
-        model_class = apps.get_model(app_label="tour", model_name=model)
+        # Model kaydını al
+        spec = get_spec(model)
         # Nesneyi bul
-        obj = get_object_or_404(model_class, pk=pk)
-        
-        # Form sınıfını belirle
-        form_classes = {
-            'Currency': CurrencyForm,
-            'VehicleType': VehicleTypeForm,
-            'BuyerCompany': BuyerCompanyForm,
-            'Tour': TourForm,
-            'NoVehicleTour': NoVehicleTourForm,
-            'Transfer': TransferForm,
-            'Hotel': HotelForm,
-            'Museum': MuseumForm,
-            'Activity': ActivityForm,
-            'Guide': GuideForm,
-            'VehicleSupplier': VehicleSupplierForm,
-            'ActivitySupplier': ActivitySupplierForm,
-            'VehicleCost': VehicleCostForm,
-            'ActivityCost': ActivityCostForm,
-        }
-        
-        form_class = form_classes.get(model)
-        if not form_class:
-            raise ValueError(f'Form sınıfı bulunamadı: {model}')
+        obj = get_object_or_404(spec.model, pk=pk)
             
         # Form oluştur (salt okunur)
-        form = form_class(instance=obj)
+        form = spec.get_form(instance=obj)
         for field in form.fields.values():
             field.disabled = True
             
@@ -461,7 +335,7 @@ def generic_detail_view(request, model, pk):
             'page_title': f'{model} Detayı',
             'model': model,
             'form': form,
-            'fields': model_class._meta.fields,
+            'fields': spec.columns,
         }
         
         # HTMX isteği ise sadece form şablonunu döndür
@@ -477,42 +351,21 @@ def generic_detail_view(request, model, pk):
 @login_required
 def generic_create_view(request, model):
     try:
-        model_class = apps.get_model(app_label="tour", model_name=model)
-        
-        # Form sınıfını belirle
-        form_classes = {
-            'Currency': CurrencyForm,
-            'VehicleType': VehicleTypeForm,
-            'BuyerCompany': BuyerCompanyForm,
-            'Tour': TourForm,
-            'NoVehicleTour': NoVehicleTourForm,
-            'Transfer': TransferForm,
-            'Hotel': HotelForm,
-            'Museum': MuseumForm,
-            'Activity': ActivityForm,
-            'Guide': GuideForm,
-            'VehicleSupplier': VehicleSupplierForm,
-            'ActivitySupplier': ActivitySupplierForm,
-            'VehicleCost': VehicleCostForm,
-        }
-        
-        form_class = form_classes.get(model)
-        if not form_class:
-            raise ValueError(f'Form sınıfı bulunamadı: {model}')
+        spec = get_spec(model)
             
         if request.method == 'POST':
-            form = form_class(request.POST, request.FILES)
+            form = spec.get_form(request.POST, request.FILES)
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Kayıt başarıyla oluşturuldu.')
                 
                 # HTMX isteği ise sadece form şablonunu döndür
                 if request.headers.get('HX-Request'):
-                    return render(request, 'generic/generic_form.html', {'form': form_class()})
+                    return render(request, 'generic/generic_form.html', {'form': spec.get_form()})
                     
                 return redirect('tour:list', model=model)
         else:
-            form = form_class()
+            form = spec.get_form()
             
         context = {
             'page_title': f'{model} Oluştur',
@@ -532,216 +385,261 @@ def generic_create_view(request, model):
 
 
 #Operasyon İşlemleri
+def toggle_active(model, pk, *fields):
+    """
+    Kaydın aktifliğini alt ağacıyla birlikte tersine çevirir ve kaydın istenen
+    alanlarını (üst operasyon id'si dahil) döndürür. Kayıt yüklenip kaydedilmez.
+    """
+    operation_field = 'pk' if model is Operation else 'operation_id'
+    row = model.objects.filter(pk=pk).values('is_active', operation_field, *fields).first()
+    if row is None:
+        raise Http404('Kayıt bulunamadı')
+    SoftDeleteService.set_active_many(model, [pk], not row['is_active'], operation_ids={row[operation_field]})
+    row['operation_id'] = row[operation_field]
+    return row
+
+def toggle_response(request, operation_id, fragment):
+    """HTMX isteğinde yalnızca değişen parçayı, aksi halde yönlendirme döndürür"""
+    if request.headers.get('HX-Request'):
+        return fragment()
+    next_url = request.GET.get('next')
+    if next_url:
+        return redirect(next_url)
+    return redirect('tour:operation', operation_id=operation_id)
+
 #Operasyon Durumunu Değiştir
 @login_required
 def toggle_operation(request, operation_id):
-    operation = get_object_or_404(Operation, id=operation_id)
-    new_status = not operation.is_active
-    next_url = request.GET.get('next')
-    # Tek bir transaction içinde tüm işlemleri gerçekleştir
-    with transaction.atomic():
-        # Operasyon durumunu güncelle
-        operation.is_active = new_status
-        operation.save()
-
-        OperationCustomer.objects.filter(operation=operation).update(is_active=new_status)
-        OperationSalesPrice.objects.filter(operation=operation).update(is_active=new_status)
-        # İlgili tüm günleri güncelle
-        OperationDay.objects.filter(operation=operation).update(is_active=new_status)
-        # İlgili tüm öğeleri güncelle
-        OperationItem.objects.filter(operation_day__operation=operation).update(is_active=new_status)
-        # İlgili tüm alt öğeleri güncelle
-        OperationSubItem.objects.filter(operation_item__operation_day__operation=operation).update(is_active=new_status)
+    toggle_active(Operation, operation_id)
+    if request.headers.get('HX-Request'):
+        return render_operation_detail(request, operation_id)
     return redirect('tour:operation_list')
 
 #Operasyon Müşteri Durumunu Değiştir
 @login_required
 def toggle_operation_customer(request, operation_customer_id):
-    customer = get_object_or_404(OperationCustomer, id=operation_customer_id)
-    customer.is_active = not customer.is_active
-    customer.save()
-    next_url = request.GET.get('next')
-    if next_url:
-        return redirect(next_url)
-    return redirect('tour:operation_day_create', operation_id=customer.operation.id)
+    operation_id = toggle_active(OperationCustomer, operation_customer_id)['operation_id']
+    return toggle_response(request, operation_id, lambda: render_operation_customers(request, operation_id))
 
 #Operasyon Satış Fiyatı Durumunu Değiştir
 @login_required
 def toggle_operation_sales_price(request, operation_sales_price_id):
-    sales_price = get_object_or_404(OperationSalesPrice, id=operation_sales_price_id)
-    sales_price.is_active = not sales_price.is_active
-    sales_price.save()
-    next_url = request.GET.get('next')
-    if next_url:
-        return redirect(next_url)
-    return redirect('tour:operation_day_create', operation_id=sales_price.operation.id)
+    operation_id = toggle_active(OperationSalesPrice, operation_sales_price_id)['operation_id']
+    return toggle_response(request, operation_id, lambda: render_operation_sales_prices(request, operation_id))
 
 #Operasyon Gün Durumunu Değiştir
 @login_required
 def toggle_operation_day(request, operation_day_id):
-    operation_day = get_object_or_404(OperationDay, id=operation_day_id)
-    new_status = not operation_day.is_active
-    next_url = request.GET.get('next')
-    # Tek bir transaction içinde tüm işlemleri gerçekleştir
-    with transaction.atomic():
-        # Gün durumunu güncelle
-        operation_day.is_active = new_status
-        operation_day.save()
-        
-        # İlgili tüm öğeleri güncelle
-        OperationItem.objects.filter(operation_day=operation_day).update(is_active=new_status)
-        
-        # İlgili tüm alt öğeleri güncelle
-        OperationSubItem.objects.filter(operation_item__operation_day=operation_day).update(is_active=new_status)
-    if next_url:
-        return redirect(next_url)
-    return redirect('tour:operation_day_create', operation_id=operation_day.operation.id)
+    operation_id = toggle_active(OperationDay, operation_day_id)['operation_id']
+    return toggle_response(request, operation_id, lambda: render_operation_day(request, operation_day_id))
 
 #Operasyon Öğe Durumunu Değiştir
 @login_required
 def toggle_operation_item(request, operation_item_id):
-    operation_item = get_object_or_404(OperationItem, id=operation_item_id)
-    new_status = not operation_item.is_active
-    next_url = request.GET.get('next')
-
-    with transaction.atomic():
-        # Öğe durumunu güncelle
-        operation_item.is_active = new_status
-        operation_item.save()
-        
-        # İlgili tüm alt öğeleri güncelle
-        OperationSubItem.objects.filter(operation_item=operation_item).update(is_active=new_status)
-    if next_url:
-        return redirect(next_url)
-    return redirect('tour:operation_day_create', operation_id=operation_item.operation_day.operation.id)
+    operation_id = toggle_active(OperationItem, operation_item_id)['operation_id']
+    return toggle_response(request, operation_id, lambda: render_operation_item(request, operation_item_id))
 
 #Operasyon Alt Öğe Durumunu Değiştir
 @login_required
 def toggle_operation_sub_item(request, operation_sub_item_id):
-    operation_sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation_sub_item.is_active = not operation_sub_item.is_active
-    operation_sub_item.save()
-    next_url = request.GET.get('next')
-    if next_url:
-        return redirect(next_url)
-    return redirect('tour:operation_day_create', operation_id=operation_sub_item.operation_item.operation_day.operation.id)
+    sub_item = toggle_active(OperationSubItem, operation_sub_item_id, 'operation_item_id')
+    return toggle_response(
+        request, sub_item['operation_id'], lambda: render_operation_item(request, sub_item['operation_item_id'])
+    )
+
+#Toplu Durum Değiştir
+@login_required
+@require_POST
+def toggle_active_bulk(request):
+    """
+    Aynı türden birçok kaydı alt ağaçlarıyla birlikte aktif/pasif yapar;
+    HTMX'in sayfayı yeniden yüklemeden güncelleyebilmesi için etkilenen sayıları döndürür
+    """
+    model = SoftDeleteService.MODELS.get(request.POST.get('model'))
+    if model is None:
+        return JsonResponse({'error': 'Geçersiz model'}, status=400)
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ids')]
+    except ValueError:
+        return JsonResponse({'error': 'Geçersiz id'}, status=400)
+    flag = request.POST.get('is_active') in ('1', 'true', 'True')
+    counts = SoftDeleteService.set_active_many(model, ids, flag)
+    return JsonResponse({'is_active': flag, 'counts': counts})
 
 #Operasyon İşlemleri
+def get_operation_graph_or_404(operation_id):
+    """Operasyon ağacını yükler, bulunamazsa 404 döndürür"""
+    try:
+        return OperationGraph.load(operation_id)
+    except Operation.DoesNotExist:
+        raise Http404('Operasyon bulunamadı')
+
+def get_operation_detail_context(graph, version=None):
+    """Detay şablonu için bağlamı gün kartı önbellek sürümüyle birlikte döndürür"""
+    context = graph.as_context()
+    context['cache_version'] = version or OperationCacheService.get_version(graph.operation.id)
+    context['cache_timeout'] = OperationCacheService.TIMEOUT
+    return context
+
+def render_operation_detail(request, operation_id):
+    """Kayıt sonrası operasyon detayını güncel ağaçla yeniden oluşturur"""
+    graph = get_operation_graph_or_404(operation_id)
+    return render(request, 'operation/includes/operation_detail.html', get_operation_detail_context(graph))
+
+def render_operation_day(request, operation_day_id):
+    """Yalnızca değişen gün kartını döndürür (#day-<id> içine yerleşir)"""
+    try:
+        day = OperationGraph.load_day(operation_day_id)
+    except OperationDay.DoesNotExist:
+        raise Http404('Operasyon günü bulunamadı')
+    return render(request, 'operation/includes/operation_day.html', {
+        'day': day,
+        'operation': day.operation
+    })
+
+def render_operation_item(request, operation_item_id):
+    """Yalnızca değişen öğe kartını döndürür (#item-<id> içine yerleşir)"""
+    try:
+        item = OperationGraph.load_item(operation_item_id)
+    except OperationItem.DoesNotExist:
+        raise Http404('Operasyon öğesi bulunamadı')
+    return render(request, 'operation/includes/operation_item.html', {
+        'item': item,
+        'day': item.operation_day,
+        'operation': item.operation_day.operation
+    })
+
+def render_operation_customers(request, operation_id):
+    """Müşteri tablosunu ve toplam kişi sayısını (out-of-band) döndürür"""
+    try:
+        operation = OperationGraph.load_customers(operation_id)
+    except Operation.DoesNotExist:
+        raise Http404('Operasyon bulunamadı')
+    return render(request, 'operation/includes/operation_customers.html', {
+        'operation': operation,
+        'customers': operation.customers.all(),
+        'total_pax_oob': True
+    })
+
+def render_operation_sales_prices(request, operation_id):
+    """Yalnızca satış fiyatları tablosunu döndürür"""
+    try:
+        operation = OperationGraph.load_sales_prices(operation_id)
+    except Operation.DoesNotExist:
+        raise Http404('Operasyon bulunamadı')
+    return render(request, 'operation/includes/operation_sales_prices.html', {
+        'operation': operation,
+        'sales_prices': operation.sales_prices.all()
+    })
+
+def pending_messages(request):
+    """Henüz gösterilmemiş flash mesajları; okumak onları tüketmez"""
+    storage = messages.get_messages(request)
+    pending = [f'{message.level}:{message.message}' for message in storage]
+    storage.used = False
+    return pending
+
+def build_etag(request, *parts):
+    """
+    Kullanıcıya ve CSRF çerezine bağlı güçlü bir ETag üretir. Bekleyen flash
+    mesajlar da ETag'e girer; yönlendirmeyle gelinen sayfa 304 ile mesajsız kalmaz
+    """
+    raw = '|'.join(str(part) for part in (
+        request.user.pk,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.get_full_path(),
+        request.headers.get('HX-Request', ''),
+        *pending_messages(request),
+        *parts
+    ))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def operation_etag(request, operation_id):
+    """Operasyon detayının ETag'i: operasyonun önbellek sürümü"""
+    return build_etag(request, operation_id, OperationCacheService.get_version(operation_id))
+
+def jobs_etag(request, days):
+    """Görev ekranlarının ETag'i: aralıktaki operasyonların sürümleri"""
+    operation_ids = sorted(set(days.values_list('operation_id', flat=True)))
+    versions = OperationCacheService.get_versions(operation_ids)
+    return build_etag(request, datetime.now().date(), *(
+        f'{operation_id}:{versions[operation_id]}' for operation_id in operation_ids
+    ))
+
+def operation_jobs_etag(request):
+    """Tüm görevler ekranı için 7 günlük aralığın ETag'i"""
+    today = datetime.now().date()
+    return jobs_etag(request, OperationDay.objects.filter(
+        date__range=(today, today + timedelta(days=6))
+    ))
+
+def my_operation_jobs_etag(request):
+    """Kullanıcının takip ettiği operasyonlar için 7 günlük aralığın ETag'i"""
+    today = datetime.now().date()
+    return jobs_etag(request, OperationDay.objects.filter(
+        date__range=(today, today + timedelta(days=6)),
+        operation__follow_by=request.user
+    ))
+
 #Operasyon Görüntüle
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=operation_etag)
 def operation(request, operation_id):
-    operation = get_object_or_404(Operation, id=operation_id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    """Operasyon detayını sürüm anahtarlı önbellekten sunar, yoksa oluşturup yazar"""
+    version = OperationCacheService.get_version(operation_id)
+    detail_html = OperationCacheService.get_detail(operation_id, version)
+    if detail_html is None:
+        graph = get_operation_graph_or_404(operation_id)
+        detail_html = render_to_string(
+            'operation/includes/operation_detail.html',
+            get_operation_detail_context(graph, version),
+            request=request
+        )
+        OperationCacheService.set_detail(operation_id, version, detail_html)
     return render(request, 'operation/operation.html', {
-        'operation': operation, 
-        'customers': customers, 
-        'sales_prices': sales_prices, 
-        'days': days, 
-        'items': items, 
-        'sub_items': sub_items
+        'detail_html': mark_safe(detail_html)
     })
 
 def operation_update(request, operation_id):
     operation = get_object_or_404(Operation, id=operation_id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
     form = OperationForm(instance=operation)
     if request.method == 'POST':
         form = OperationForm(request.POST, instance=operation)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'page_title': 'Operasyon Düzenle',
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_detail(request, operation.id)
     return render(request, 'operation/forms/form.html', {
         'operation': operation,
         'page_title': 'Operasyon Düzenle',
         'form': form,
-        'page_title': 'Operasyon Düzenle',
         'post_url': reverse('tour:operation_update', args=[operation.id])
     })
 
+def operation_shift(request, operation_id):
+    """Operasyonu günleri ve tüm öğeleriyle birlikte ileri/geri kaydırır"""
+    operation = get_object_or_404(Operation, id=operation_id)
+    form = OperationShiftForm()
+    if request.method == 'POST':
+        form = OperationShiftForm(request.POST)
+        if form.is_valid():
+            OperationService.shift_operation(operation, form.cleaned_data['days'])
+            return render_operation_detail(request, operation.id)
+    return render(request, 'operation/forms/form.html', {
+        'operation': operation,
+        'page_title': 'Operasyon Tarihlerini Kaydır',
+        'form': form,
+        'post_url': reverse('tour:operation_shift', args=[operation.id])
+    })
+
 def operation_customer_update(request, operation_customer_id):
-    customer = get_object_or_404(OperationCustomer, id=operation_customer_id)
-    operation = get_object_or_404(Operation, id=customer.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    customer = get_object_or_404(OperationCustomer.objects.select_related('operation'), id=operation_customer_id)
+    operation = customer.operation
     form = OperationCustomerForm(instance=customer)
     if request.method == 'POST':
         form = OperationCustomerForm(request.POST, instance=customer)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'customer': customer,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_customers(request, operation.id)
         else:
             print(form.errors)
     return render(request, 'operation/forms/form.html', {
@@ -749,80 +647,61 @@ def operation_customer_update(request, operation_customer_id):
         'customer': customer,
         'operation': operation,
         'page_title': 'Müşteri Düzenle',
-        'post_url': reverse('tour:operation_customer_update', args=[customer.id])
+        'post_url': reverse('tour:operation_customer_update', args=[customer.id]),
+        'target': '#operation-customers'
     })
 
 
 def operation_sales_price_update(request, operation_sales_price_id):
-    sales_price = get_object_or_404(OperationSalesPrice, id=operation_sales_price_id)
-    operation = get_object_or_404(Operation, id=sales_price.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    sales_price = get_object_or_404(OperationSalesPrice.objects.select_related('operation'), id=operation_sales_price_id)
+    operation = sales_price.operation
     form = OperationSalesPriceForm(instance=sales_price)
     if request.method == 'POST':
         form = OperationSalesPriceForm(request.POST, instance=sales_price)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'sales_price': sales_price,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_sales_prices(request, operation.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'sales_price': sales_price,
         'operation': operation,
         'page_title': 'Satış Fiyatı Düzenle',
-        'post_url': reverse('tour:operation_sales_price_update', args=[sales_price.id])
+        'post_url': reverse('tour:operation_sales_price_update', args=[sales_price.id]),
+        'target': '#operation-sales-prices'
     })
 
 
+def get_vehicle_cost_url(day, item=None):
+    """Araç formunun maliyet önerisi isteyeceği adres; tarih ve varsa güzergah eklenir"""
+    params = {'date': day.date.isoformat()}
+    if item is not None:
+        route = item.subitems.filter(is_active=True).exclude(tour=None, transfer=None).order_by(
+            'ordering'
+        ).values('tour_id', 'transfer_id').first()
+        if route and route['tour_id']:
+            params['tour'] = route['tour_id']
+        elif route:
+            params['transfer'] = route['transfer_id']
+    return f"{reverse('tour:vehicle_cost_suggestion')}?{urlencode(params)}"
+
+def vehicle_cost_suggestion(request):
+    """Seçilen tedarikçi, araç tipi, tarih ve güzergah için geçerli maliyeti döndürür"""
+    try:
+        supplier_id = int(request.GET['vehicle_supplier'])
+        vehicle_type_id = int(request.GET['vehicle_type'])
+        target_date = datetime.strptime(request.GET['date'], '%Y-%m-%d').date()
+        tour_id = int(request.GET.get('tour') or 0) or None
+        transfer_id = int(request.GET.get('transfer') or 0) or None
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Eksik veya geçersiz parametre'}, status=400)
+    cost = VehicleCostMatrix.lookup(supplier_id, vehicle_type_id, target_date, tour_id, transfer_id)
+    if cost is None:
+        return JsonResponse({'error': 'Bu seçim için geçerli maliyet bulunamadı'}, status=404)
+    return JsonResponse(dict(cost, cost_price=str(cost['cost_price'])))
+
 def vehicle_item_create(request, operation_day_id):
-    day = get_object_or_404(OperationDay, id=operation_day_id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    day = get_object_or_404(OperationDay.objects.select_related('operation'), id=operation_day_id)
+    operation = day.operation
     form = OperationItemVehicleForm()
     if request.method == 'POST':
         form = OperationItemVehicleForm(request.POST)
@@ -831,15 +710,7 @@ def vehicle_item_create(request, operation_day_id):
             item.operation_day = day
             item.item_type = "VEHICLE"
             item.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
         else:
             print(form.errors)
     return render(request, 'operation/forms/form.html', {
@@ -847,173 +718,74 @@ def vehicle_item_create(request, operation_day_id):
         'day': day,
         'operation': operation,
         'page_title': 'Araç Ekle',
-        'post_url': reverse('tour:vehicle_item_create', args=[day.id])
+        'post_url': reverse('tour:vehicle_item_create', args=[day.id]),
+        'target': f'#day-{day.id}',
+        'cost_suggestion_url': get_vehicle_cost_url(day)
     })
 
 def vehicle_item_update(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    day = get_object_or_404(OperationDay, id=item.operation_day.id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    day = item.operation_day
+    operation = day.operation
     form = OperationItemVehicleForm(instance=item)
     if request.method == 'POST':
         form = OperationItemVehicleForm(request.POST, instance=item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'day': day,
         'operation': operation,
         'page_title': 'Araç Düzenle',
-        'post_url': reverse('tour:vehicle_item_update', args=[item.id])
+        'post_url': reverse('tour:vehicle_item_update', args=[item.id]),
+        'target': f'#day-{day.id}',
+        'cost_suggestion_url': get_vehicle_cost_url(day, item)
     })
-            
+
 def no_vehicle_activity_item_create(request, operation_day_id):
-    day = get_object_or_404(OperationDay, id=operation_day_id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    day = get_object_or_404(OperationDay.objects.select_related('operation'), id=operation_day_id)
+    operation = day.operation
     form = OperationItemActivityForm()
-    if request.method == 'POST':    
+    if request.method == 'POST':
         form = OperationItemActivityForm(request.POST)
         if form.is_valid():
             item = form.save(commit=False)
             item.operation_day = day
             item.item_type = "NO_VEHICLE_ACTIVITY"
             item.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'day': day,
         'operation': operation,
         'page_title': 'Araçsız Aktivite Ekle',
-        'post_url': reverse('tour:no_vehicle_activity_item_create', args=[day.id])
+        'post_url': reverse('tour:no_vehicle_activity_item_create', args=[day.id]),
+        'target': f'#day-{day.id}'
     })
 
 def no_vehicle_activity_item_update(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    day = get_object_or_404(OperationDay, id=item.operation_day.id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    day = item.operation_day
+    operation = day.operation
     form = OperationItemActivityForm(instance=item)
     if request.method == 'POST':
         form = OperationItemActivityForm(request.POST, instance=item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'day': day,
         'operation': operation,
         'page_title': 'Araçsız Aktivite Düzenle',
-        'post_url': reverse('tour:no_vehicle_activity_item_update', args=[item.id])
+        'post_url': reverse('tour:no_vehicle_activity_item_update', args=[item.id]),
+        'target': f'#day-{day.id}'
     })
-    
-        
+
 def no_vehicle_tour_item_create(request, operation_day_id):
-    day = get_object_or_404(OperationDay, id=operation_day_id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    day = get_object_or_404(OperationDay.objects.select_related('operation'), id=operation_day_id)
+    operation = day.operation
     form = OperationItemNoVehicleTourForm()
     if request.method == 'POST':
         form = OperationItemNoVehicleTourForm(request.POST)
@@ -1022,92 +794,38 @@ def no_vehicle_tour_item_create(request, operation_day_id):
             item.operation_day = day
             item.item_type = "NO_VEHICLE_TOUR"
             item.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'day': day,
         'operation': operation,
         'page_title': 'Araçsız Tur Ekle',
-        'post_url': reverse('tour:no_vehicle_tour_item_create', args=[day.id])
+        'post_url': reverse('tour:no_vehicle_tour_item_create', args=[day.id]),
+        'target': f'#day-{day.id}'
     })
 
 def no_vehicle_tour_item_update(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    day = get_object_or_404(OperationDay, id=item.operation_day.id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    day = item.operation_day
+    operation = day.operation
     form = OperationItemNoVehicleTourForm(instance=item)
     if request.method == 'POST':
         form = OperationItemNoVehicleTourForm(request.POST, instance=item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'day': day,
         'operation': operation,
         'page_title': 'Araçsız Tur Düzenle',
-        'post_url': reverse('tour:no_vehicle_tour_item_update', args=[item.id])
+        'post_url': reverse('tour:no_vehicle_tour_item_update', args=[item.id]),
+        'target': f'#day-{day.id}'
     })
 
 def no_vehicle_guide_item_create(request, operation_day_id):
-    day = get_object_or_404(OperationDay, id=operation_day_id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation') 
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    day = get_object_or_404(OperationDay.objects.select_related('operation'), id=operation_day_id)
+    operation = day.operation
     form = OperationItemNoVehicleGuideForm()
     if request.method == 'POST':
         form = OperationItemNoVehicleGuideForm(request.POST)
@@ -1116,92 +834,37 @@ def no_vehicle_guide_item_create(request, operation_day_id):
             item.operation_day = day
             item.item_type = "NO_VEHICLE_GUIDE"
             item.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'day': day,
         'operation': operation,
         'page_title': 'Araçsız Rehber Ekle',
-        'post_url': reverse('tour:no_vehicle_guide_item_create', args=[day.id])
+        'post_url': reverse('tour:no_vehicle_guide_item_create', args=[day.id]),
+        'target': f'#day-{day.id}'
     })
 
 def no_vehicle_guide_item_update(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    day = get_object_or_404(OperationDay, id=item.operation_day.id)
-    operation = get_object_or_404(Operation, id=day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    day = item.operation_day
+    operation = day.operation
     form = OperationItemNoVehicleGuideForm(instance=item)
     if request.method == 'POST':
         form = OperationItemNoVehicleGuideForm(request.POST, instance=item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_day(request, day.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Araçsız Rehber Düzenle',
-        'post_url': reverse('tour:no_vehicle_guide_item_update', args=[item.id])
+        'post_url': reverse('tour:no_vehicle_guide_item_update', args=[item.id]),
+        'target': f'#day-{day.id}'
     })
 
-
 def sub_item_tour_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemTourForm()
     if request.method == 'POST':
         form = OperationSubItemTourForm(request.POST)
@@ -1210,89 +873,35 @@ def sub_item_tour_create(request, operation_item_id):
             tour.operation_item = item
             tour.subitem_type = "TOUR"
             tour.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Tur Ekle',
-        'post_url': reverse('tour:sub_item_tour_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_tour_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_tour_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemTourForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemTourForm(request.POST, instance=sub_item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Tur Düzenle',
-        'post_url': reverse('tour:sub_item_tour_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_tour_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 def sub_item_transfer_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemTransferForm()
     if request.method == 'POST':
         form = OperationSubItemTransferForm(request.POST)
@@ -1301,89 +910,35 @@ def sub_item_transfer_create(request, operation_item_id):
             transfer.operation_item = item
             transfer.subitem_type = "TRANSFER"
             transfer.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Transfer Ekle',
-        'post_url': reverse('tour:sub_item_transfer_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_transfer_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_transfer_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemTransferForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemTransferForm(request.POST, instance=sub_item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Transfer Düzenle',
-        'post_url': reverse('tour:sub_item_transfer_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_transfer_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 def sub_item_hotel_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemHotelForm()
     if request.method == 'POST':
         form = OperationSubItemHotelForm(request.POST)
@@ -1392,89 +947,35 @@ def sub_item_hotel_create(request, operation_item_id):
             hotel.operation_item = item
             hotel.subitem_type = "HOTEL"
             hotel.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Otel Ekle',
-        'post_url': reverse('tour:sub_item_hotel_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_hotel_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_hotel_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemHotelForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemHotelForm(request.POST, instance=sub_item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Otel Düzenle',
-        'post_url': reverse('tour:sub_item_hotel_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_hotel_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 def sub_item_activity_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemActivityForm()
     if request.method == 'POST':
         form = OperationSubItemActivityForm(request.POST)
@@ -1483,89 +984,35 @@ def sub_item_activity_create(request, operation_item_id):
             activity.operation_item = item
             activity.subitem_type = "ACTIVITY"
             activity.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Aktivite Ekle',
-        'post_url': reverse('tour:sub_item_activity_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_activity_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_activity_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemActivityForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemActivityForm(request.POST, instance=sub_item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Aktivite Düzenle',
-        'post_url': reverse('tour:sub_item_activity_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_activity_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 def sub_item_museum_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemMuseumForm()
     if request.method == 'POST':
         form = OperationSubItemMuseumForm(request.POST)
@@ -1575,15 +1022,7 @@ def sub_item_museum_create(request, operation_item_id):
             museum.subitem_type = "MUSEUM"
             museum.save()
             museum.museums.set(form.cleaned_data['museums'])
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
         else:
             print(form.errors)
 
@@ -1591,79 +1030,33 @@ def sub_item_museum_create(request, operation_item_id):
         'form': form,
         'operation': operation,
         'page_title': 'Müze Ekle',
-        'post_url': reverse('tour:sub_item_museum_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_museum_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_museum_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemMuseumForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemMuseumForm(request.POST, instance=sub_item)
         if form.is_valid():
             museum = form.save()
             museum.museums.set(form.cleaned_data['museums'])
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
         else:
             print(form.errors)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Müze Düzenle',
-        'post_url': reverse('tour:sub_item_museum_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_museum_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 def sub_item_guide_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemGuideForm()
     if request.method == 'POST':
         form = OperationSubItemGuideForm(request.POST)
@@ -1672,89 +1065,35 @@ def sub_item_guide_create(request, operation_item_id):
             guide.operation_item = item
             guide.subitem_type = "GUIDE"
             guide.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Rehber Ekle',
-        'post_url': reverse('tour:sub_item_guide_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_guide_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_guide_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemGuideForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemGuideForm(request.POST, instance=sub_item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Rehber Düzenle',
-        'post_url': reverse('tour:sub_item_guide_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_guide_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 def sub_item_other_price_create(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
-    operation = get_object_or_404(Operation, id=item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day__operation'), id=operation_item_id)
+    operation = item.operation_day.operation
     form = OperationSubItemOtherPriceForm()
     if request.method == 'POST':
         form = OperationSubItemOtherPriceForm(request.POST)
@@ -1763,89 +1102,35 @@ def sub_item_other_price_create(request, operation_item_id):
             other_price.operation_item = item
             other_price.subitem_type = "OTHER_PRICE"
             other_price.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, item.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Masraf Ekle',
-        'post_url': reverse('tour:sub_item_other_price_create', args=[item.id])
+        'post_url': reverse('tour:sub_item_other_price_create', args=[item.id]),
+        'target': f'#item-{item.id}'
     })
 
 def sub_item_other_price_update(request, operation_sub_item_id):
-    sub_item = get_object_or_404(OperationSubItem, id=operation_sub_item_id)
-    operation = get_object_or_404(Operation, id=sub_item.operation_item.operation_day.operation.id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
+    sub_item = get_object_or_404(OperationSubItem.objects.select_related('operation_item__operation_day__operation'), id=operation_sub_item_id)
+    operation = sub_item.operation_item.operation_day.operation
     form = OperationSubItemOtherPriceForm(instance=sub_item)
     if request.method == 'POST':
         form = OperationSubItemOtherPriceForm(request.POST, instance=sub_item)
         if form.is_valid():
             form.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_item(request, sub_item.operation_item_id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Masraf Düzenle',
-        'post_url': reverse('tour:sub_item_other_price_update', args=[sub_item.id])
+        'post_url': reverse('tour:sub_item_other_price_update', args=[sub_item.id]),
+        'target': f'#item-{sub_item.operation_item_id}'
     })
 
 
 def operation_customer_create(request, operation_id):
     operation = get_object_or_404(Operation, id=operation_id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    ).prefetch_related('museums')
     form = OperationCustomerForm()
     if request.method == 'POST':
         form = OperationCustomerForm(request.POST)
@@ -1853,45 +1138,18 @@ def operation_customer_create(request, operation_id):
             customer = form.save(commit=False)
             customer.operation = operation
             customer.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_customers(request, operation.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Müşteri Ekle',
-        'post_url': reverse('tour:operation_customer_create', args=[operation.id])
+        'post_url': reverse('tour:operation_customer_create', args=[operation.id]),
+        'target': '#operation-customers'
     })
 
 
 def operation_sales_price_create(request, operation_id):
     operation = get_object_or_404(Operation, id=operation_id)
-    customers = OperationCustomer.objects.filter(operation=operation).select_related('operation')
-    sales_prices = OperationSalesPrice.objects.filter(operation=operation).select_related('operation')
-    days = OperationDay.objects.filter(operation=operation).select_related('operation')
-    items = OperationItem.objects.filter(operation_day__in=days).select_related(
-        'operation_day',
-        'vehicle_type',
-        'vehicle_supplier',
-        'no_vehicle_tour',
-        'no_vehicle_activity',
-        'activity_supplier'
-    )
-    sub_items = OperationSubItem.objects.filter(operation_item__in=items).select_related(
-        'operation_item',
-        'tour',
-        'transfer',
-        'hotel',
-        'guide',
-        'activity',
-        'activity_supplier'
-    )
     form = OperationSalesPriceForm()
     if request.method == 'POST':
         form = OperationSalesPriceForm(request.POST)
@@ -1899,20 +1157,13 @@ def operation_sales_price_create(request, operation_id):
             sales_price = form.save(commit=False)
             sales_price.operation = operation
             sales_price.save()
-            return render(request, 'operation/includes/operation_detail.html', {
-                'form': form,
-                'operation': operation,
-                'customers': customers,
-                'sales_prices': sales_prices,
-                'days': days,
-                'items': items,
-                'sub_items': sub_items
-            })
+            return render_operation_sales_prices(request, operation.id)
     return render(request, 'operation/forms/form.html', {
         'form': form,
         'operation': operation,
         'page_title': 'Satış Fiyatı Ekle',
-        'post_url': reverse('tour:operation_sales_price_create', args=[operation.id])
+        'post_url': reverse('tour:operation_sales_price_create', args=[operation.id]),
+        'target': '#operation-sales-prices'
     })
 
 def operation_create(request):
@@ -1998,8 +1249,71 @@ def operation_list(request):
 
     return render(request, 'operation/operation_list.html', context)
 
+def operation_finance(request):
+    """Seçili aydaki operasyonların para birimi başına gelir, maliyet ve kârı"""
+    today = datetime.now().date()
+    try:
+        month = int(request.GET.get('month', today.month))
+        year = int(request.GET.get('year', today.year))
+    except ValueError:
+        month, year = today.month, today.year
+
+    operations = Operation.objects.filter(
+        start_date__year=year, start_date__month=month, is_active=True
+    ).select_related('buyer_company').prefetch_related(
+        Prefetch('totals', queryset=OperationTotals.objects.select_related('currency').order_by('currency__code'))
+    ).order_by('start_date', 'reference_number')
+
+    summary = OperationTotals.objects.filter(operation__in=operations.values('pk')).values(
+        'currency__code'
+    ).annotate(revenue=Sum('revenue'), cost=Sum('cost')).order_by('currency__code')
+    for row in summary:
+        row['margin'] = row['revenue'] - row['cost']
+
+    # Tüm toplamlar operasyonun başlangıç tarihindeki kurla tek seferde rapor para birimine çevrilir
+    report_currency = request.GET.get('currency') or settings.BASE_CURRENCY
+    totals = [(operation, total) for operation in operations for total in operation.totals.all()]
+    amounts = [
+        (amount, total.currency_id, operation.start_date)
+        for operation, total in totals
+        for amount in (total.revenue, total.cost)
+    ]
+    converted = iter(CurrencyConverter.convert_many(amounts, report_currency))
+    report_total = {'revenue': Decimal('0'), 'cost': Decimal('0'), 'missing': 0}
+    for operation, total in totals:
+        revenue, cost = next(converted), next(converted)
+        if revenue is None or cost is None:
+            operation.report_missing = True
+            report_total['missing'] += 1
+            continue
+        operation.report_revenue = getattr(operation, 'report_revenue', 0) + revenue
+        operation.report_cost = getattr(operation, 'report_cost', 0) + cost
+        operation.report_margin = operation.report_revenue - operation.report_cost
+        report_total['revenue'] += revenue
+        report_total['cost'] += cost
+    report_total['margin'] = report_total['revenue'] - report_total['cost']
+
+    return render(request, 'operation/operation_finance.html', {
+        'operations': operations,
+        'summary': summary,
+        'report_currency': report_currency,
+        'report_total': report_total,
+        'currencies': Currency.objects.order_by('code'),
+        'months': [
+            (1, 'Ocak'), (2, 'Şubat'), (3, 'Mart'), (4, 'Nisan'),
+            (5, 'Mayıs'), (6, 'Haziran'), (7, 'Temmuz'), (8, 'Ağustos'),
+            (9, 'Eylül'), (10, 'Ekim'), (11, 'Kasım'), (12, 'Aralık')
+        ],
+        'current_month': month,
+        'current_year': year,
+    })
 
-def operation_jobs(request):
+
+def get_jobs_context(request, days):
+    """
+    Görev ekranı bağlamı: ağaç yalnızca seçili gün için yüklenir, diğer
+    günlerin sayıları tek bir toplama sorgusuyla gelir
+    """
     # Bugünün tarihini al
     today = datetime.now().date()
     
@@ -2018,51 +1332,56 @@ def operation_jobs(request):
             selected_date = today
     else:
         selected_date = today
-    
-    # Her gün için operasyon günlerini ve ilişkili verileri al
-    days = OperationDay.objects.filter(
-        date__in=date_range
+
+    # Gün butonları için operasyon ve iş sayıları
+    day_counts = {
+        row['date']: row
+        for row in days.filter(date__in=date_range).values('date').annotate(
+            operation_count=Count('id', distinct=True),
+            # Kartlarda yalnızca aktif öğeler gösterilir
+            item_count=Count('items', filter=Q(items__is_active=True))
+        )
+    }
+
+    # Sadece seçili günün ağacını yükle
+    selected_days = days.filter(
+        date=selected_date
     ).select_related(
         'operation',
         'operation__created_by',
         'operation__follow_by',
         'operation__buyer_company'
     ).prefetch_related(
-        Prefetch(
-            'items',
-            queryset=OperationItem.objects.select_related(
-                'vehicle_type',
-                'vehicle_supplier',
-                'no_vehicle_tour',
-                'no_vehicle_activity',
-                'activity_supplier'
-            ).prefetch_related(
-                Prefetch(
-                    'subitems',
-                    queryset=OperationSubItem.objects.select_related(
-                        'tour',
-                        'transfer',
-                        'hotel',
-                        'guide',
-                        'activity',
-                        'activity_supplier'
-                    ).prefetch_related('museums')
-                )
-            )
-        )
+        Prefetch('items', queryset=OperationGraph.item_queryset().filter(is_active=True))
     )
-    
-    context = {
+
+    return {
         'date_range': date_range,
-        'days': days,
+        'day_counts': day_counts,
+        'days': selected_days,
         'today': today,
-        'selected_date': selected_date
+        'selected_date': selected_date,
+        # SSE akışı yalnızca ASGI altında açılır; WSGI'da pano yoklanır
+        'live_events': isinstance(request, ASGIRequest),
     }
-    
-    return render(request, 'operation/operation_jobs.html', context)
+
+def render_jobs(request, days):
+    """HTMX isteğinde yalnızca panoyu, aksi halde tam sayfayı döndürür"""
+    context = get_jobs_context(request, days)
+    if request.headers.get('HX-Request'):
+        response = render(request, 'operation/includes/jobs_board.html', context)
+    else:
+        response = render(request, 'operation/operation_jobs.html', context)
+    patch_vary_headers(response, ['HX-Request'])
+    return response
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=operation_jobs_etag)
+def operation_jobs(request):
+    return render_jobs(request, OperationDay.objects.all())
 
 def jobs_vehicle_item_update(request, operation_item_id):
-    item = get_object_or_404(OperationItem, id=operation_item_id)
+    item = get_object_or_404(OperationItem.objects.select_related('operation_day'), id=operation_item_id)
     form = OperationItemVehicleForm(instance=item)
     if request.method == 'POST':
         form = OperationItemVehicleForm(request.POST, instance=item)
@@ -2076,7 +1395,8 @@ def jobs_vehicle_item_update(request, operation_item_id):
         'form': form,
         'item': item,
         'page_title': 'Araç Düzenle',
-        'post_url': reverse('tour:jobs_vehicle_item_update', args=[item.id])
+        'post_url': reverse('tour:jobs_vehicle_item_update', args=[item.id]),
+        'cost_suggestion_url': get_vehicle_cost_url(item.operation_day, item)
     })
 
 def jobs_no_vehicle_tour_item_update(request, operation_item_id):
@@ -2267,67 +1587,87 @@ def jobs_sub_item_other_price_update(request, operation_sub_item_id):
 
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=my_operation_jobs_etag)
 def my_operation_jobs(request):
-    # Bugünün tarihini al
-    today = datetime.now().date()
-    
-    # Bugünden başlayarak 7 günlük tarih aralığını oluştur
-    date_range = [today + timedelta(days=i) for i in range(7)]
-    
-    # URL'den seçilen tarihi al, yoksa bugünü kullan
-    selected_date_str = request.GET.get('date')
-    if selected_date_str:
-        try:
-            selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
-            # Seçilen tarih 7 günlük aralıkta değilse bugünü kullan
-            if selected_date not in date_range:
-                selected_date = today
-        except ValueError:
-            selected_date = today
-    else:
-        selected_date = today
-    
-    # Her gün için operasyon günlerini ve ilişkili verileri al
-    days = OperationDay.objects.filter(
-        date__in=date_range, 
-        operation__follow_by=request.user
-    ).select_related(
-        'operation',
-        'operation__created_by',
-        'operation__follow_by',
-        'operation__buyer_company'
-    ).prefetch_related(
-        Prefetch(
-            'items',
-            queryset=OperationItem.objects.select_related(
-                'vehicle_type',
-                'vehicle_supplier',
-                'no_vehicle_tour',
-                'no_vehicle_activity',
-                'activity_supplier'
-            ).prefetch_related(
-                Prefetch(
-                    'subitems',
-                    queryset=OperationSubItem.objects.select_related(
-                        'tour',
-                        'transfer',
-                        'hotel',
-                        'guide',
-                        'activity',
-                        'activity_supplier'
-                    ).prefetch_related('museums')
-                )
-            )
-        )
+    return render_jobs(request, OperationDay.objects.filter(operation__follow_by=request.user))
+
+def jobs_item(request, operation_item_id):
+    """Görev panosundaki tek öğe kartının içeriği (canlı güncelleme için)"""
+    item = get_object_or_404(OperationItem.objects.select_related(*OperationGraph.ITEM_RELATED), id=operation_item_id)
+    return render(request, 'operation/includes/jobs_item.html', {'item': item})
+
+def jobs_sub_item(request, operation_sub_item_id):
+    """Görev panosundaki tek alt öğe kartının içeriği (canlı güncelleme için)"""
+    subitem = get_object_or_404(OperationGraph.sub_item_queryset(), id=operation_sub_item_id)
+    return render(request, 'operation/includes/jobs_subitem.html', {'subitem': subitem})
+
+async def operation_jobs_events(request):
+    """
+    Seçili günün görev panosu değişikliklerini server-sent events olarak akıtır.
+    Uzun süre açık kaldığı için ASGI sunucusu (core/asgi.py) ile çalıştırılmalıdır;
+    WSGI altında bir iş parçacığını bağlı tutmamak için 204 döner (sayfa yoklamaya geçer).
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    response = StreamingHttpResponse(
+        event_stream(jobs_channel(get_date_param(request))),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def get_date_param(request):
+    """?date= parametresini okur, geçersizse bugünü döndürür"""
+    try:
+        return datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return datetime.now().date()
+
+DISPATCH_COLUMNS = [
+    ('reference_number', 'Referans No'),
+    ('buyer_company', 'Alıcı Şirket'),
+    ('pick_time', 'Alış Saati'),
+    ('description', 'Hizmet'),
+    ('pick_up_location', 'Alış Yeri'),
+    ('drop_off_location', 'Bırakış Yeri'),
+    ('vehicle_type', 'Araç Tipi'),
+    ('supplier', 'Tedarikçi'),
+    ('guide', 'Rehber'),
+    ('driver_name', 'Şoför'),
+    ('driver_phone', 'Şoför Telefon'),
+    ('vehicle_plate_no', 'Plaka'),
+    ('follow_by', 'Takip Eden'),
+]
+
+def operation_dispatch(request):
+    """Günlük sevk listesi: tek tablodan tarih indeksiyle okunur"""
+    selected_date = get_date_param(request)
+    return render(request, 'operation/operation_dispatch.html', {
+        'rows': DispatchRow.objects.filter(date=selected_date),
+        'columns': DISPATCH_COLUMNS,
+        'selected_date': selected_date,
+        'previous_date': selected_date - timedelta(days=1),
+        'next_date': selected_date + timedelta(days=1),
+    })
+
+def operation_dispatch_export(request):
+    """Seçili günün sevk listesini Excel olarak indirir"""
+    selected_date = get_date_param(request)
+    rows = (
+        [value.strftime('%H:%M') if name == 'pick_time' and value else value
+         for (name, _), value in zip(DISPATCH_COLUMNS, row)]
+        for row in DispatchRow.objects.filter(date=selected_date).values_list(
+            *[name for name, _ in DISPATCH_COLUMNS]
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return xlsx_response(
+        f'dispatch_{selected_date.isoformat()}.xlsx', selected_date.strftime('%d.%m.%Y'),
+        [label for _, label in DISPATCH_COLUMNS], rows
     )
-    
-    context = {
-        'date_range': date_range,
-        'days': days,
-        'today': today,
-        'selected_date': selected_date
-    }
-    
-    return render(request, 'operation/operation_jobs.html', context)
 
 